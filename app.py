@@ -1,17 +1,36 @@
-from flask import Flask, request, jsonify, render_template, make_response, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, make_response, send_file, send_from_directory, stream_with_context
 from litellm import completion
 import os
 import json
 from datetime import datetime
 import base64
-from llm_utils import generate_completion
+from llm_utils import (
+    generate_completion, stream_completion, response_cache, completion_flight, completion_batcher, BATCHED_MODES
+)
 import re
-import epitran
+import functools
+import math
 from gtts import gTTS
 import io
+import mimetypes
+import zipfile
 from ipa_speech import IPATranscriber
+from audio_cache import AudioCache
+from lazy_loader import LazyLoader
+from json_stream import JSONArrayStreamParser, parse_json_array_objects
+from document_text import SUPPORTED_EXTENSIONS
+from text_index import TextIndex
+from search_index import SearchIndex
+from recent_files import RecentFilesIndex
+from deck_builder import DeckBuilder, ProviderRateLimiter
+import prompts
+import metrics
+import outbound
+from outbound import CircuitOpenError
+from werkzeug.utils import safe_join
 
 app = Flask(__name__)
+metrics.instrument_flask_app(app)
 
 # Use an environment variable for the upload folder, with a default to /tmp/uploads
 UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', '/tmp/uploads')
@@ -21,15 +40,67 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-# Initialize epitran for different languages
-epitran_models = {
-    'English': epitran.Epitran('eng-Latn'),
-    'French': epitran.Epitran('fra-Latn'),
+# Uploads sorted by modification time, for the recent files list
+recent_files = RecentFilesIndex(UPLOAD_FOLDER)
+
+# Extracted page text of uploads, keyed by file hash
+TEXT_INDEX_FOLDER = os.environ.get('TEXT_INDEX_FOLDER', os.path.join(UPLOAD_FOLDER, '.text_index'))
+text_index = TextIndex(TEXT_INDEX_FOLDER)
+
+# Full-text search over the indexed pages, kept up to date as files are indexed
+search_index = SearchIndex(os.path.join(TEXT_INDEX_FOLDER, 'search.sqlite3'))
+
+def update_search_index(path, file_hash):
+    filename = os.path.basename(path)
+    if file_hash is None:
+        # Replaced or deleted: stop returning its old text from /search
+        search_index.remove_document(filename)
+    elif search_index.indexed_hash(filename) != file_hash:
+        search_index.index_document(filename, file_hash, text_index.read_pages(file_hash))
+
+text_index.listeners.append(update_search_index)
+
+# Forget uploads deleted while the app was down
+for filename in set(text_index.entries()) | set(search_index.filenames()):
+    if not os.path.exists(os.path.join(UPLOAD_FOLDER, filename)):
+        text_index.forget(os.path.join(UPLOAD_FOLDER, filename))
+
+# Index uploads that predate the text index in the background
+for entry in os.scandir(UPLOAD_FOLDER):
+    if entry.is_file() and entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+        text_index.submit(entry.path)
+
+def load_epitran(code):
+    # Imported here so importing the app doesn't pay for epitran either
+    import epitran
+    return epitran.Epitran(code)
+
+# Epitran models take seconds each to build, so they are built on first use
+epitran_models = LazyLoader({
+    'English': functools.partial(load_epitran, 'eng-Latn'),
+    'French': functools.partial(load_epitran, 'fra-Latn'),
     # Add more languages as needed
-}
+})
+
+# Synthesized speech is kept on disk so repeated pronunciations skip the TTS round trip
+audio_cache = AudioCache(
+    os.environ.get('AUDIO_CACHE_FOLDER', '/tmp/audio_cache'),
+    max_bytes=int(os.environ.get('AUDIO_CACHE_MAX_MB', 512)) * 1024 * 1024
+)
 
 # Initialize IPATranscriber for better IPA and audio generation
-ipa_transcriber = IPATranscriber()
+ipa_transcriber = IPATranscriber(
+    audio_cache=audio_cache,
+    use_lexicon=os.environ.get('IPA_USE_LEXICON', 'True').lower() == 'true'
+)
+
+# Build the models and clients in the background so the server can start
+# answering requests right away; anything still loading is built on first use.
+# Epitran construction is pure Python (GIL-bound), so its models share one
+# thread, and English goes last because eng_to_ipa normally answers for it.
+if os.environ.get('WARM_MODELS', 'True').lower() == 'true':
+    ipa_transcriber.clients.warm()
+    epitran_models.warm(sorted(epitran_models, key=lambda language: language == 'English'), max_workers=1)
 
 @app.route('/favicon.ico')
 def favicon():
@@ -38,16 +109,12 @@ def favicon():
 @app.route('/')
 def index():
     recent_files = get_recent_files()
-    response = make_response(render_template('index.html', recent_files=recent_files))
+    response = make_response(render_template('index.html', recent_files=recent_files,
+                                             prompts=prompts.client_templates(), ipa_batch_max=IPA_BATCH_MAX))
     return response
 
 def get_recent_files():
-    if not os.path.exists(app.config['UPLOAD_FOLDER']):
-        os.makedirs(app.config['UPLOAD_FOLDER'])
-    files = os.listdir(app.config['UPLOAD_FOLDER'])
-    valid_files = [f for f in files if f.lower().endswith(('.pdf', '.txt'))]
-    valid_files.sort(key=lambda x: os.path.getmtime(os.path.join(app.config['UPLOAD_FOLDER'], x)), reverse=True)
-    return [{'filename': file, 'date': datetime.fromtimestamp(os.path.getmtime(os.path.join(app.config['UPLOAD_FOLDER'], file))).isoformat()} for file in valid_files[:5]]
+    return recent_files.recent(5)
 
 @app.route('/get_recent_files')
 def get_recent_files_route():
@@ -63,11 +130,15 @@ def upload_file():
     if file and (file.filename.lower().endswith(('.pdf', '.txt', '.epub'))):
         filename = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
         file.save(filename)
+        recent_files.touch(file.filename)
+        # Extract the page text in the background for server-side features
+        text_index.submit(filename)
         return jsonify({'message': 'File uploaded successfully', 'filename': file.filename}), 200
     return jsonify({'error': 'Invalid file type. Please upload a PDF, TXT, or EPUB file.'}), 400
 
 @app.route('/get_epub_content/<path:filename>')
 def get_epub_content(filename):
+    # Kept for older clients; /epub/ serves the same file without base64 and JSON wrapping
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     if os.path.exists(file_path) and filename.endswith('.epub'):
         with open(file_path, 'rb') as file:
@@ -79,66 +150,347 @@ def get_epub_content(filename):
 def open_pdf(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+@app.route('/epub/<path:path>')
+def epub(path):
+    """Serve an uploaded EPUB, or a single entry inside it.
+
+    ``/epub/<book>.epub`` streams the whole file with Range, ETag and
+    Last-Modified support. ``/epub/<book>.epub/<entry>`` streams one file from
+    the archive (e.g. ``OEBPS/chapter1.xhtml``), so epub.js can open the book
+    as a directory and fetch only the chapters it renders.
+    """
+    filename, sep, entry = path.partition('.epub/')
+    if not sep:
+        if not path.lower().endswith('.epub'):
+            return jsonify({'error': 'File not found or not an EPUB'}), 404
+        return send_from_directory(app.config['UPLOAD_FOLDER'], path,
+                                   mimetype='application/epub+zip', max_age=3600)
+
+    file_path = safe_join(app.config['UPLOAD_FOLDER'], filename + '.epub')
+    if not file_path or not os.path.isfile(file_path):
+        return jsonify({'error': 'File not found or not an EPUB'}), 404
+
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            info = archive.getinfo(entry)
+    except (zipfile.BadZipFile, KeyError):
+        return jsonify({'error': f'Entry {entry} not found in EPUB'}), 404
+
+    def chunks():
+        with zipfile.ZipFile(file_path) as archive, archive.open(info) as member:
+            for block in iter(lambda: member.read(64 * 1024), b''):
+                yield block
+
+    stat = os.stat(file_path)
+    mimetype = mimetypes.guess_type(entry)[0] or 'application/octet-stream'
+    response = Response(chunks(), mimetype=mimetype)
+    response.content_length = info.file_size
+    response.set_etag(f"{stat.st_mtime_ns:x}-{info.CRC:08x}")
+    response.last_modified = datetime.fromtimestamp(stat.st_mtime)
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
+
+@app.route('/document_text/<path:filename>')
+def document_text(filename):
+    """Return the extracted text of pages ``start`` to ``end`` (1-based, inclusive)."""
+    file_path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+    if not file_path or not os.path.isfile(file_path) or not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        return jsonify({'error': 'File not found or not a PDF, TXT, or EPUB'}), 404
+
+    try:
+        file_hash = text_index.ensure(file_path)
+        start = request.args.get('start', 1, type=int)
+        end = request.args.get('end', type=int)
+        pages = text_index.read_pages(file_hash, start - 1, end)
+        return jsonify({
+            'pages': pages,
+            'start': start,
+            'page_count': text_index.page_count(file_hash),
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/search')
+def search():
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    if not query.strip():
+        return jsonify({'error': 'No query provided'}), 400
+    try:
+        while True:
+            results = search_index.search(query, limit=limit)
+            missing = {hit['filename'] for hit in results
+                       if not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], hit['filename']))}
+            if not missing:
+                return jsonify({'results': results})
+            # Deleted behind the app's back: forget them and search again for a full page.
+            # They are removed here rather than by the listener, whose errors are only logged.
+            for filename in missing:
+                search_index.remove_document(filename)
+                text_index.forget(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def parse_explanation(content):
+    """Return the explanation text from an explain-mode completion.
+
+    The prompt asks for a JSON object with an "explanation" key, but the raw
+    content is used whenever that can't be parsed.
+    """
+    try:
+        # First try to see if it's a JSON object with an "explanation" key
+        json_match = re.search(r'\{[\s\S]*\}', content)
+        if json_match:
+            json_text = json_match.group(0)
+            parsed = json.loads(json_text)
+            if 'explanation' in parsed:
+                return parsed['explanation']
+    except Exception as parse_err:
+        print("Using raw content for explanation: ", parse_err)
+
+    # Either the JSON parsing failed or there was no "explanation" key,
+    # so just return the raw content as the explanation
+    return content
+
+class InvalidRequest(ValueError):
+    """Raised for a request body that can't be served; answered with a 400."""
+
+def request_prompt(data, mode):
+    """Return the (system, prompt) of a completion request.
+
+    Requests carry either the fields of the mode's server-side template
+    (e.g. ``text``, or ``word``/``phrase``/``target_language``) or, when the
+    user edited the instructions, the full ``prompt``.
+
+    Raises:
+        InvalidRequest: If the mode has no template or the request has no input
+    """
+    if 'prompt' in data:
+        if not data['prompt']:
+            raise InvalidRequest('No prompt provided')
+        return None, data['prompt']
+    if mode not in prompts.TEMPLATES:
+        raise InvalidRequest('Invalid mode')
+    # The first field is the input itself (``text`` or ``word``); the others are optional
+    if not data.get(prompts.FIELDS[mode][0]):
+        raise InvalidRequest(f'No {prompts.FIELDS[mode][0]} provided')
+    return prompts.render(mode, **{name: data.get(name) for name in prompts.FIELDS[mode]})
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@metrics.stage_seconds.time('json_extraction')
+def flashcard_payload(mode, content):
+    """Build the /generate_flashcard response body for a completion.
+
+    Returns:
+        tuple: (payload dict, HTTP status)
+    """
+    if mode == 'language':
+        try:
+            # Extract the JSON substring from the content in case there is extra text.
+            json_match = re.search(r'\{[\s\S]*\}', content)
+            if json_match:
+                json_text = json_match.group(0)
+                flashcard = json.loads(json_text)
+                return {'flashcard': flashcard}, 200
+            else:
+                raise ValueError("No JSON object found in response")
+        except Exception as parse_err:
+            print("JSON parsing error in language mode: ", parse_err)
+            return {'error': 'JSON parsing error in language mode: ' + str(parse_err)}, 200
+    elif mode == 'flashcard':
+        try:
+            # Extract the objects of the JSON array in case there is extra text.
+            flashcards = parse_json_array_objects(content)
+            return {'flashcards': flashcards}, 200
+        except Exception as parse_err:
+            return {'error': 'JSON parsing error in flashcard mode: ' + str(parse_err)}, 200
+    elif mode == 'explain':
+        return {'explanation': parse_explanation(content)}, 200
+    else:
+        return {'error': 'Invalid mode'}, 400
+
+def error_response(error, status=500):
+    """Return the (payload, status, headers) reporting a failed request.
+
+    An invalid request is a 400, and a provider call refused by its open
+    circuit breaker a 503 with Retry-After, instead of ``status``.
+    """
+    if isinstance(error, InvalidRequest):
+        return {'error': str(error)}, 400, {}
+    if isinstance(error, CircuitOpenError):
+        return {'error': str(error)}, 503, {'Retry-After': str(math.ceil(error.retry_after))}
+    return {'error': str(error)}, status, {}
+
+# Request parsing shared with the async endpoints of asgi_app.py
+
+def flashcard_request(data):
+    """Return the mode and generate_completion arguments of a /generate_flashcard body."""
+    mode = data.get('mode', 'flashcard')
+    if mode not in ('flashcard', 'explain', 'language'):
+        raise InvalidRequest('Invalid mode')
+    system, prompt = request_prompt(data, mode)
+    return mode, {'prompt': prompt, 'model': data.get('model'), 'mode': mode, 'system': system}
+
+def translate_request(data):
+    """Return the generate_completion arguments of a /translate_text body, or None without text."""
+    text = data.get('text', '')
+    if not text:
+        return None
+    system, prompt = prompts.render('translate', text=text)
+    return {'prompt': prompt, 'model': data.get('model'), 'mode': 'translate', 'system': system}
+
+def audio_request(data):
+    """Return the synthesize_audio arguments (word, language, 'word' or 'phrase') of a /get_audio body."""
+    return data.get('word', ''), data.get('language', 'en'), data.get('type', 'word')
+
 @app.route('/generate_flashcard', methods=['POST'])
 def generate_flashcard():
     data = request.json
-    prompt = data['prompt']
-    mode = data.get('mode', 'flashcard')
-    model = data.get('model')
 
     try:
-        # Use llm_utils to generate completion with the selected model
-        content = generate_completion(prompt, model=model)
+        mode, completion_args = flashcard_request(data)
+        # Use llm_utils to generate completion with the selected model;
+        # concurrent flashcard/language requests are combined into one call
+        if mode in BATCHED_MODES:
+            content = completion_batcher.submit(**completion_args)
+        else:
+            content = generate_completion(**completion_args)
         print(content)
 
-        if mode == 'language':
-            try:
-                # Extract the JSON substring from the content in case there is extra text.
-                json_match = re.search(r'\{[\s\S]*\}', content)
-                if json_match:
-                    json_text = json_match.group(0)
-                    flashcard = json.loads(json_text)
-                    return jsonify({'flashcard': flashcard})
-                else:
-                    raise ValueError("No JSON object found in response")
-            except Exception as parse_err:
-                print("JSON parsing error in language mode: ", parse_err)
-                return jsonify({'error': 'JSON parsing error in language mode: ' + str(parse_err)})
-        elif mode == 'flashcard':
-            try:
-                # Extract the JSON array substring from the content in case there is extra text.
-                json_match = re.search(r'\[[\s\S]*\]', content)
-                if json_match:
-                    json_text = json_match.group(0)
-                    flashcards = json.loads(json_text)
-                    return jsonify({'flashcards': flashcards})
-                else:
-                    raise ValueError("No JSON array found in response")
-            except Exception as parse_err:
-                return jsonify({'error': 'JSON parsing error in flashcard mode: ' + str(parse_err)})
-        elif mode == 'explain':
-            # For explanation mode, try parsing as JSON first, but always fall back to the raw content
-            try:
-                # First try to see if it's a JSON object with an "explanation" key
-                json_match = re.search(r'\{[\s\S]*\}', content)
-                if json_match:
-                    json_text = json_match.group(0)
-                    parsed = json.loads(json_text)
-                    if 'explanation' in parsed:
-                        return jsonify({'explanation': parsed['explanation']})
-                
-                # If we get here, either the JSON parsing failed or there was no "explanation" key
-                # Just return the raw content as the explanation
-                return jsonify({'explanation': content})
-            except Exception as parse_err:
-                # If JSON parsing fails, return the raw content
-                print("Using raw content for explanation: ", parse_err)
-                return jsonify({'explanation': content})
-        else:
-            return jsonify({'error': 'Invalid mode'}), 400
+        payload, status = flashcard_payload(mode, content)
+        return jsonify(payload), status
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
+
+@app.route('/generate_flashcard_stream', methods=['POST'])
+def generate_flashcard_stream():
+    """Streaming variant of /generate_flashcard as server-sent events.
+
+    In explain mode a ``token`` event is emitted per completion delta; in
+    flashcard mode a ``flashcard`` event is emitted as soon as each card of the
+    JSON array is complete. A final ``done`` event carries the same JSON body
+    /generate_flashcard would have returned, or an ``error`` event is sent if
+    the stream fails part way.
+    """
+    data = request.json
+    mode = data.get('mode', 'explain')
+    model = data.get('model')
+
+    if mode not in ('explain', 'flashcard'):
+        return jsonify({'error': 'Streaming is not supported for mode: ' + mode}), 400
+
+    try:
+        system, prompt = request_prompt(data, mode)
+        deltas = stream_completion(prompt, model=model, mode=mode, system=system)
+    except Exception as e:
+        return error_response(e)
+
+    def explain_events():
+        parts = []
+        for delta in deltas:
+            parts.append(delta)
+            yield sse_event('token', {'token': delta})
+        yield sse_event('done', {'explanation': parse_explanation(''.join(parts))})
+
+    def flashcard_events():
+        parser = JSONArrayStreamParser()
+        flashcards = []
+        for delta in deltas:
+            for flashcard in parser.feed(delta):
+                flashcards.append(flashcard)
+                yield sse_event('flashcard', {'flashcard': flashcard})
+        if not parser.seen_array:
+            raise ValueError("No JSON array found in response")
+        yield sse_event('done', {'flashcards': flashcards})
+
+    def events():
+        try:
+            if mode == 'explain':
+                yield from explain_events()
+            else:
+                yield from flashcard_events()
+        except Exception as e:
+            print(f"Error streaming completion: {e}")
+            yield sse_event('error', {'error': str(e)})
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# One limiter for all deck jobs, so concurrent jobs together stay under each provider's rate
+deck_rate_limiter = ProviderRateLimiter.from_env()
+
+@app.route('/generate_deck/<path:filename>', methods=['POST'])
+def generate_deck(filename):
+    """Generate a flashcard deck from a whole uploaded document.
+
+    Streams server-sent events: ``start`` (chunk count), one ``progress`` per
+    finished chunk, then ``done`` with the merged ``flashcards``.
+    """
+    data = request.get_json(silent=True) or {}
+    file_path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+    if not file_path or not os.path.isfile(file_path) or not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        return jsonify({'error': 'File not found or not a PDF, TXT, or EPUB'}), 404
+
+    try:
+        builder = DeckBuilder(
+            model=data.get('model'),
+            max_workers=min(int(data.get('max_workers', 4)), 16),
+            max_tokens=int(data.get('chunk_tokens', 2000)),
+            rate_limiter=deck_rate_limiter,
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    def events():
+        try:
+            file_hash = text_index.ensure(file_path)
+            for event in builder.build(text_index.read_pages(file_hash)):
+                if event['type'] == 'deck':
+                    yield sse_event('done', {'flashcards': event['flashcards'],
+                                             'failed_chunks': event['failed_chunks']})
+                else:
+                    yield sse_event(event['type'], event)
+        except Exception as e:
+            print(f"Error generating deck for {filename}: {e}")
+            yield sse_event('error', {'error': str(e)})
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+IPA_LANGUAGES = {'English'} | set(epitran_models)
+
+# Maximum number of texts accepted by one /get_ipa_batch request
+IPA_BATCH_MAX = int(os.environ.get('IPA_BATCH_MAX', 500))
+
+@functools.lru_cache(maxsize=int(os.environ.get('IPA_CACHE_SIZE', 50000)))
+@metrics.stage_seconds.time('ipa')
+def transcribe_ipa(word, language):
+    """Return the IPA of ``word``, memoized across the eng_to_ipa and epitran paths.
+
+    Returns:
+        str: IPA transcription, or None if ``language`` is not supported
+    """
+    # First try using the ipa_transcriber for improved IPA
+    if language == 'English':
+        ipa = ipa_transcriber.get_ipa(word)
+        print(f"IPATranscriber result for '{word}': '{ipa}'")
+        if ipa:
+            return ipa
+    
+    # Fallback to epitran if needed
+    if language in epitran_models:
+        ipa = epitran_models[language].transliterate(word)
+        print(f"Epitran fallback for '{word}': '{ipa}'")
+        return ipa
+    return None
 
 @app.route('/get_ipa', methods=['POST'])
 def get_ipa():
@@ -149,64 +501,166 @@ def get_ipa():
     print(f"GET_IPA REQUEST: word='{word}', language='{language}'")
     
     try:
-        # First try using the ipa_transcriber for improved IPA
-        if language == 'English':
-            ipa = ipa_transcriber.get_ipa(word)
-            print(f"IPATranscriber result for '{word}': '{ipa}'")
-            if ipa:
-                return jsonify({'ipa': ipa})
-        
-        # Fallback to epitran if needed
-        if language in epitran_models:
-            ipa = epitran_models[language].transliterate(word)
-            print(f"Epitran fallback for '{word}': '{ipa}'")
-            return jsonify({'ipa': ipa})
-        else:
+        if language not in IPA_LANGUAGES:
             print(f"Language '{language}' not supported for IPA")
             return jsonify({'ipa': '', 'error': f'Language {language} not supported for IPA'})
+        return jsonify({'ipa': transcribe_ipa(word, language)})
     except Exception as e:
         print(f"ERROR in /get_ipa: {str(e)}")
         return jsonify({'ipa': '', 'error': str(e)})
 
-@app.route('/get_audio', methods=['POST'])
-def get_audio():
+@app.route('/get_ipa_batch', methods=['POST'])
+def get_ipa_batch():
+    """Transcribe many words or phrases in one request.
+
+    Takes ``{"words": [...], "language": ...}`` and returns ``{"ipa": [...]}``
+    in the same order; an entry that fails to transcribe is ''.
+    """
     data = request.json
-    word = data.get('word', '')
-    language = data.get('language', 'en')
-    audio_type = data.get('type', 'word')  # 'word' or 'phrase'
+    words = data.get('words')
+    language = data.get('language', 'English')
     
-    # Map language names to language codes for gTTS
-    language_codes = {
-        'English': 'en',
-        'French': 'fr',
-        # Add more languages as needed
-    }
+    if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+        return jsonify({'error': 'words must be a list of strings'}), 400
+    if len(words) > IPA_BATCH_MAX:
+        return jsonify({'error': f'At most {IPA_BATCH_MAX} words per request'}), 400
+    if language not in IPA_LANGUAGES:
+        return jsonify({'ipa': [''] * len(words), 'error': f'Language {language} not supported for IPA'})
     
-    lang_code = language_codes.get(language, 'en')
+    results = []
+    for word in words:
+        try:
+            results.append(transcribe_ipa(word, language) or '')
+        except Exception as e:
+            print(f"ERROR in /get_ipa_batch for '{word}': {str(e)}")
+            results.append('')
+    return jsonify({'ipa': results})
+
+# Map language names to language codes for gTTS
+AUDIO_LANGUAGE_CODES = {
+    'English': 'en',
+    'French': 'fr',
+    # Add more languages as needed
+}
+
+def audio_voice(language, audio_type):
+    """Pick the TTS engine for /get_audio.
+
+    Words use gTTS; phrases use AWS Polly for better quality.
+
+    Returns:
+        tuple: (engine, Polly voice ID or None, gTTS language code or None)
+    """
+    lang_code = AUDIO_LANGUAGE_CODES.get(language, 'en')
+    if audio_type == 'word':
+        return 'gtts', None, lang_code
+    # Choose an appropriate voice based on language
+    voice_id = 'Joanna' if lang_code == 'en' else 'Celine'  # Celine for French
+    return 'polly', voice_id, None
+
+def synthesize_audio(word, language, audio_type):
+    """Synthesize /get_audio speech and return it base64 encoded.
+
+    Returns:
+        tuple: (base64 audio or None, audio cache key of the clip)
+    """
+    engine, voice_id, lang_code = audio_voice(language, audio_type)
+    key = ipa_transcriber.audio_key(engine, word, voice=voice_id, lang=lang_code)
+
+    if engine == 'gtts':
+        # Use gTTS for word pronunciation
+        return ipa_transcriber.text_to_speech_gtts(
+            word, 
+            lang=lang_code, 
+            return_base64=True
+        ), key
+
+    # Use AWS Polly for phrase pronunciation (better quality)
+    return ipa_transcriber.text_to_speech_polly(
+        word,
+        voice_id=voice_id,
+        return_base64=True
+    ), key
+
+def audio_payload(audio_data, key):
+    """Build the /get_audio response body, pointing at the cached MP3 when there is one."""
+    payload = {'audio': audio_data}
+    if audio_data:
+        payload['audio_url'] = f'/audio/{key}.mp3'
+    return payload
+
+@app.route('/get_audio', methods=['POST'])
+def get_audio():
+    data = request.json
     
     try:
-        if audio_type == 'word':
-            # Use gTTS for word pronunciation
-            audio_data = ipa_transcriber.text_to_speech_gtts(
-                word, 
-                lang=lang_code, 
-                return_base64=True
-            )
-        else:
-            # Use AWS Polly for phrase pronunciation (better quality)
-            # Choose an appropriate voice based on language
-            voice_id = 'Joanna' if lang_code == 'en' else 'Celine'  # Celine for French
-            audio_data = ipa_transcriber.text_to_speech_polly(
-                word,
-                voice_id=voice_id,
-                return_base64=True
-            )
-        
-        return jsonify({'audio': audio_data})
+        audio_data, key = synthesize_audio(*audio_request(data))
+        return jsonify(audio_payload(audio_data, key))
     except Exception as e:
         print(f"Error generating audio: {str(e)}")
         return jsonify({'error': str(e)})
 
+@app.route('/get_audio', methods=['GET'])
+def stream_audio():
+    """Binary form of /get_audio: the MP3 itself, usable as an <audio> src.
+
+    Cached clips are served from disk with Range and conditional request
+    support. Otherwise the provider's stream is relayed as it arrives (and
+    cached once complete); a request for a range past the start waits for the
+    whole clip and is then answered from the cache.
+    """
+    word = request.args.get('word', '')
+    language = request.args.get('language', 'en')
+    audio_type = request.args.get('type', 'word')  # 'word' or 'phrase'
+    if not word.strip():
+        return jsonify({'error': 'No text provided'}), 400
+
+    engine, voice_id, lang_code = audio_voice(language, audio_type)
+    key = ipa_transcriber.audio_key(engine, word, voice=voice_id, lang=lang_code)
+    if engine == 'gtts':
+        chunks = ipa_transcriber.stream_gtts(word, lang=lang_code)
+    else:
+        chunks = ipa_transcriber.stream_polly(word, voice_id=voice_id)
+
+    try:
+        path = audio_cache.get_path(key, count_miss=False)
+        if path is None and request.range and request.range.ranges != [(0, None)]:
+            for _ in chunks:
+                pass
+            path = audio_cache.get_path(key, count_miss=False)
+        if path is not None:
+            chunks.close()
+            return send_file(path, mimetype='audio/mpeg', conditional=True,
+                             etag=key, max_age=24 * 3600)
+
+        # Pull the first chunk now so provider errors still get a JSON response
+        first = next(chunks, b'')
+    except Exception as e:
+        print(f"Error generating audio: {str(e)}")
+        return error_response(e, 502)
+    if not first:
+        return jsonify({'error': 'Failed to generate audio'}), 502
+
+    def relay():
+        yield first
+        yield from chunks
+
+    # Range is only honoured for clips served from the cache, so it isn't advertised here
+    return Response(stream_with_context(relay()), mimetype='audio/mpeg',
+                    headers={'X-Accel-Buffering': 'no'})
+
+@app.route('/audio/<key>.mp3')
+def cached_audio(key):
+    """Serve a cached clip; the URL is content-addressed, so it never changes."""
+    if not re.fullmatch(r'[0-9a-f]{64}', key):
+        return jsonify({'error': 'Invalid audio key'}), 404
+    path = audio_cache.get_path(key)
+    if path is None:
+        return jsonify({'error': 'Audio not found'}), 404
+    response = send_file(path, mimetype='audio/mpeg', max_age=365 * 24 * 3600)
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/test_ipa')
 def test_ipa():
     test_words = ["hello", "world", "test"]
@@ -237,42 +691,98 @@ def remove_recent_file():
         return jsonify({'success': False, 'error': 'No filename provided'}), 400
     
     try:
-        # Read the recent files from localStorage
-        # Note: We're not actually deleting the file, just removing it from the recent files list
-        recent_files = get_recent_files()
-        recent_files = [f for f in recent_files if f['filename'] != filename]
-        
-        # Here you could optionally save the updated list to a server-side storage
-        # For now, we just return success and let the client update its localStorage
-        
+        # We're not actually deleting the file, just hiding it from the recent files list
+        recent_files.hide(filename)
         return jsonify({'success': True, 'message': f'Removed {filename} from recent files'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/translate_text', methods=['POST'])
 def translate_text():
-    data = request.json
-    text = data.get('text', '')
-    model = data.get('model')
+    completion_args = translate_request(request.json)
     
-    if not text:
+    if completion_args is None:
         return jsonify({'error': 'No text provided'}), 400
     
     try:
-        # Create a simple prompt for translation
-        prompt = f"Translate this text to Vietnamese. Only return the translation, no additional text.\n\n{text}"
-        
         # Use the existing function to generate completion
-        translation = generate_completion(prompt, model=model)
+        translation = generate_completion(**completion_args)
         
         # Clean up any additional text the model might include
         translation = translation.strip()
         
         return jsonify({'translation': translation})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
+
+@app.route('/cache_stats')
+def cache_stats():
+    ipa = transcribe_ipa.cache_info()
+    ipa_lookups = ipa.hits + ipa.misses
+    return jsonify({
+        **response_cache.stats(),
+        'audio': audio_cache.stats(),
+        'ipa': {
+            'hits': ipa.hits,
+            'misses': ipa.misses,
+            'hit_rate': ipa.hits / ipa_lookups if ipa_lookups else 0.0,
+            'entries': ipa.currsize,
+        },
+        'single_flight': {'llm': completion_flight.stats(), 'tts': ipa_transcriber.tts_flight.stats()},
+        'batching': completion_batcher.stats(),
+    })
+
+def collect_cache_metrics():
+    """Metric families of the LLM response, audio and IPA caches and of call coalescing and batching."""
+    ipa = transcribe_ipa.cache_info()
+    caches = {
+        'llm': response_cache.stats(),
+        'audio': audio_cache.stats(),
+        'ipa': {'hits': ipa.hits, 'misses': ipa.misses, 'entries': ipa.currsize},
+    }
+    flights = {'llm': completion_flight.stats(), 'tts': ipa_transcriber.tts_flight.stats()}
+    batching = completion_batcher.stats()
+    return [
+        ('llm_batches_total', 'counter', 'Provider calls combining concurrent completions',
+         [('llm_batches_total', (), batching['batches'])]),
+        ('llm_batched_requests_total', 'counter', 'Completions answered from a combined call',
+         [('llm_batched_requests_total', (), batching['batched_requests'])]),
+        ('llm_batch_fallbacks_total', 'counter', 'Batchable completions that needed a call of their own',
+         [('llm_batch_fallbacks_total', (), batching['fallbacks'])]),
+        ('single_flight_calls_total', 'counter', 'Provider calls made by single-flight leaders',
+         [('single_flight_calls_total', (('flight', name),), stats['calls']) for name, stats in flights.items()]),
+        ('single_flight_coalesced_total', 'counter', 'Requests that shared an identical call in flight',
+         [('single_flight_coalesced_total', (('flight', name),), stats['coalesced']) for name, stats in flights.items()]),
+        ('cache_hits_total', 'counter', 'Cache lookups answered from the cache',
+         [('cache_hits_total', (('cache', name),), stats['hits']) for name, stats in caches.items()]),
+        ('cache_misses_total', 'counter', 'Cache lookups that missed',
+         [('cache_misses_total', (('cache', name),), stats['misses']) for name, stats in caches.items()]),
+        ('cache_entries', 'gauge', 'Entries held by the cache',
+         [('cache_entries', (('cache', name),), stats['entries']) for name, stats in caches.items() if 'entries' in stats]),
+        ('cache_bytes', 'gauge', 'Bytes held by the cache',
+         [('cache_bytes', (('cache', name),), stats['bytes']) for name, stats in caches.items() if 'bytes' in stats]),
+    ]
+
+metrics.registry.register_collector(collect_cache_metrics)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/outbound_stats')
+def outbound_stats():
+    return jsonify(outbound.stats())
+
+@app.route('/loader_stats')
+def loader_stats():
+    return jsonify({'epitran': epitran_models.stats(), 'clients': ipa_transcriber.clients.stats()})
 
 if __name__ == '__main__':
     # Use environment variables to determine the run mode
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
-    app.run(debug=debug_mode, host='0.0.0.0', port=7860)
+    if os.environ.get('SERVER_MODE', 'wsgi').lower() == 'asgi':
+        # Serve the provider-bound routes from async views (see asgi_app.py)
+        import uvicorn
+        uvicorn.run('asgi_app:app', host='0.0.0.0', port=7860, reload=debug_mode)
+    else:
+        app.run(debug=debug_mode, host='0.0.0.0', port=7860)
@@ -0,0 +1,107 @@
+"""
+ASGI entrypoint that serves the slow, provider-bound routes asynchronously.
+
+/generate_flashcard, /translate_text and /get_audio are handled by async
+Starlette endpoints sharing the Flask views' request parsing and error
+responses, so a slow LLM, Polly or gTTS round trip no longer holds a worker
+thread. Every other route, including the binary GET /get_audio stream, falls
+through to the Flask app unchanged.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 7860
+or:
+    SERVER_MODE=asgi python app.py
+"""
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from app import (
+    app as flask_app, audio_payload, audio_request, error_response, flashcard_payload,
+    flashcard_request, synthesize_audio, translate_request,
+)
+from llm_utils import agenerate_completion, completion_batcher, BATCHED_MODES
+import metrics
+
+# Polly (boto3) and gTTS (requests) have no async clients, so TTS calls run on
+# their own pool instead of the event loop or the WSGI fallback's threads.
+tts_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('TTS_THREADS', 64)),
+    thread_name_prefix='tts'
+)
+
+def instrumented(endpoint):
+    """Record an async endpoint's requests in the same metrics as the Flask routes."""
+    @functools.wraps(endpoint)
+    async def wrapper(request):
+        route = request.url.path
+        started = time.perf_counter()
+        if request.headers.get('content-length'):
+            metrics.http_request_bytes.labels(route).observe(int(request.headers['content-length']))
+        status = 500  # Unless the endpoint returns: Starlette answers an exception with a 500
+        try:
+            with metrics.http_requests_in_flight.track_inprogress():
+                response = await endpoint(request)
+            status = response.status_code
+            metrics.http_response_bytes.labels(route).observe(len(response.body))
+            return response
+        finally:
+            metrics.http_request_seconds.labels(route, request.method, status).observe(
+                time.perf_counter() - started
+            )
+    return wrapper
+
+@instrumented
+async def generate_flashcard(request):
+    data = await request.json()
+
+    try:
+        mode, completion_args = flashcard_request(data)
+        if mode in BATCHED_MODES:
+            content = await completion_batcher.asubmit(**completion_args)
+        else:
+            content = await agenerate_completion(**completion_args)
+        payload, status = flashcard_payload(mode, content)
+        return JSONResponse(payload, status_code=status)
+    except Exception as e:
+        return JSONResponse(*error_response(e))
+
+@instrumented
+async def translate_text(request):
+    completion_args = translate_request(await request.json())
+
+    if completion_args is None:
+        return JSONResponse({'error': 'No text provided'}, status_code=400)
+
+    try:
+        translation = await agenerate_completion(**completion_args)
+        return JSONResponse({'translation': translation.strip()})
+    except Exception as e:
+        return JSONResponse(*error_response(e))
+
+@instrumented
+async def get_audio(request):
+    data = await request.json()
+
+    try:
+        loop = asyncio.get_running_loop()
+        audio_data, key = await loop.run_in_executor(tts_executor, synthesize_audio, *audio_request(data))
+        return JSONResponse(audio_payload(audio_data, key))
+    except Exception as e:
+        print(f"Error generating audio: {str(e)}")
+        return JSONResponse({'error': str(e)})
+
+app = Starlette(routes=[
+    Route('/generate_flashcard', generate_flashcard, methods=['POST']),
+    Route('/translate_text', translate_text, methods=['POST']),
+    Route('/get_audio', get_audio, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
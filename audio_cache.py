@@ -0,0 +1,121 @@
+"""
+Content-addressed on-disk store of synthesized speech.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+class AudioCache:
+    """Store raw MP3 bytes on local disk, keyed by what was synthesized.
+
+    Each clip lives at ``<dir>/<key[:2]>/<key>.mp3`` where the key is a
+    SHA-256 of (engine, voice, lang, text). Reads refresh the file's mtime, and
+    once the total size exceeds ``max_bytes`` the least recently used clips are
+    deleted until the store is back under the cap.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        """Initialize the AudioCache.
+
+        Args:
+            cache_dir (str): Directory holding the cached clips
+            max_bytes (int): Size cap of the store in bytes
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._scan())
+
+    @staticmethod
+    def make_key(engine, voice, lang, text):
+        """Return the cache key of a clip."""
+        payload = json.dumps([engine, voice or '', lang or '', text], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        """Return the file path a clip is stored at (it may not exist)."""
+        return os.path.join(self.cache_dir, key[:2], key + '.mp3')
+
+    def _scan(self):
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.mp3'):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_mtime, stat.st_size
+
+    def get_path(self, key, count_miss=True):
+        """Return the path of a cached clip and mark it as used, or None.
+
+        Pass ``count_miss=False`` when a miss will be followed by a ``get``
+        of the same key, so it is only counted once.
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            if count_miss:
+                with self._lock:
+                    self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def get(self, key):
+        """Return the cached MP3 bytes for ``key``, or None on a miss."""
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        """Store MP3 bytes under ``key`` and evict clips over the size cap."""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Oldest mtime first; reads refresh mtime, so this is least recently used
+        target = self.max_bytes * 0.9
+        for path, _, size in sorted(self._scan(), key=lambda item: item[1]):
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        """Return hit/miss counters and the current store size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'bytes': self._total_bytes,
+            }
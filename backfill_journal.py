@@ -0,0 +1,82 @@
+"""
+Local checkpoint journal of the Supabase audio backfill.
+"""
+
+import os
+import sqlite3
+import threading
+
+class BackfillJournal:
+    """SQLite record of backfill progress and of the audio already generated.
+
+    ``processed`` holds the IDs of the cards written back to Supabase for each
+    job (e.g. phrase audio with a given voice), so an interrupted run can skip
+    them when restarted; a run that completes resets its job. ``audio`` maps
+    the content hash of a synthesized text to its base64 audio, so a text
+    shared by many cards, or seen again in a later run, is only sent to Polly
+    once.
+    """
+
+    def __init__(self, path):
+        """Open (or create) the journal database.
+
+        Args:
+            path (str): Path of the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " job TEXT NOT NULL,"
+            " card_id TEXT NOT NULL,"
+            " PRIMARY KEY (job, card_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS audio ("
+            " key TEXT PRIMARY KEY,"
+            " audio TEXT NOT NULL)"
+        )
+
+    def processed_ids(self, job):
+        """Return the set of card IDs already completed by ``job``.
+
+        IDs are returned as strings, whatever type they had when recorded.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT card_id FROM processed WHERE job = ?", (job,)).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_processed(self, job, card_ids):
+        """Record that ``card_ids`` were written back by ``job``."""
+        if not card_ids:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO processed (job, card_id) VALUES (?, ?)",
+                ((job, str(card_id)) for card_id in card_ids),
+            )
+            self._conn.execute("COMMIT")
+
+    def reset(self, job):
+        """Forget the progress of ``job`` (the audio map is kept)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM processed WHERE job = ?", (job,))
+
+    def get_audio(self, key):
+        """Return the base64 audio stored under ``key``, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT audio FROM audio WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_audio(self, key, audio):
+        """Store base64 ``audio`` under the content hash ``key``."""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO audio (key, audio) VALUES (?, ?)", (key, audio))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Load benchmark comparing the WSGI (Flask) and ASGI serving modes.
+
+Both servers run in-process against stubbed LLM and TTS providers with a fixed
+latency. The WSGI server uses a fixed-size worker thread pool, as a production
+WSGI server would, so it shows throughput capped by the thread count while the
+ASGI server keeps accepting work while provider calls are in flight.
+
+Usage:
+    python benchmarks/bench_async_serving.py --concurrency 50 --requests 500
+"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stubs
+
+stubs.setup_environment()
+
+import aiohttp
+import uvicorn
+from werkzeug.serving import BaseWSGIServer
+
+import app as flask_module
+import asgi_app
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that handles requests on a fixed pool of threads."""
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_wsgi(threads):
+    port = free_port()
+    server = PooledWSGIServer('127.0.0.1', port, flask_module.app, threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return port, server.shutdown
+
+def start_asgi():
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app.app, host='127.0.0.1', port=port,
+                                           log_level='warning', backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+    return port, stop
+
+def request_for(route, i):
+    """Return the JSON body for the i-th request to ``route``."""
+    if route == '/generate_flashcard':
+        # Unique prompts so the response cache doesn't short-circuit the provider
+        return {'prompt': f'bench prompt {i} {time.time()}', 'mode': 'flashcard'}
+    if route == '/translate_text':
+        return {'text': f'bench text {i} {time.time()}'}
+    return {'word': f'word{i}', 'language': 'English', 'type': 'phrase'}
+
+async def drive(port, route, total, concurrency):
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    errors = 0
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(f'http://127.0.0.1:{port}', connector=connector,
+                                     timeout=timeout) as session:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                i = queue.get_nowait()
+                start = time.perf_counter()
+                async with session.post(route, json=request_for(route, i)) as response:
+                    body = await response.json()
+                latencies.append(time.perf_counter() - start)
+                if response.status != 200 or 'error' in body:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WSGI vs ASGI serving with stubbed providers")
+    parser.add_argument("--concurrency", "-c", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--requests", "-n", type=int, default=500, help="Requests per route and mode")
+    parser.add_argument("--wsgi-threads", type=int, default=8, help="Worker threads of the WSGI server")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stubbed provider latency in seconds")
+    parser.add_argument("--routes", type=str, default="/generate_flashcard,/translate_text,/get_audio",
+                        help="Comma-separated routes to drive")
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    stubs.install_llm_stub(latency=args.latency)
+    stubs.install_tts_stub(flask_module.ipa_transcriber, latency=args.latency)
+
+    servers = {'wsgi': start_wsgi(args.wsgi_threads), 'asgi': start_asgi()}
+
+    print(f"\n{args.requests} requests per route, {args.concurrency} concurrent clients, "
+          f"{args.latency * 1000:.0f} ms provider latency, {args.wsgi_threads} WSGI threads")
+    print("-" * 72)
+    print(f"{'Route':<22} | {'Mode':<5} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'errors':>6}")
+    print("-" * 72)
+    for route in args.routes.split(','):
+        for mode, (port, _) in servers.items():
+            result = asyncio.run(drive(port, route, args.requests, args.concurrency))
+            print(f"{route:<22} | {mode:<5} | {result['rps']:>8.1f} | {result['p50']:>8.1f} | "
+                  f"{result['p95']:>8.1f} | {result['errors']:>6}")
+
+    for _, stop in servers.values():
+        stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk IPA transcription: per-word eng_to_ipa vs the preloaded lexicon.
+
+The per-word path (``IPATranscriber.get_ipa`` -> ``eng_to_ipa.convert``) opens
+and queries eng_to_ipa's SQLite dictionary on every call, which makes a full
+100k-word run take many minutes. It is therefore timed on a random sample of
+the list and extrapolated (pass ``--baseline-sample 0`` to time every word).
+The sampled results are also checked against the lexicon's.
+
+Usage:
+    python benchmarks/bench_ipa_lexicon.py --words 100000
+"""
+
+import argparse
+import random
+import time
+
+import stubs
+
+stubs.setup_environment()
+
+from ipa_lexicon import IPALexicon
+from ipa_speech import IPATranscriber
+
+def word_list(lexicon_words, count, unknown_ratio, seed):
+    """Return ``count`` words drawn from the lexicon, with some misspellings mixed in."""
+    rng = random.Random(seed)
+    words = []
+    for word in rng.choices(lexicon_words, k=count):
+        if rng.random() < unknown_ratio:
+            word += 'xq'
+        if rng.random() < 0.1:
+            word = word.capitalize() + rng.choice(',.!?')
+        words.append(word)
+    return words
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-word vs preloaded-lexicon IPA transcription")
+    parser.add_argument("--words", "-n", type=int, default=100000, help="Length of the word list")
+    parser.add_argument("--baseline-sample", type=int, default=2000,
+                        help="Words timed on the per-word path (0 = the whole list)")
+    parser.add_argument("--unknown-ratio", type=float, default=0.05, help="Share of words not in the lexicon")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the word list")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    lexicon_words = list(IPALexicon())
+    words = word_list(lexicon_words, args.words, args.unknown_ratio, args.seed)
+    print(f"{len(words)} words ({len(set(words))} distinct), built in {time.perf_counter() - start:.2f}s")
+
+    per_word = IPATranscriber()
+    sample = words
+    if 0 < args.baseline_sample < len(words):
+        sample = random.Random(args.seed + 1).sample(words, args.baseline_sample)
+    start = time.perf_counter()
+    expected = [per_word.get_ipa(word) for word in sample]
+    baseline = (time.perf_counter() - start) * len(words) / len(sample)
+
+    start = time.perf_counter()
+    preloaded = IPATranscriber(use_lexicon=True)
+    preloaded.clients.load('lexicon')
+    load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    results = preloaded.get_ipa_many(words)
+    bulk_time = time.perf_counter() - start
+    start = time.perf_counter()
+    preloaded.get_ipa_many(words)
+    warm_time = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(expected, preloaded.get_ipa_many(sample)))
+
+    estimated = " (extrapolated)" if len(sample) < len(words) else ""
+    print("-" * 60)
+    print(f"{'Path':<34} | {'seconds':>9} | {'words/s':>10}")
+    print("-" * 60)
+    print(f"{'per-word get_ipa' + estimated:<34} | {baseline:>9.2f} | {len(words) / baseline:>10.0f}")
+    print(f"{'lexicon load':<34} | {load_time:>9.2f} |")
+    print(f"{'get_ipa_many (cold memo)':<34} | {bulk_time:>9.2f} | {len(words) / bulk_time:>10.0f}")
+    print(f"{'get_ipa_many (warm memo)':<34} | {warm_time:>9.2f} | {len(words) / warm_time:>10.0f}")
+    print("-" * 60)
+    print(f"Speedup incl. load: {baseline / (load_time + bulk_time):.0f}x; "
+          f"{mismatches} mismatches on {len(sample)} sampled words; "
+          f"{sum(r is None for r in results)} failures")
+
+if __name__ == "__main__":
+    main()
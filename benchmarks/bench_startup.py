@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark of the Flask app.
+
+Each mode runs in a fresh interpreter and reports how long ``import app`` took
+and how long after process start the first requests were answered:
+
+    eager  import, then build every epitran model and TTS client up front
+           (how the app started before models were loaded lazily)
+    lazy   WARM_MODELS=False: everything is built on first use
+    warm   WARM_MODELS=True (the default): models build in background threads
+
+``all_loaded`` is when every epitran model had been built (not applicable in
+lazy mode, where only the models that were used get built).
+
+Usage:
+    python benchmarks/bench_startup.py --runs 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import stubs
+
+PROBE = r'''
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+import app
+imported = time.perf_counter()
+mode = sys.argv[1]
+if mode == 'eager':
+    for name in app.epitran_models:
+        app.epitran_models.load(name)
+    for name in app.ipa_transcriber.clients:
+        app.ipa_transcriber.clients.load(name)
+ready = time.perf_counter()
+
+client = app.app.test_client()
+client.get('/get_recent_files')
+first_request = time.perf_counter()
+client.post('/get_ipa', json={'word': 'hello', 'language': 'English'})
+english_ipa = time.perf_counter()
+client.post('/get_ipa', json={'word': 'bonjour', 'language': 'French'})
+french_ipa = time.perf_counter()
+
+if mode == 'warm':
+    while not all(stats['loaded'] for stats in app.epitran_models.stats().values()):
+        time.sleep(0.01)
+all_loaded = time.perf_counter()
+
+print(json.dumps({
+    'import': imported - started,
+    'ready': ready - started,
+    'first_request': first_request - started,
+    'english_ipa': english_ipa - started,
+    'french_ipa': french_ipa - started,
+    'all_loaded': all_loaded - started if mode != 'lazy' else None,
+    'loaders': {**app.epitran_models.stats(), **app.ipa_transcriber.clients.stats()},
+}))
+'''
+
+def run_probe(mode, env):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, mode], env=env, cwd=stubs.ROOT,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start with eager, lazy and background model loading")
+    parser.add_argument("--runs", "-r", type=int, default=3, help="Fresh processes per mode (median is reported)")
+    args = parser.parse_args()
+
+    stubs.setup_environment()
+    columns = ['import', 'ready', 'first_request', 'english_ipa', 'french_ipa', 'all_loaded']
+    print(f"Seconds since process start, median of {args.runs} runs")
+    print("-" * 84)
+    print(f"{'Mode':<6} | " + " | ".join(f"{column:>12}" for column in columns))
+    print("-" * 84)
+    loaders = {}
+    for mode in ('eager', 'lazy', 'warm'):
+        env = dict(os.environ, WARM_MODELS='True' if mode == 'warm' else 'False')
+        results = [run_probe(mode, env) for _ in range(args.runs)]
+        cells = []
+        for column in columns:
+            values = [result[column] for result in results if result[column] is not None]
+            cells.append(f"{statistics.median(values):>12.2f}" if values else f"{'-':>12}")
+        print(f"{mode:<6} | " + " | ".join(cells))
+        loaders = results[-1]['loaders']
+
+    print("-" * 84)
+    print("Load time of each lazily built object (last warm run):")
+    for name, stats in loaders.items():
+        seconds = f"{stats['seconds']:.2f}s" if stats['seconds'] is not None else 'not loaded'
+        print(f"  {name:<10} {seconds}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite of the hot routes and the Supabase backfill.
+
+Every scenario runs in a fresh interpreter against local stand-ins for
+litellm, Polly, gTTS and Supabase with a fixed latency and payload size, so
+runs don't depend on the network and peak RSS is measured per scenario.
+Inputs are unique per request (except in the burst scenario), so the
+response, IPA and audio caches miss and the full request path is measured.
+
+    flashcard, language, explain   POST /generate_flashcard in each mode
+    flashcard_burst                the same, with --concurrency clients at a
+                                   time sending an identical prompt
+    translate                      POST /translate_text
+    ipa                            POST /get_ipa
+    audio_word, audio_phrase       GET /get_audio (gTTS and Polly)
+    backfill                       fix_audio_supabase backfill of --requests cards
+
+Results can be saved with --output and compared with a previous run (e.g. of
+the parent commit) with --compare.
+
+Usage:
+    python benchmarks/bench_suite.py --requests 200 --concurrency 8 --output bench.json
+    python benchmarks/bench_suite.py --compare bench.json
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stubs
+
+SCENARIOS = ('flashcard', 'language', 'explain', 'flashcard_burst', 'translate', 'ipa', 'audio_word', 'audio_phrase',
+             'backfill')
+
+def llm_content(prompt, cards):
+    """Completion text of the LLM stand-in, shaped like the real one for the prompt's mode."""
+    inputs = re.findall(r'^Input (\d+):$', prompt, re.M)
+    if inputs:
+        # A batched prompt: one output per numbered input, keyed by its number
+        single = llm_content(prompt[:prompt.index('Input 1:')], cards)
+        item = json.loads(re.search(r'[\[{][\s\S]*[\]}]', single).group(0))
+        return json.dumps({number: item for number in inputs})
+    if 'Word: "' in prompt:
+        return 'Here is the card:\n' + json.dumps({
+            'word': 'example', 'definition': 'a thing characteristic of its kind', 'example': 'For example.'
+        })
+    if 'explain' in prompt:
+        return json.dumps({'explanation': 'An explanation of the selected text. ' * 20})
+    if 'translate' in prompt.lower():
+        return 'Bản dịch của đoạn văn.'
+    return json.dumps([
+        {'question': f'What is concept {i} of the selected text?', 'answer': f'Concept {i} is explained here.'}
+        for i in range(cards)
+    ])
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    return sorted_values[max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))]
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def run_backfill(args):
+    from fix_audio_supabase import FlashcardAudioGenerator
+    from ipa_speech import IPATranscriber
+
+    cards = [{'id': i, 'phrase': f'Example phrase number {i}.'} for i in range(args.requests)]
+    transcriber = IPATranscriber()
+    transcriber.polly_client = stubs.FakePolly(capacity=args.concurrency * 2, latency=args.tts_latency,
+                                               size=args.audio_size)
+    generator = FlashcardAudioGenerator(supabase=stubs.FakeSupabase(cards, latency=args.supabase_latency),
+                                        transcriber=transcriber, workers=args.concurrency)
+    start = time.perf_counter()
+    success_count, failed_ids = generator.generate_audio_for_flashcards(generator.get_flashcards_without_audio())
+    elapsed = time.perf_counter() - start
+    return {'requests': len(cards), 'seconds': elapsed, 'errors': len(failed_ids) + len(cards) - success_count,
+            'provider_calls': transcriber.polly_client.calls}
+
+def provider_calls():
+    import outbound
+    return sum(stats['calls'] for stats in outbound.stats().values())
+
+def run_route(scenario, args):
+    import app
+    from ipa_lexicon import IPALexicon
+
+    stubs.install_llm_stub(latency=args.llm_latency, content=lambda prompt: llm_content(prompt, args.cards))
+    stubs.install_gtts_stub(app.ipa_transcriber, latency=args.tts_latency, size=args.audio_size)
+    app.ipa_transcriber.polly_client = stubs.FakePolly(capacity=10 ** 6, latency=args.tts_latency,
+                                                       size=args.audio_size)
+    words = sorted(IPALexicon())
+    # Unique per run, so the on-disk response cache never answers
+    tag = f'{os.getpid()}-{time.time()}'
+
+    def request(client, i):
+        word = words[(i * 7919) % len(words)]
+        if scenario == 'flashcard_burst':
+            text = f'{tag} {i // args.concurrency}'
+            return client.post('/generate_flashcard', json={'text': text, 'mode': 'flashcard'})
+        if scenario == 'language':
+            fields = {'word': word, 'phrase': f'{tag} {i} {word}', 'target_language': 'Vietnamese'}
+            return client.post('/generate_flashcard', json={**fields, 'mode': 'language'})
+        if scenario in ('flashcard', 'explain'):
+            return client.post('/generate_flashcard', json={'text': f'{tag} {i}', 'mode': scenario})
+        if scenario == 'translate':
+            return client.post('/translate_text', json={'text': f'Text {tag} {i}'})
+        if scenario == 'ipa':
+            return client.post('/get_ipa', json={'word': word, 'language': 'English'})
+        audio_type = 'word' if scenario == 'audio_word' else 'phrase'
+        return client.get('/get_audio', query_string={'word': f'{word} {tag}', 'type': audio_type})
+
+    def timed(i):
+        client = app.app.test_client()
+        start = time.perf_counter()
+        response = request(client, i)
+        response.get_data()
+        elapsed = time.perf_counter() - start
+        ok = response.status_code == 200 and not (response.is_json and 'error' in response.get_json())
+        return elapsed, ok
+
+    # Warm up lazily built models and clients outside of the measurement
+    for i in range(args.requests, args.requests + args.warmup):
+        timed(i)
+
+    calls_before = provider_calls()
+    prompt_chars_before = stubs.llm_usage['prompt_chars']
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(timed, range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        'requests': len(results),
+        'seconds': elapsed,
+        'errors': sum(not ok for _, ok in results),
+        'provider_calls': provider_calls() - calls_before,
+        # Estimated LLM prompt tokens per request (about four characters per token)
+        'prompt_tokens': (stubs.llm_usage['prompt_chars'] - prompt_chars_before) / 4 / len(results),
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+    }
+
+def run_scenario(scenario, args):
+    """Run one scenario in this process and print its result as JSON."""
+    stubs.setup_environment()
+    # The routes print per request; keep that out of the result line
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        result = run_backfill(args) if scenario == 'backfill' else run_route(scenario, args)
+    finally:
+        sys.stdout = sys.__stdout__
+    result['throughput'] = result['requests'] / result['seconds']
+    result['peak_rss_mb'] = peak_rss_mb()
+    print(json.dumps(result))
+
+def spawn(scenario, argv):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-scenario', scenario] + argv,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=stubs.ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_comparison(results, baseline):
+    """Print the change of each scenario's throughput and latency against ``baseline``."""
+    print(f"Change vs {baseline['commit'] or 'baseline'} (throughput up and latency down are improvements)")
+    print("-" * 62)
+    print(f"{'Scenario':<15} | {'req/s':>9} | {'p50':>9} | {'p99':>9} | {'RSS':>9}")
+    print("-" * 62)
+    for scenario, result in results.items():
+        previous = baseline['results'].get(scenario)
+        if previous is None:
+            continue
+        cells = []
+        for column in ('throughput', 'p50', 'p99', 'peak_rss_mb'):
+            if result.get(column) is None or not previous.get(column):
+                cells.append(f"{'-':>9}")
+            else:
+                cells.append(f"{(result[column] - previous[column]) / previous[column] * 100:>+8.1f}%")
+        print(f"{scenario:<15} | " + " | ".join(cells))
+    print("-" * 62)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot routes and the backfill against stub providers")
+    parser.add_argument("--scenarios", type=str, default=','.join(SCENARIOS), help="Comma-separated scenarios")
+    parser.add_argument("--requests", "-n", type=int, default=200, help="Requests (or backfilled cards) per scenario")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="Concurrent clients (or backfill workers)")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each route scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stubbed LLM latency in seconds")
+    parser.add_argument("--tts-latency", type=float, default=0.03, help="Stubbed Polly/gTTS latency in seconds")
+    parser.add_argument("--supabase-latency", type=float, default=0.01, help="Stubbed Supabase latency in seconds")
+    parser.add_argument("--audio-size", type=int, default=32 * 1024, help="Bytes of each synthesized clip")
+    parser.add_argument("--cards", type=int, default=10, help="Flashcards in each stubbed completion")
+    parser.add_argument("--output", "-o", type=str, help="Save the results as JSON")
+    parser.add_argument("--compare", type=str, help="Results JSON of an earlier run to compare with")
+    parser.add_argument("--run-scenario", type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scenario:
+        run_scenario(args.run_scenario, args)
+        return
+
+    scenarios = args.scenarios.split(',')
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    print(f"{args.requests} requests per scenario, {args.concurrency} concurrent, LLM {args.llm_latency * 1000:.0f} ms, "
+          f"TTS {args.tts_latency * 1000:.0f} ms, {args.audio_size // 1024} KB clips (commit {git_commit()})")
+    print("-" * 100)
+    print(f"{'Scenario':<15} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | "
+          f"{'calls':>6} | {'tok/req':>7} | {'RSS MB':>7} | {'errors':>6}")
+    print("-" * 100)
+    results = {}
+    for scenario in scenarios:
+        result = results[scenario] = spawn(scenario, sys.argv[1:])
+        latencies = [f"{result[column]:>8.1f}" if column in result else f"{'-':>8}" for column in ('p50', 'p95', 'p99')]
+        tokens = f"{result['prompt_tokens']:>7.0f}" if 'prompt_tokens' in result else f"{'-':>7}"
+        print(f"{scenario:<15} | {result['throughput']:>8.1f} | " + " | ".join(latencies) +
+              f" | {result['provider_calls']:>6} | {tokens} | {result['peak_rss_mb']:>7.0f} | {result['errors']:>6}")
+    print("-" * 100)
+
+    if args.compare:
+        with open(args.compare) as file:
+            print_comparison(results, json.load(file))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'commit': git_commit(), 'args': vars(args), 'results': results}, file, indent=2)
+        print(f"Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Throughput of the Supabase audio backfill against local stand-ins.
+
+Polly and Supabase are replaced by in-process fakes with a fixed round-trip
+latency; the fake Polly also throttles calls above a concurrency cap, as the
+real service does. Cards are streamed from the fake table with keyset
+pagination, and the one-card-at-a-time baseline (one worker, one row per
+write) is compared with the pipelined backfill.
+
+Usage:
+    python benchmarks/bench_supabase_backfill.py --cards 500
+"""
+
+import argparse
+import time
+
+import stubs
+
+stubs.setup_environment()
+
+from fix_audio_supabase import FlashcardAudioGenerator
+from ipa_speech import IPATranscriber
+
+def run(cards, workers, batch_size, args):
+    supabase = stubs.FakeSupabase(cards, latency=args.supabase_latency)
+    polly = stubs.FakePolly(capacity=args.polly_capacity, latency=args.polly_latency)
+    transcriber = IPATranscriber()
+    transcriber.polly_client = polly
+    generator = FlashcardAudioGenerator(
+        supabase=supabase, transcriber=transcriber, workers=workers, batch_size=batch_size, max_retries=50
+    )
+
+    start = time.perf_counter()
+    success_count, failed_ids = generator.generate_audio_for_flashcards(generator.get_flashcards_without_audio())
+    elapsed = time.perf_counter() - start
+    return {
+        'cards_per_sec': len(cards) / elapsed,
+        'seconds': elapsed,
+        'writes': len(supabase.requests) - supabase.requests.count('select'),
+        'throttled': polly.throttled,
+        'failed': len(failed_ids),
+        'updated': success_count,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Supabase audio backfill with stubbed services")
+    parser.add_argument("--cards", "-n", type=int, default=500, help="Flashcards to backfill")
+    parser.add_argument("--workers", type=int, default=16, help="Polly workers of the pipelined run")
+    parser.add_argument("--batch-size", type=int, default=50, help="Rows written back together by the pipelined run")
+    parser.add_argument("--polly-latency", type=float, default=0.04, help="Polly call latency in seconds")
+    parser.add_argument("--polly-capacity", type=int, default=10, help="Concurrent Polly calls before throttling")
+    parser.add_argument("--supabase-latency", type=float, default=0.02, help="Supabase request latency in seconds")
+    args = parser.parse_args()
+
+    cards = [{'id': i, 'phrase': f'Example phrase number {i}.'} for i in range(args.cards)]
+    results = {
+        'sequential': run(cards, 1, 1, args),
+        'pipelined': run(cards, args.workers, args.batch_size, args),
+    }
+
+    print(f"\n{args.cards} cards, Polly {args.polly_latency * 1000:.0f} ms (throttles above "
+          f"{args.polly_capacity} concurrent), Supabase {args.supabase_latency * 1000:.0f} ms")
+    print("-" * 78)
+    print(f"{'Mode':<11} | {'cards/s':>8} | {'seconds':>8} | {'writes':>7} | {'throttled':>9} | "
+          f"{'updated':>7} | {'failed':>6}")
+    print("-" * 78)
+    for mode, result in results.items():
+        print(f"{mode:<11} | {result['cards_per_sec']:>8.1f} | {result['seconds']:>8.2f} | "
+              f"{result['writes']:>7} | {result['throttled']:>9} | {result['updated']:>7} | {result['failed']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Local stand-ins for the external providers used by the benchmarks.
+
+The stubs replace the provider calls at the module level, so the app's own
+routing, caching and parsing code still runs; only the network round trip is
+simulated with a configurable delay.
+"""
+
+import asyncio
+import base64
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+
+from botocore.exceptions import ClientError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def setup_environment():
+    """Make the repo importable and point its state at a scratch directory."""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.chdir(ROOT)  # models.yaml is loaded relative to the working directory
+    scratch = tempfile.mkdtemp(prefix='bench_')
+    os.environ.setdefault('LITELLM_LOCAL_MODEL_COST_MAP', 'True')
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.environ.setdefault('UPLOAD_FOLDER', os.path.join(scratch, 'uploads'))
+    os.environ.setdefault('LLM_CACHE_PATH', os.path.join(scratch, 'llm_cache.sqlite3'))
+    os.environ.setdefault('AUDIO_CACHE_FOLDER', os.path.join(scratch, 'audio_cache'))
+    # Background model loading would compete with the measured work for the CPU
+    os.environ.setdefault('WARM_MODELS', 'False')
+    return scratch
+
+def _completion_response(content):
+    message = types.SimpleNamespace(content=content)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+# Characters of prompt text sent to the LLM stand-in, across all calls
+llm_usage = {'prompt_chars': 0}
+_llm_lock = threading.Lock()
+
+def prompt_text(messages):
+    """Text of chat messages as one prompt, including system content blocks."""
+    parts = []
+    for message in messages:
+        content = message['content']
+        parts.append(content if isinstance(content, str) else ''.join(block['text'] for block in content))
+    return '\n\n'.join(parts)
+
+def install_llm_stub(latency=0.2, content='[{"question": "q", "answer": "a"}]'):
+    """Replace litellm's completion/acompletion in llm_utils with delayed fakes.
+
+    ``content`` is the completion text, or a function of the prompt returning it.
+    """
+    import llm_utils
+
+    def reply(messages):
+        prompt = prompt_text(messages)
+        with _llm_lock:
+            llm_usage['prompt_chars'] += len(prompt)
+        return content(prompt) if callable(content) else content
+
+    def completion(model, messages, api_key=None, **kwargs):
+        time.sleep(latency)
+        return _completion_response(reply(messages))
+
+    async def acompletion(model, messages, api_key=None, **kwargs):
+        await asyncio.sleep(latency)
+        return _completion_response(reply(messages))
+
+    llm_utils.completion = completion
+    llm_utils.acompletion = acompletion
+
+def install_tts_stub(transcriber, latency=0.3, size=16 * 1024):
+    """Replace the gTTS and Polly calls of an IPATranscriber with delayed fakes."""
+    audio = base64.b64encode(os.urandom(size)).decode('utf-8')
+
+    def text_to_speech(text, *args, **kwargs):
+        time.sleep(latency)
+        return audio
+
+    transcriber.text_to_speech_gtts = text_to_speech
+    transcriber.text_to_speech_polly = text_to_speech
+
+def install_gtts_stub(transcriber, latency=0.3, size=16 * 1024, parts=2):
+    """Replace the gTTS requests of an IPATranscriber, keeping its caching and retry layers."""
+    part = os.urandom(size // parts)
+
+    def gtts_parts(text, lang):
+        for _ in range(parts):
+            time.sleep(latency / parts)
+            yield part
+
+    transcriber._gtts_parts = gtts_parts
+
+class FakePolly:
+    """Polly client stand-in that throttles callers above ``capacity`` concurrent calls."""
+
+    def __init__(self, capacity=3, latency=0.005, size=None):
+        self.capacity = capacity
+        self.latency = latency
+        self.size = size
+        self.active = 0
+        self.calls = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def synthesize_speech(self, Text, OutputFormat, VoiceId):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            over = self.active > self.capacity
+            if over:
+                self.throttled += 1
+        try:
+            if over:
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}},
+                                  'SynthesizeSpeech')
+            time.sleep(self.latency)
+            audio = f'{VoiceId}:{Text}'.encode()
+            if self.size:
+                audio = audio.ljust(self.size, b'\0')
+            return {'AudioStream': io.BytesIO(audio)}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+class FakeQuery:
+    """Query builder of FakeSupabase supporting the filters the backfill uses."""
+
+    def __init__(self, table, op, payload):
+        self.table = table
+        self.op = op
+        self.payload = payload
+        self.filters = []
+        self.limit_count = None
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def is_(self, column, value):
+        # Only "null" is understood
+        self.filters.append(lambda row: row.get(column) is None)
+        return self
+
+    def or_(self, conditions):
+        # Only "<column>.is.null,<column>.eq.''" style conditions are understood
+        columns = {condition.split('.')[0] for condition in conditions.split(',')}
+        self.filters.append(lambda row: any(not row.get(column) for column in columns))
+        return self
+
+    def order(self, column):
+        self.order_by = column
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def _matches(self, row):
+        return all(condition(row) for condition in self.filters)
+
+    def execute(self):
+        time.sleep(self.table.latency)
+        self.table.requests.append(self.op)
+        if self.op == 'select':
+            rows = sorted((row for row in self.table.rows.values() if self._matches(row)), key=lambda row: row['id'])
+            # PostgREST silently caps the rows of a response
+            count = min(self.limit_count or len(rows), self.table.max_rows)
+            columns = [column.strip() for column in self.payload.split(',')]
+            return types.SimpleNamespace(data=[{column: row.get(column) for column in columns} for row in rows[:count]])
+        # Like PostgREST, an update returns the rows it changed (none if none match)
+        matched = [row for row in self.table.rows.values() if self._matches(row)]
+        for row in matched:
+            row.update(self.payload)
+        return types.SimpleNamespace(data=[dict(row) for row in matched])
+
+class FakeSupabase:
+    """Supabase stand-in: one in-memory table that records each request."""
+
+    def __init__(self, rows, latency=0.0, max_rows=1000):
+        self.rows = {row['id']: dict(row) for row in rows}
+        self.latency = latency
+        self.max_rows = max_rows
+        self.requests = []
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return FakeQuery(self, 'select', columns)
+
+    def update(self, values):
+        return FakeQuery(self, 'update', values)
+
+class FakeS3:
+    """In-memory S3 client stand-in implementing the calls of S3BlobStore."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.objects = {}
+        self.puts = 0
+        self._lock = threading.Lock()
+
+    def _missing(self, operation):
+        return ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, operation)
+
+    def head_object(self, Bucket, Key):
+        time.sleep(self.latency)
+        if (Bucket, Key) not in self.objects:
+            raise self._missing('HeadObject')
+        return {'ContentLength': len(self.objects[(Bucket, Key)]['Body'])}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.puts += 1
+            self.objects[(Bucket, Key)] = {'Body': Body, **kwargs}
+        return {}
+
+    def get_object(self, Bucket, Key):
+        time.sleep(self.latency)
+        if (Bucket, Key) not in self.objects:
+            raise self._missing('GetObject')
+        return {'Body': io.BytesIO(self.objects[(Bucket, Key)]['Body'])}
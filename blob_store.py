@@ -0,0 +1,151 @@
+"""
+Content-addressed stores for audio blobs referenced from flashcard rows.
+
+Blobs are keyed by the SHA-256 of their bytes, so storing the same clip twice
+is a no-op and a key never changes meaning. Two backends share one interface:
+
+    LocalBlobStore  files under a directory, e.g. a volume served statically
+    S3BlobStore     any S3-compatible bucket (AWS, MinIO, LocalStack, ...)
+
+``open_blob_store`` builds either one from a ``file://`` or ``s3://`` spec.
+"""
+
+import hashlib
+import os
+import threading
+from urllib.parse import urlparse
+
+# Blobs are immutable, so clients and CDNs may cache them indefinitely
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def blob_key(data):
+    """Return the content-hash key of ``data``."""
+    return hashlib.sha256(data).hexdigest()
+
+class LocalBlobStore:
+    """Store blobs as ``<root>/<key[:2]>/<key><suffix>`` on the local filesystem."""
+
+    def __init__(self, root, base_url=None, suffix='.mp3'):
+        """Initialize the LocalBlobStore.
+
+        Args:
+            root (str): Directory holding the blobs
+            base_url (str, optional): URL the directory is served at (file:// URLs if omitted)
+            suffix (str): File name extension of the blobs
+        """
+        self.root = os.path.abspath(root)
+        self.base_url = (base_url or 'file://' + self.root).rstrip('/')
+        self.suffix = suffix
+        os.makedirs(self.root, exist_ok=True)
+
+    def _relative_path(self, key):
+        return f"{key[:2]}/{key}{self.suffix}"
+
+    def put(self, data, content_type='audio/mpeg'):
+        """Store ``data`` and return its key."""
+        key = blob_key(data)
+        path = os.path.join(self.root, self._relative_path(key))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        return key
+
+    def get(self, key):
+        """Return the bytes stored under ``key``, or None."""
+        try:
+            with open(os.path.join(self.root, self._relative_path(key)), 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def url(self, key):
+        """Return the URL a stored blob can be fetched from."""
+        return f"{self.base_url}/{self._relative_path(key)}"
+
+class S3BlobStore:
+    """Store blobs as ``<prefix><key[:2]>/<key><suffix>`` objects in an S3-compatible bucket."""
+
+    def __init__(self, bucket, prefix='', client=None, endpoint_url=None, public_url=None, suffix='.mp3'):
+        """Initialize the S3BlobStore.
+
+        Args:
+            bucket (str): Bucket name
+            prefix (str): Key prefix of the blobs inside the bucket
+            client (optional): boto3 S3 client (created from the environment if omitted)
+            endpoint_url (str, optional): Endpoint of an S3-compatible service
+            public_url (str, optional): URL the bucket is publicly served at
+            suffix (str): Object name extension of the blobs
+        """
+        if client is None:
+            import boto3
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.suffix = suffix
+        if public_url is None:
+            public_url = f"{endpoint_url.rstrip('/')}/{bucket}" if endpoint_url else f"https://{bucket}.s3.amazonaws.com"
+        self.public_url = public_url.rstrip('/')
+
+    def _object_key(self, key):
+        return f"{self.prefix}{key[:2]}/{key}{self.suffix}"
+
+    def _exists(self, object_key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=object_key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def put(self, data, content_type='audio/mpeg'):
+        """Upload ``data`` unless it is already stored, and return its key."""
+        key = blob_key(data)
+        object_key = self._object_key(key)
+        if not self._exists(object_key):
+            self.client.put_object(
+                Bucket=self.bucket, Key=object_key, Body=data,
+                ContentType=content_type, CacheControl=CACHE_CONTROL
+            )
+        return key
+
+    def get(self, key):
+        """Return the bytes stored under ``key``, or None."""
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body'].read()
+        except ClientError:
+            return None
+
+    def url(self, key):
+        """Return the public URL of a stored blob."""
+        return f"{self.public_url}/{self._object_key(key)}"
+
+def open_blob_store(spec, public_url=None, client=None):
+    """Create a blob store from a spec string.
+
+    Args:
+        spec (str): ``s3://bucket/prefix`` or a directory (``file:///path`` or a plain path)
+        public_url (str, optional): URL the store is served at
+        client (optional): S3 client to use for ``s3://`` specs. Without one, a
+            client is created for S3_ENDPOINT_URL (if set) or AWS
+
+    Returns:
+        LocalBlobStore or S3BlobStore
+    """
+    parsed = urlparse(spec)
+    if parsed.scheme == 's3':
+        return S3BlobStore(
+            parsed.netloc, prefix=parsed.path, client=client,
+            endpoint_url=os.environ.get('S3_ENDPOINT_URL'), public_url=public_url
+        )
+    if parsed.scheme == 'file':
+        return LocalBlobStore(parsed.path, base_url=public_url)
+    if parsed.scheme:
+        raise ValueError(f"Unsupported blob store: {spec}")
+    return LocalBlobStore(spec, base_url=public_url)
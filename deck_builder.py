@@ -0,0 +1,204 @@
+"""
+Batch flashcard generation for whole documents.
+
+The document text is split into token-bounded chunks and each chunk is sent to
+the LLM on a bounded worker pool, with a per-provider request rate limit so a
+large book doesn't trip provider quotas. Progress is reported as each chunk
+finishes and the cards are merged into a single deck in document order.
+"""
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from json_stream import parse_json_array_objects
+from llm_utils import generate_completion, model_registry
+import prompts
+
+# Requests per minute allowed per provider (the model prefix before the first '/').
+# Override with DECK_RATE_LIMITS, e.g. "gemini=120,openrouter=30".
+DEFAULT_RATE_LIMITS = {
+    'gemini': 60,
+    'openrouter': 20,
+}
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+def chunk_text(pages, max_tokens=2000):
+    """Split page texts into chunks of at most ``max_tokens`` estimated tokens.
+
+    Chunks break on paragraph boundaries where possible; a paragraph longer
+    than the limit is split on whitespace.
+
+    Args:
+        pages (list): Text of each page, in order
+        max_tokens (int): Upper bound on the estimated tokens per chunk
+
+    Returns:
+        list: Dicts with the chunk ``text`` and its ``first_page``/``last_page``
+            (1-based)
+    """
+    max_chars = max_tokens * 4
+    chunks = []
+    current = []
+    current_len = 0
+    first_page = last_page = None
+
+    def flush():
+        nonlocal current, current_len, first_page
+        if current:
+            chunks.append({'text': '\n\n'.join(current), 'first_page': first_page, 'last_page': last_page})
+        current, current_len, first_page = [], 0, None
+
+    for page_number, page in enumerate(pages, start=1):
+        for paragraph in re.split(r'\n\s*\n', page):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+
+            pieces = [paragraph]
+            if len(paragraph) > max_chars:
+                pieces, piece = [], ''
+                for word in paragraph.split():
+                    if piece and len(piece) + len(word) + 1 > max_chars:
+                        pieces.append(piece)
+                        piece = ''
+                    piece = f"{piece} {word}" if piece else word
+                if piece:
+                    pieces.append(piece)
+
+            for piece in pieces:
+                if current and current_len + len(piece) + 2 > max_chars:
+                    flush()
+                if first_page is None:
+                    first_page = page_number
+                last_page = page_number
+                current.append(piece)
+                current_len += len(piece) + 2
+
+    flush()
+    return chunks
+
+class ProviderRateLimiter:
+    """Space out requests so each provider stays under its requests per minute."""
+
+    def __init__(self, limits=None, default_rpm=60):
+        self.limits = dict(DEFAULT_RATE_LIMITS if limits is None else limits)
+        self.default_rpm = default_rpm
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a limiter from the defaults and DECK_RATE_LIMITS.
+
+        Raises:
+            ValueError: If a rate is not a positive number
+        """
+        limits = dict(DEFAULT_RATE_LIMITS)
+        for item in os.environ.get('DECK_RATE_LIMITS', '').split(','):
+            if '=' in item:
+                provider, rpm = item.split('=', 1)
+                rpm = float(rpm)
+                if rpm <= 0:
+                    raise ValueError(f"DECK_RATE_LIMITS: rate of {provider.strip()} must be positive, got {rpm}")
+                limits[provider.strip()] = rpm
+        return cls(limits)
+
+    @staticmethod
+    def provider_for(model):
+        return model.split('/', 1)[0]
+
+    def acquire(self, model):
+        """Block until the next request slot for ``model``'s provider."""
+        provider = self.provider_for(model)
+        interval = 60.0 / self.limits.get(provider, self.default_rpm)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(provider, now))
+            self._next_slot[provider] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class DeckBuilder:
+    """Generate a deck from document pages with parallel LLM calls."""
+
+    def __init__(self, model=None, max_workers=4, max_tokens=2000, rate_limiter=None):
+        """Initialize the DeckBuilder.
+
+        Args:
+            model (str, optional): LLM model (the configured default if omitted)
+            max_workers (int): Maximum number of concurrent LLM calls
+            max_tokens (int): Estimated token budget of each chunk
+            rate_limiter (ProviderRateLimiter, optional): Rate limiter shared by
+                all concurrent builders (a new one from the environment if omitted)
+
+        Raises:
+            ValueError: If ``max_workers`` or ``max_tokens`` is less than 1
+        """
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+        if max_tokens < 1:
+            raise ValueError(f"chunk_tokens must be at least 1, got {max_tokens}")
+        self.model = model or model_registry.default_model
+        self.max_workers = max_workers
+        self.max_tokens = max_tokens
+        self.rate_limiter = rate_limiter or ProviderRateLimiter.from_env()
+
+    def cards_for_chunk(self, chunk):
+        """Generate the flashcards for one chunk, tagged with its first page."""
+        self.rate_limiter.acquire(self.model)
+        # Same template as manual selections, so they share the response cache
+        system, prompt = prompts.render('flashcard', text=chunk['text'])
+        content = generate_completion(prompt, model=self.model, mode='flashcard', system=system)
+        cards = parse_json_array_objects(content)
+        return [dict(card, page=chunk['first_page']) for card in cards if isinstance(card, dict)]
+
+    def build(self, pages):
+        """Generate a deck, yielding progress events as chunks complete.
+
+        Args:
+            pages (list): Text of each page, in order
+
+        Yields:
+            dict: A ``start`` event with the chunk count, a ``progress`` event
+                per finished chunk and a final ``deck`` event with the merged,
+                de-duplicated flashcards
+        """
+        chunks = chunk_text(pages, self.max_tokens)
+        yield {'type': 'start', 'chunks': len(chunks), 'pages': len(pages)}
+
+        results = [None] * len(chunks)
+        failed = []
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='deck')
+        try:
+            futures = {pool.submit(self.cards_for_chunk, chunk): i for i, chunk in enumerate(chunks)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    print(f"Error generating flashcards for chunk {i}: {e}")
+                    failed.append(i)
+                    results[i] = []
+                yield {'type': 'progress', 'done': done, 'total': len(chunks),
+                       'cards': len(results[i]), 'failed': len(failed)}
+        finally:
+            # Stop queued chunks if the client goes away mid-build
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        deck = []
+        seen = set()
+        for cards in results:
+            for card in cards:
+                key = re.sub(r'\s+', ' ', str(card.get('question', ''))).strip().lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                deck.append(card)
+
+        yield {'type': 'deck', 'flashcards': deck, 'failed_chunks': sorted(failed)}
@@ -0,0 +1,130 @@
+"""
+Server-side text extraction for uploaded documents.
+
+PDFs are split per page, EPUBs per spine chapter and TXT files per form feed
+(usually a single page).
+"""
+
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.epub')
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collect the visible text of an (X)HTML document."""
+
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'tr', 'section', 'blockquote'}
+    SKIP_TAGS = {'script', 'style', 'head', 'title'}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+    def text(self):
+        text = ''.join(self.parts)
+        text = re.sub(r'[ \t\r\f\v]+', ' ', text)
+        return re.sub(r'\n\s*\n+', '\n\n', text).strip()
+
+def html_to_text(html):
+    """Return the visible text of an HTML string."""
+    extractor = _HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def epub_spine_paths(archive):
+    """Return the zip paths of an EPUB's content documents in reading order.
+
+    Args:
+        archive (zipfile.ZipFile): Open EPUB archive
+
+    Returns:
+        list: Paths of the spine items inside the archive
+    """
+    container = ET.fromstring(archive.read('META-INF/container.xml'))
+    rootfile = next(el for el in container.iter() if _local_name(el.tag) == 'rootfile')
+    opf_path = rootfile.attrib['full-path']
+    opf_dir = posixpath.dirname(opf_path)
+
+    opf = ET.fromstring(archive.read(opf_path))
+    manifest = {}
+    spine = []
+    for el in opf.iter():
+        name = _local_name(el.tag)
+        if name == 'item':
+            manifest[el.attrib.get('id')] = el.attrib.get('href')
+        elif name == 'itemref':
+            spine.append(el.attrib.get('idref'))
+
+    paths = []
+    for idref in spine:
+        href = manifest.get(idref)
+        if href:
+            paths.append(posixpath.normpath(posixpath.join(opf_dir, href.split('#')[0])))
+    return paths
+
+def extract_pages(path):
+    """Extract the text of a document, one string per page or chapter.
+
+    Args:
+        path (str): Path to a PDF, EPUB or TXT file
+
+    Returns:
+        list: Text of each page (PDF), spine chapter (EPUB) or form-feed
+            separated section (TXT)
+    """
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == '.txt':
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            return file.read().split('\f')
+
+    if ext == '.pdf':
+        # Import pypdf here to make it optional
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+        pages = []
+        for page in reader.pages:
+            try:
+                pages.append(page.extract_text() or '')
+            except Exception as e:
+                print(f"Error extracting PDF page text: {e}")
+                pages.append('')
+        return pages
+
+    if ext == '.epub':
+        with zipfile.ZipFile(path) as archive:
+            chapters = []
+            for item_path in epub_spine_paths(archive):
+                try:
+                    html = archive.read(item_path).decode('utf-8', errors='replace')
+                except KeyError:
+                    continue
+                chapters.append(html_to_text(html))
+            return chapters
+
+    raise ValueError(f"Unsupported file type: {ext}")
@@ -3,136 +3,455 @@
 Script to update flashcards in Supabase with AWS Polly audio.
 This script fetches flashcards that don't have phrase_audio, generates it using AWS Polly,
 and updates the records in Supabase.
+
+Cards are processed as a pipeline: a bounded pool of threads calls Polly,
+backing off and lowering its concurrency when Polly throttles, while finished
+rows are written back to Supabase in batches. Rows are only ever updated:
+cards sharing the same audio are set with a single ``update ... where id in``,
+and the text columns are never written, so concurrent edits and deletions
+made during a run are left alone.
+
+With --blob-store, the MP3s are kept in object storage (or a directory) and
+the audio columns hold their URLs, with the content hash in a companion
+``<column>_key`` column (``phrase_audio_key``, ``word_audio_key``), instead of
+base64 audio. --migrate-to-blobs moves audio already stored inline.
 """
 
 import os
 import sys
 import argparse
+import base64
+import random
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from botocore.exceptions import ClientError
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from backfill_journal import BackfillJournal
+from blob_store import open_blob_store
 from ipa_speech import IPATranscriber
+from outbound import THROTTLING_ERROR_CODES
 from tqdm import tqdm
 
 # Load environment variables from .env file
 load_dotenv()
 
+def is_throttling_error(error):
+    """Return True if ``error`` is an AWS rate-limit error."""
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+class AdaptiveThrottle:
+    """Concurrency limit for Polly calls that adapts to throttling.
+
+    The limit is halved and new calls pause for a jittered, exponentially
+    growing delay whenever a call is throttled; after enough calls succeed in
+    a row it grows back by one, up to ``max_concurrency``.
+    """
+
+    def __init__(self, max_concurrency, increase_after=20, backoff=0.5, max_backoff=30.0):
+        """Initialize the AdaptiveThrottle.
+
+        Args:
+            max_concurrency (int): Upper bound of concurrent calls
+            increase_after (int): Consecutive successes before the limit grows by one
+            backoff (float): Pause in seconds after a first throttling error
+            max_backoff (float): Longest pause in seconds
+        """
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.increase_after = increase_after
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.throttled = 0  # total throttling errors seen
+        self._active = 0
+        self._successes = 0
+        self._consecutive_throttles = 0
+        self._resume_at = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Block until a call may start."""
+        with self._condition:
+            while True:
+                delay = self._resume_at - time.monotonic()
+                if delay <= 0 and self._active < self.limit:
+                    self._active += 1
+                    return
+                self._condition.wait(timeout=delay if delay > 0 else None)
+
+    def release(self, throttled=False):
+        """Record the outcome of a call started with ``acquire``."""
+        with self._condition:
+            self._active -= 1
+            if throttled:
+                self.throttled += 1
+                self._successes = 0
+                self._consecutive_throttles += 1
+                self.limit = max(1, self.limit // 2)
+                delay = min(self.max_backoff, self.backoff * 2 ** (self._consecutive_throttles - 1))
+                self._resume_at = max(self._resume_at, time.monotonic() + delay * random.uniform(0.5, 1.0))
+            else:
+                self._consecutive_throttles = 0
+                self._successes += 1
+                if self._successes >= self.increase_after and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
 class FlashcardAudioGenerator:
     """Class for generating audio for flashcards and updating Supabase."""
     
-    def __init__(self):
-        """Initialize the FlashcardAudioGenerator."""
-        # Set up Supabase client
-        supabase_url = os.environ.get('SUPABASE_URL')
-        supabase_key = os.environ.get('SUPABASE_KEY')
+    def __init__(self, supabase=None, transcriber=None, workers=8, batch_size=50, max_retries=5, page_size=1000,
+                 journal=None, blob_store=None):
+        """Initialize the FlashcardAudioGenerator.
         
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL and SUPABASE_KEY environment variables must be set")
+        Args:
+            supabase (Client, optional): Supabase client (created from SUPABASE_URL/SUPABASE_KEY if omitted)
+            transcriber (IPATranscriber, optional): Transcriber used for Polly calls
+            workers (int): Maximum number of concurrent Polly calls
+            batch_size (int): Number of finished rows written back together
+            max_retries (int): Retries of a card whose Polly call was throttled
+            page_size (int): Flashcards fetched from Supabase per request
+            journal (BackfillJournal, optional): Checkpoint of progress and generated audio
+            blob_store (LocalBlobStore or S3BlobStore, optional): Where to keep the MP3s;
+                rows then get a URL and key instead of base64 audio
+        """
+        if supabase is None:
+            from supabase import create_client
+            
+            # Set up Supabase client
+            supabase_url = os.environ.get('SUPABASE_URL')
+            supabase_key = os.environ.get('SUPABASE_KEY')
+            
+            if not supabase_url or not supabase_key:
+                raise ValueError("SUPABASE_URL and SUPABASE_KEY environment variables must be set")
+            
+            supabase = create_client(supabase_url, supabase_key)
+        self.supabase = supabase
         
-        self.supabase = create_client(supabase_url, supabase_key)
+        # Initialize the IPATranscriber for audio generation. Throttled Polly
+        # calls are retried by the AdaptiveThrottle, which also lowers the
+        # concurrency, so the outbound layer only retries other failures.
+        self.transcriber = transcriber or IPATranscriber()
+        self.transcriber.polly_outbound = self.transcriber.polly_outbound.with_options(retry_throttled=False)
         
-        # Initialize the IPATranscriber for audio generation
-        self.transcriber = IPATranscriber()
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.page_size = page_size
+        self.journal = journal
+        self.blob_store = blob_store
         
         # Set the table name
         self.table_name = "flashcards"
     
+    def iter_flashcards(self, columns, filters, description="flashcards"):
+        """Stream matching flashcards page by page, in id order.
+        
+        Pages are fetched with keyset pagination (``id > last_id ORDER BY id
+        LIMIT page_size``), so every matching row is reached however many
+        there are, even where PostgREST caps the rows of a single response.
+        The next page is fetched in the background while the current one is
+        being consumed.
+        
+        Args:
+            columns (str): Columns to select (must include ``id``)
+            filters (callable): Adds the row filters to a query builder
+            description (str): What is being fetched, for error messages
+            
+        Yields:
+            dict: Flashcard records
+            
+        Raises:
+            Exception: The error of a failed page fetch, so a failed scan is
+                never mistaken for the end of the data
+        """
+        def fetch_page(last_id):
+            query = filters(self.supabase.table(self.table_name).select(columns))
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            return query.order("id").limit(self.page_size).execute().data
+        
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch') as prefetcher:
+            try:
+                page = fetch_page(None)
+                # A short page doesn't mean the end: the server may cap page sizes
+                while page:
+                    next_page = prefetcher.submit(fetch_page, page[-1]["id"])
+                    yield from page
+                    page = next_page.result()
+            except Exception as e:
+                print(f"Error retrieving {description}: {e}")
+                raise
+    
     def get_all_flashcards(self):
         """Retrieve all flashcards for audio update, regardless of existing audio.
         
         Returns:
-            list: List of flashcard records
+            iterator: Flashcard records, fetched page by page
         """
-        try:
-            # Query for all flashcards with a phrase (non-null and non-empty)
-            response = (self.supabase.table(self.table_name)
-                .select("id, phrase")
-                .neq("phrase", None)                 # Checks for non-null (IS NOT NULL)
-                .neq("phrase", "")                   # Checks for non-empty string
-                .execute())
-            
-            return response.data
-        except Exception as e:
-            print(f"Error retrieving flashcards: {e}")
-            return []
+        # Query for all flashcards with a phrase (non-null and non-empty)
+        return self.iter_flashcards("id, phrase", lambda query: query
+            .neq("phrase", None)                 # Checks for non-null (IS NOT NULL)
+            .neq("phrase", ""))                  # Checks for non-empty string
     
     def get_flashcards_without_audio(self):
-        """Retrieve flashcards that don't have phrase_audio."""
-        try:
-            # Query for records where phrase_audio is null or empty,
-            # while ensuring the phrase field is non-null and non-empty.
-            response = (self.supabase.table(self.table_name)
-                .select("id, phrase")
-                .neq("phrase", None)
-                .neq("phrase", "")
-                .or_("phrase_audio.is.null,phrase_audio.eq.''")
-                .execute())
+        """Retrieve flashcards that don't have phrase_audio.
+        
+        Returns:
+            iterator: Flashcard records, fetched page by page
+        """
+        # Query for records where phrase_audio is null or empty,
+        # while ensuring the phrase field is non-null and non-empty.
+        return self.iter_flashcards("id, phrase", lambda query: query
+            .neq("phrase", None)
+            .neq("phrase", "")
+            .or_("phrase_audio.is.null,phrase_audio.eq.''"),
+            description="flashcards without audio")
+    
+    def synthesize(self, text, voice_id, throttle):
+        """Generate base64 MP3 audio with Polly, retrying throttled calls.
+        
+        Args:
+            text (str): Text to synthesize
+            voice_id (str): AWS Polly voice ID
+            throttle (AdaptiveThrottle): Shared concurrency limit
+            
+        Returns:
+            str: Base64 encoded audio, or None if Polly returned none
+        """
+        for attempt in range(self.max_retries + 1):
+            throttle.acquire()
+            throttled = False
+            try:
+                audio_data = self.transcriber.synthesize_polly(text, voice_id=voice_id, output_format="mp3")
+                return base64.b64encode(audio_data).decode('utf-8') if audio_data else None
+            except ClientError as e:
+                throttled = is_throttling_error(e)
+                if not throttled or attempt == self.max_retries:
+                    raise
+            finally:
+                throttle.release(throttled)
+    
+    def audio_columns(self, audio_field, audio_base64):
+        """Return the columns a card's audio is written to.
+        
+        Without a blob store the base64 audio goes into ``audio_field``. With
+        one, the MP3 bytes are stored there and the row only gets the blob URL
+        in ``audio_field`` and its content-hash key in ``<audio_field>_key``.
+        
+        Args:
+            audio_field (str): Audio column, e.g. ``phrase_audio``
+            audio_base64 (str): Base64 encoded MP3
             
-            return response.data
-        except Exception as e:
-            print(f"Error retrieving flashcards without audio: {e}")
+        Returns:
+            dict: Column -> value
+        """
+        if self.blob_store is None:
+            return {audio_field: audio_base64}
+        key = self.blob_store.put(base64.b64decode(audio_base64))
+        return {audio_field: self.blob_store.url(key), f"{audio_field}_key": key}
+    
+    def synthesize_columns(self, text, voice_id, throttle, audio_field):
+        """Synthesize ``text`` and store it as ``audio_columns`` describes.
+        
+        Returns:
+            tuple: (base64 audio, columns), or (None, None) if Polly returned no audio
+        """
+        audio_base64 = self.synthesize(text, voice_id, throttle)
+        if not audio_base64:
+            return None, None
+        return audio_base64, self.audio_columns(audio_field, audio_base64)
+    
+    def write_rows(self, rows):
+        """Write finished rows back to Supabase.
+        
+        Rows setting identical values (cards sharing the same audio) are
+        written with one ``update ... where id in (...)``, and the groups are
+        written concurrently. Rows are never inserted, so a card deleted during
+        the run is not recreated; it is reported as not written.
+        
+        Args:
+            rows (list): Dicts with ``id`` and the columns to set
+            
+        Returns:
+            list: IDs of the rows that could not be written
+        """
+        groups = {}
+        for row in rows:
+            values = {column: value for column, value in row.items() if column != "id"}
+            groups.setdefault(tuple(sorted(values.items())), (values, []))[1].append(row["id"])
+        if not groups:
             return []
+        
+        def update(group):
+            values, ids = group
+            try:
+                response = self.supabase.table(self.table_name).update(values).in_("id", ids).execute()
+            except Exception as e:
+                tqdm.write(f"Error updating cards {ids}: {e}")
+                return ids
+            written = {row.get("id") for row in response.data or []}
+            missing = [card_id for card_id in ids if card_id not in written]
+            if missing:
+                tqdm.write(f"Cards {missing} no longer exist, not updated")
+            return missing
+        
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(groups)), thread_name_prefix='supabase') as writer:
+            return [card_id for missing in writer.map(update, groups.values()) for card_id in missing]
     
-    def generate_audio_for_flashcards(self, flashcards, voice_id="Joanna"):
-        """Generate audio for a batch of flashcards and update Supabase.
+    @staticmethod
+    def job_name(audio_field, voice_id):
+        """Return the journal job under which a backfill's progress is recorded."""
+        return f"{audio_field}:{voice_id}"
+    
+    def backfill_audio(self, flashcards, text_field, audio_field, voice_id="Joanna", extra_fields=None):
+        """Generate audio for many flashcards concurrently and store it in batches.
+        
+        Cards sharing the same text are synthesized once. With a journal, cards
+        an interrupted run already wrote back are skipped, and audio generated by
+        earlier runs is reused. A run that gets through all its cards clears
+        the job's progress, so the next run (e.g. with --all) starts afresh.
         
         Args:
-            flashcards (list): List of flashcard records to process
+            flashcards (iterable): Flashcard records with ``id`` and ``text_field``;
+                a stream is consumed as the pipeline has room for more cards
+            text_field (str): Column holding the text to synthesize
+            audio_field (str): Column receiving the base64 audio
             voice_id (str): AWS Polly voice ID to use for all flashcards
+            extra_fields (callable, optional): Returns further columns to set on each row
             
         Returns:
             tuple: (success_count, failed_ids)
         """
+        job = self.job_name(audio_field, voice_id)
+        done_ids = self.journal.processed_ids(job) if self.journal else set()
+        throttle = AdaptiveThrottle(self.workers)
         success_count = 0
+        skipped = 0
+        synthesized = 0
         failed_ids = []
+        rows = []
+        # Bound the audio held in memory while Supabase writes catch up
+        window = self.workers * 4
+        cards = iter(flashcards)
+        pending = {}  # Future -> (content key, cards waiting for that audio)
+        in_flight = {}  # content key -> Future
+        # Content key -> blob columns, so audio is uploaded once per run however many cards use it
+        stored = {}
         
-        print(f"Processing {len(flashcards)} flashcards...")
+        def add_row(card, columns):
+            # The text column isn't written back: it may have been edited since the scan
+            rows.append({"id": card["id"], **columns})
         
-        # Use tqdm for a progress bar
-        for card in tqdm(flashcards, desc="Generating Audio"):
-            card_id = card.get("id")
-            phrase = card.get("phrase", "")
-            
-            # Skip if no phrase to process
-            if not phrase or phrase.strip() == "":
-                tqdm.write(f"Skipping card {card_id}: empty phrase")
-                failed_ids.append(card_id)
-                continue
-            
-            try:
-                tqdm.write(f"Generating audio for card {card_id}, voice: {voice_id}")
-                tqdm.write(f"Phrase: '{phrase[:50]}{'...' if len(phrase) > 50 else ''}'")
-                
-                # Generate the audio
-                start_time = time.time()
-                audio_base64 = self.transcriber.text_to_speech_polly(
-                    phrase, 
-                    voice_id=voice_id,
-                    output_format="mp3",
-                    return_base64=True
-                )
-                duration = time.time() - start_time
-                
-                if audio_base64:
-                    # Update the record in Supabase
-                    self.supabase.table(self.table_name) \
-                        .update({"phrase_audio": audio_base64, "updated_at": datetime.now().isoformat()}) \
-                        .eq("id", card_id) \
-                        .execute()
+        def flush():
+            nonlocal success_count
+            # Extra columns are computed once per batch, so rows with the same audio stay identical
+            extra = extra_fields() if extra_fields else {}
+            failed = self.write_rows([{**row, **extra} for row in rows])
+            success_count += len(rows) - len(failed)
+            failed_ids.extend(failed)
+            if self.journal:
+                failed = set(failed)
+                self.journal.mark_processed(job, [row["id"] for row in rows if row["id"] not in failed])
+            rows.clear()
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='polly') as executor, \
+                tqdm(total=len(flashcards) if hasattr(flashcards, '__len__') else None,
+                     desc=f"Generating {audio_field}") as progress:
+            def refill():
+                nonlocal skipped, synthesized
+                while len(pending) < window and len(rows) < self.batch_size:
+                    card = next(cards, None)
+                    if card is None:
+                        return
+                    if str(card.get("id")) in done_ids:
+                        skipped += 1
+                        progress.update(1)
+                        continue
+                    text = card.get(text_field) or ""
+                    # Skip if no text to process
+                    if text.strip() == "":
+                        tqdm.write(f"Skipping card {card.get('id')}: empty {text_field}")
+                        failed_ids.append(card.get("id"))
+                        progress.update(1)
+                        continue
                     
-                    success_count += 1
-                    tqdm.write(f"✅ Updated card {card_id} with audio ({len(audio_base64)} chars, {duration:.2f}s)")
-                else:
-                    tqdm.write(f"❌ Failed to generate audio for card {card_id}")
-                    failed_ids.append(card_id)
+                    key = self.transcriber.audio_key('polly', text, voice=voice_id)
+                    if key in in_flight:
+                        pending[in_flight[key]][1].append(card)
+                        continue
+                    columns = stored.get(key)
+                    if columns is None:
+                        audio_base64 = self.journal.get_audio(key) if self.journal else None
+                        if audio_base64:
+                            columns = self.audio_columns(audio_field, audio_base64)
+                            if self.blob_store is not None:
+                                stored[key] = columns
+                    if columns:
+                        add_row(card, columns)
+                        progress.update(1)
+                        continue
+                    future = executor.submit(self.synthesize_columns, text, voice_id, throttle, audio_field)
+                    pending[future] = (key, [card])
+                    in_flight[key] = future
+                    synthesized += 1
             
-            except Exception as e:
-                tqdm.write(f"Error processing card {card_id}: {e}")
-                failed_ids.append(card_id)
+            while True:
+                refill()
+                if len(rows) >= self.batch_size:
+                    flush()
+                    continue
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, waiting = pending.pop(future)
+                    del in_flight[key]
+                    try:
+                        audio_base64, columns = future.result()
+                    except Exception as e:
+                        tqdm.write(f"Error processing card {waiting[0]['id']}: {e}")
+                        audio_base64 = columns = None
+                    if audio_base64 and self.journal:
+                        self.journal.put_audio(key, audio_base64)
+                    if columns and self.blob_store is not None:
+                        stored[key] = columns
+                    for card in waiting:
+                        if columns:
+                            add_row(card, columns)
+                        else:
+                            tqdm.write(f"❌ Failed to generate audio for card {card['id']}")
+                            failed_ids.append(card["id"])
+                    progress.update(len(waiting))
+            flush()
         
+        if self.journal:
+            # Every card was attempted; failed ones are found again by the next scan
+            self.journal.reset(job)
+        print(f"Synthesized {synthesized} distinct texts; skipped {skipped} cards already processed")
+        if throttle.throttled:
+            print(f"Polly throttled {throttle.throttled} calls; concurrency ended at {throttle.limit}")
         return success_count, failed_ids
     
+    def generate_audio_for_flashcards(self, flashcards, voice_id="Joanna"):
+        """Generate audio for a batch of flashcards and update Supabase.
+        
+        Args:
+            flashcards (iterable): Flashcard records to process
+            voice_id (str): AWS Polly voice ID to use for all flashcards
+            
+        Returns:
+            tuple: (success_count, failed_ids)
+        """
+        if hasattr(flashcards, '__len__'):
+            print(f"Processing {len(flashcards)} flashcards...")
+        return self.backfill_audio(
+            flashcards, "phrase", "phrase_audio", voice_id=voice_id,
+            extra_fields=lambda: {"updated_at": datetime.now().isoformat()}
+        )
+    
     def update_word_audio(self, voice_id="Joanna"):
         """Update the word_audio field for flashcards that have the field empty.
         
@@ -142,57 +461,78 @@ class FlashcardAudioGenerator:
         Returns:
             tuple: (success_count, failed_ids)
         """
-        try:
-            # Query for records where word_audio is null or empty but word is not empty
-            response = (self.supabase.table(self.table_name)
-                .select("id, word")
-                .neq("word", None)
-                .neq("word", "")
-                .or_("word_audio.is.null,word_audio.eq.''")
-                .execute())
-            
-            flashcards = response.data
-            success_count = 0
-            failed_ids = []
-            
-            print(f"Processing word audio for {len(flashcards)} flashcards...")
+        # Query for records where word_audio is null or empty but word is not empty
+        flashcards = self.iter_flashcards("id, word", lambda query: query
+            .neq("word", None)
+            .neq("word", "")
+            .or_("word_audio.is.null,word_audio.eq.''"),
+            description="flashcards without word audio")
+        
+        print("Processing word audio for flashcards without it...")
+        return self.backfill_audio(flashcards, "word", "word_audio", voice_id=voice_id)
+
+    
+    def migrate_to_blob_store(self, audio_field):
+        """Move the base64 audio stored in ``audio_field`` into the blob store.
+        
+        Each row with inline audio and no ``<audio_field>_key`` gets the
+        audio's blob URL and key instead. Uploads run on the worker pool and
+        rows are written back in batches, so the migration can be interrupted
+        and rerun: migrated rows no longer match.
+        
+        Args:
+            audio_field (str): Audio column to migrate, e.g. ``phrase_audio``
             
-            # Use tqdm for progress bar
-            for card in tqdm(flashcards, desc="Generating Word Audio"):
-                card_id = card.get("id")
-                word = card.get("word", "")
-                
-                try:
-                    # Generate audio for just the word
-                    audio_base64 = self.transcriber.text_to_speech_polly(
-                        word, 
-                        voice_id=voice_id,
-                        output_format="mp3",
-                        return_base64=True
-                    )
-                    
-                    if audio_base64:
-                        # Update the record
-                        self.supabase.table(self.table_name) \
-                            .update({"word_audio": audio_base64}) \
-                            .eq("id", card_id) \
-                            .execute()
-                        
-                        success_count += 1
-                        tqdm.write(f"✅ Updated word audio for card {card_id}")
-                    else:
-                        tqdm.write(f"❌ Failed to generate word audio for card {card_id}")
-                        failed_ids.append(card_id)
-                
-                except Exception as e:
-                    tqdm.write(f"Error processing word audio for card {card_id}: {e}")
-                    failed_ids.append(card_id)
+        Returns:
+            tuple: (migrated_count, failed_ids)
+        """
+        if self.blob_store is None:
+            raise ValueError("A blob store is required to migrate audio")
+        
+        key_field = f"{audio_field}_key"
+        flashcards = self.iter_flashcards(f"id, {audio_field}", lambda query: query
+            .neq(audio_field, None)
+            .neq(audio_field, "")
+            .is_(key_field, "null"),
+            description=f"flashcards with inline {audio_field}")
+        
+        def upload(card):
+            value = card[audio_field]
+            if value.startswith(("http://", "https://", "file://")):
+                # Already a reference, only the key column is missing
+                return {"id": card["id"], audio_field: value, key_field: value.rsplit("/", 1)[-1].split(".")[0]}
+            return {"id": card["id"], **self.audio_columns(audio_field, value)}
+        
+        migrated_count = 0
+        failed_ids = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='blob') as executor:
+            def migrate_batch(batch):
+                rows = []
+                futures = [executor.submit(upload, card) for card in batch]
+                for card, future in zip(batch, futures):
+                    try:
+                        rows.append(future.result())
+                    except Exception as e:
+                        tqdm.write(f"❌ Failed to migrate audio of card {card['id']}: {e}")
+                        failed_ids.append(card["id"])
+                failed = self.write_rows(rows) if rows else []
+                failed_ids.extend(failed)
+                return len(rows) - len(failed)
             
-            return success_count, failed_ids
+            with tqdm(desc=f"Migrating {audio_field}", unit="card") as progress:
+                batch = []
+                for card in flashcards:
+                    batch.append(card)
+                    if len(batch) >= self.batch_size:
+                        migrated_count += migrate_batch(batch)
+                        progress.update(len(batch))
+                        batch = []
+                if batch:
+                    migrated_count += migrate_batch(batch)
+                    progress.update(len(batch))
         
-        except Exception as e:
-            print(f"Error updating word audio: {e}")
-            return 0, []
+        print(f"Migrated {migrated_count} {audio_field} values to {type(self.blob_store).__name__}")
+        return migrated_count, failed_ids
 
 
 def main():
@@ -200,13 +540,47 @@ def main():
     parser.add_argument("--word-audio", action="store_true", help="Update word audio instead of phrase audio")
     parser.add_argument("--all", action="store_true", help="Update all flashcards, even those with existing audio")
     parser.add_argument("--voice", type=str, default="Joanna", help="AWS Polly voice ID to use (default: Joanna)")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum concurrent Polly calls (default: 8)")
+    parser.add_argument("--batch-size", type=int, default=50, help="Rows written back together (default: 50)")
+    parser.add_argument("--page-size", type=int, default=1000, help="Flashcards fetched per Supabase request (default: 1000)")
+    parser.add_argument("--journal", type=str, default="backfill_journal.sqlite3",
+                        help="Checkpoint file used to resume an interrupted run and to reuse generated audio "
+                             "('' to disable)")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore the progress an interrupted run recorded in the journal")
+    parser.add_argument("--blob-store", type=str, default=os.environ.get("AUDIO_BLOB_STORE"),
+                        help="Store audio in s3://bucket/prefix or a directory and write its URL to the row "
+                             "(needs <audio column>_key columns)")
+    parser.add_argument("--blob-url", type=str, default=os.environ.get("AUDIO_BLOB_URL"),
+                        help="Public URL the blob store is served at")
+    parser.add_argument("--migrate-to-blobs", action="store_true",
+                        help="Move existing inline audio of both audio columns into the blob store")
     
     args = parser.parse_args()
+    if args.migrate_to_blobs and not args.blob_store:
+        parser.error("--migrate-to-blobs requires --blob-store")
     
     try:
-        generator = FlashcardAudioGenerator()
+        journal = BackfillJournal(args.journal) if args.journal else None
+        if journal and args.restart:
+            journal.reset(FlashcardAudioGenerator.job_name(
+                "word_audio" if args.word_audio else "phrase_audio", args.voice
+            ))
         
-        if args.word_audio:
+        blob_store = open_blob_store(args.blob_store, public_url=args.blob_url) if args.blob_store else None
+        generator = FlashcardAudioGenerator(
+            workers=args.workers, batch_size=args.batch_size, page_size=args.page_size, journal=journal,
+            blob_store=blob_store
+        )
+        start_time = time.time()
+        
+        if args.migrate_to_blobs:
+            success_count, failed_ids = 0, []
+            for audio_field in ("phrase_audio", "word_audio"):
+                migrated, failed = generator.migrate_to_blob_store(audio_field)
+                success_count += migrated
+                failed_ids.extend(failed)
+        elif args.word_audio:
             # Update word audio
             print("Updating word audio for all eligible flashcards...")
             success_count, failed_ids = generator.update_word_audio(voice_id=args.voice)
@@ -219,16 +593,19 @@ def main():
                 print("Getting flashcards WITHOUT audio...")
                 flashcards = generator.get_flashcards_without_audio()
             
-            if not flashcards:
-                print("No flashcards found that match the criteria.")
-                return
-            
             # Generate audio and update the records
             success_count, failed_ids = generator.generate_audio_for_flashcards(flashcards, voice_id=args.voice)
         
+        duration = time.time() - start_time
+        processed = success_count + len(failed_ids)
+        if processed == 0:
+            print("No flashcards found that match the criteria.")
+            return
+        
         # Print summary
         print("\n--- Summary ---")
         print(f"Successfully updated {success_count} flashcards")
+        print(f"Processed {processed} cards in {duration:.1f}s ({processed / duration if duration else 0:.2f} cards/sec)")
         if failed_ids:
             print(f"Failed to update {len(failed_ids)} flashcards with IDs: {failed_ids}")
         
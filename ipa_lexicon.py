@@ -0,0 +1,81 @@
+"""
+In-memory English pronunciation lexicon for bulk IPA transcription.
+
+``eng_to_ipa.convert`` opens its SQLite copy of the CMU dictionary and runs a
+query on every call. This module loads the same dictionary (from the JSON copy
+eng_to_ipa ships) once, and resolves whole lists of texts against it with
+eng_to_ipa's own tokenizer and IPA formatting, so results match ``convert``.
+"""
+
+import json
+import os
+import threading
+
+import eng_to_ipa
+from eng_to_ipa.transcribe import cmu_to_ipa, preserve_punc
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(eng_to_ipa.__file__), 'resources', 'CMU_dict.json')
+
+class IPALexicon:
+    """Read-only word -> CMU phonemes table with a per-word IPA memo."""
+
+    def __init__(self, path=DEFAULT_LEXICON_PATH):
+        """Load the lexicon.
+
+        Args:
+            path (str): JSON file mapping lower-case words to lists of CMU
+                pronunciations, in eng_to_ipa's ``CMU_dict.json`` format
+        """
+        with open(path, 'r', encoding='utf-8') as file:
+            self._phonemes = {word: tuple(pronunciations) for word, pronunciations in json.load(file).items()}
+        self._ipa = {}  # word -> formatted IPA, filled on first use
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._phonemes)
+
+    def __iter__(self):
+        return iter(self._phonemes)
+
+    def __contains__(self, word):
+        return word in self._phonemes
+
+    def word_ipa(self, word):
+        """Return the IPA of one lower-case, punctuation-free token.
+
+        Unknown words come back unchanged with a trailing ``*``, as in
+        ``eng_to_ipa.convert``.
+        """
+        ipa = self._ipa.get(word)
+        if ipa is not None:
+            return ipa
+        pronunciations = self._phonemes.get(word)
+        if pronunciations is None:
+            return cmu_to_ipa([['__IGNORE__' + word]], stress_marking='both')[0][-1]
+        ipa = cmu_to_ipa([list(pronunciations)], stress_marking='both')[0][-1]
+        with self._lock:
+            self._ipa[word] = ipa
+        return ipa
+
+    def convert_many(self, texts):
+        """Transcribe many texts at once.
+
+        Every text is tokenized once, each distinct token is looked up once,
+        and the transcriptions are then reassembled with their punctuation.
+
+        Args:
+            texts (list): Plain-text words or phrases
+
+        Returns:
+            list: IPA of each text, equal to ``eng_to_ipa.convert(text)``
+        """
+        tokenized = [[preserve_punc(token.lower())[0] for token in text.split()] for text in texts]
+        resolved = {}
+        for tokens in tokenized:
+            for _, word, _ in tokens:
+                if word not in resolved:
+                    resolved[word] = self.word_ipa(word)
+        return [
+            ' '.join(before + resolved[word] + after for before, word, after in tokens)
+            for tokens in tokenized
+        ]
@@ -10,28 +10,76 @@ import argparse
 import base64
 from datetime import datetime
 import eng_to_ipa
-import time
 import boto3
 import re
+import urllib.request
 from botocore.exceptions import BotoCoreError, ClientError
 from dotenv import load_dotenv
+from audio_cache import AudioCache
+from ipa_lexicon import IPALexicon
+from lazy_loader import LazyLoader
+import metrics
+import outbound
+from single_flight import CallAbandoned, SingleFlight
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Read size of provider audio streams
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Audio payload in the lines of a Google Translate TTS response
+GTTS_AUDIO_PATTERN = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
 class IPATranscriber:
     """Class for handling IPA transcription and text-to-speech operations."""
     
-    def __init__(self):
-        """Initialize the IPATranscriber."""
+    def __init__(self, audio_cache=None, use_lexicon=False):
+        """Initialize the IPATranscriber.
+        
+        The Polly client and the pronunciation lexicon are built on first use;
+        call ``self.clients.warm()`` to build them in the background instead.
+        
+        Args:
+            audio_cache (AudioCache, optional): Store checked before synthesizing speech
+            use_lexicon (bool): Transcribe with the in-memory pronunciation lexicon
+                instead of querying eng_to_ipa's database on every call
+        """
+        self.audio_cache = audio_cache
+        # Timeout, retry and circuit breaker policy of the TTS providers
+        self.polly_outbound = outbound.get_client('polly')
+        self.gtts_outbound = outbound.get_client('gtts')
+        # Identical clips requested concurrently are synthesized once
+        self.tts_flight = SingleFlight()
+        self.clients = LazyLoader({'polly': self._create_polly_client})
+        if use_lexicon:
+            self.clients.register('lexicon', IPALexicon)
+    
+    @staticmethod
+    def _create_polly_client():
         # Initialize AWS Polly client
-        self.polly_client = boto3.client(
+        return boto3.client(
             'polly', 
             region_name='us-east-1',
             aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY')
+            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
+            config=outbound.boto_config('polly')
         )
     
+    @property
+    def polly_client(self):
+        """AWS Polly client, created on first use."""
+        return self.clients['polly']
+    
+    @polly_client.setter
+    def polly_client(self, client):
+        self.clients.set('polly', client)
+    
+    @property
+    def lexicon(self):
+        """In-memory IPALexicon (loaded on first use), or None if not enabled."""
+        return self.clients['lexicon'] if 'lexicon' in self.clients else None
+    
     def strip_html_tags(self, text):
         """Remove HTML tags from text.
         
@@ -57,12 +105,215 @@ class IPATranscriber:
             clean_word = self.strip_html_tags(word)
             
             # Get IPA transcription
+            if self.lexicon is not None:
+                return self.lexicon.convert_many([clean_word])[0]
             ipa = eng_to_ipa.convert(clean_word)
             return ipa
         except Exception as e:
             print(f"Error with eng_to_ipa: {e}")
             return None
     
+    def get_ipa_many(self, words):
+        """Convert many English texts to IPA in one pass.
+        
+        Uses the preloaded lexicon when there is one, otherwise a single
+        eng_to_ipa call per text.
+        
+        Args:
+            words (list): Texts to transcribe
+            
+        Returns:
+            list: IPA transcription of each text (None where it failed)
+        """
+        # Only texts that can contain a tag need the regex
+        clean_words = [self.strip_html_tags(word) if '<' in word else word for word in words]
+        if self.lexicon is None:
+            return [self.get_ipa(word) for word in clean_words]
+        try:
+            return self.lexicon.convert_many(clean_words)
+        except Exception as e:
+            print(f"Error with IPA lexicon: {e}")
+            return [None] * len(words)
+    
+    def audio_key(self, engine, text, voice=None, lang=None):
+        """Return the audio cache key of a clip.
+        
+        Args:
+            engine (str): 'polly' or 'gtts'
+            text (str): Text to synthesize (HTML tags are ignored)
+            voice (str, optional): AWS Polly voice ID
+            lang (str, optional): gTTS language code
+            
+        Returns:
+            str: Key of the clip in the audio cache
+        """
+        return AudioCache.make_key(engine, voice, lang, self.strip_html_tags(text))
+    
+    def stream_polly(self, text, voice_id='Joanna', output_format='mp3'):
+        """Stream speech from AWS Polly, checking the audio cache first.
+        
+        Chunks are yielded as they arrive from Polly's ``AudioStream``; once the
+        stream has been read to the end the clip is added to the audio cache.
+        Concurrent requests for the same MP3 clip share one Polly call.
+        
+        Args:
+            text (str): Text to synthesize
+            voice_id (str): AWS Polly voice ID
+            output_format (str): Audio format (mp3, ogg_vorbis, pcm); only mp3 is cached
+            
+        Yields:
+            bytes: Chunks of audio data (nothing if Polly returned no audio stream)
+        """
+        # Remove HTML tags before text-to-speech
+        clean_text = self.strip_html_tags(text)
+        
+        if output_format != 'mp3':
+            # Only MP3 clips are cached and shared
+            yield from self._polly_chunks(clean_text, voice_id, output_format)
+            return
+        yield from self._shared_stream(
+            self.audio_key('polly', clean_text, voice=voice_id),
+            lambda: self._polly_chunks(clean_text, voice_id, output_format)
+        )
+    
+    def _polly_chunks(self, clean_text, voice_id, output_format):
+        print(f"Polly synthesizing: '{clean_text}'")
+        
+        # Only actual synthesis is timed; cache hits never get here
+        with metrics.stage_seconds.time('polly'):
+            # Request speech synthesis
+            response = self.polly_outbound.call(
+                self.polly_client.synthesize_speech,
+                Text=clean_text,
+                OutputFormat=output_format,
+                VoiceId=voice_id
+            )
+            
+            if "AudioStream" not in response:
+                print("No AudioStream found in the response")
+                return
+            
+            stream = response['AudioStream']
+            try:
+                yield from iter(lambda: stream.read(STREAM_CHUNK_SIZE), b'')
+            finally:
+                stream.close()
+    
+    def _shared_stream(self, key, produce):
+        """Yield clip ``key`` from the audio cache, an identical synthesis in flight, or ``produce()``.
+        
+        The caller that synthesizes gets the chunks as they arrive and adds the
+        clip to the audio cache once complete. Callers asking for the same clip
+        meanwhile wait for it and get the whole clip at once; if the synthesizing
+        caller stops reading early, one of them synthesizes it instead.
+        """
+        while True:
+            if self.audio_cache is not None:
+                cached = self.audio_cache.get(key)
+                if cached is not None:
+                    yield cached
+                    return
+            future, leader = self.tts_flight.begin(key)
+            if leader:
+                break
+            try:
+                audio = future.result()
+            except CallAbandoned:
+                continue
+            if audio:
+                yield audio
+            return
+        
+        chunks = []
+        try:
+            for chunk in produce():
+                chunks.append(chunk)
+                yield chunk
+        except GeneratorExit:
+            self.tts_flight.finish(key, error=CallAbandoned())
+            raise
+        except BaseException as e:
+            self.tts_flight.finish(key, error=e)
+            raise
+        audio = b''.join(chunks)
+        if self.audio_cache is not None and audio:
+            self.audio_cache.put(key, audio)
+        self.tts_flight.finish(key, audio)
+    
+    def synthesize_polly(self, text, voice_id='Joanna', output_format='mp3'):
+        """Synthesize speech with AWS Polly, checking the audio cache first.
+        
+        Args:
+            text (str): Text to synthesize
+            voice_id (str): AWS Polly voice ID
+            output_format (str): Audio format (mp3, ogg_vorbis, pcm); only mp3 is cached
+            
+        Returns:
+            bytes: Raw audio data, or None if Polly returned no audio stream
+        """
+        return b''.join(self.stream_polly(text, voice_id, output_format)) or None
+    
+    def stream_gtts(self, text, lang='en'):
+        """Stream MP3 speech from gTTS, checking the audio cache first.
+        
+        Each part gTTS fetches is yielded as soon as it is decoded; once all
+        parts are read the clip is added to the audio cache. Concurrent
+        requests for the same clip share one synthesis.
+        
+        Args:
+            text (str): Text to synthesize
+            lang (str): Language code
+            
+        Yields:
+            bytes: Chunks of MP3 data
+        """
+        # Remove HTML tags before text-to-speech
+        clean_text = self.strip_html_tags(text)
+        
+        yield from self._shared_stream(
+            self.audio_key('gtts', clean_text, lang=lang),
+            lambda: self.gtts_outbound.stream(lambda: self._gtts_parts(clean_text, lang))
+        )
+    
+    def _gtts_parts(self, text, lang):
+        """Fetch gTTS audio over the shared keep-alive session.
+        
+        Same requests and decoding as ``gTTS.stream``, which opens a new
+        session (and TLS connection) for every part of the text. This relies
+        on gTTS internals, so the gTTS version is pinned in requirements.txt.
+        """
+        # Import gTTS here to make it optional
+        from gtts import gTTS
+        from gtts.tts import gTTSError
+        
+        tts = gTTS(text, lang=lang)
+        session = outbound.http_session()
+        with metrics.stage_seconds.time('gtts'):
+            for request in tts._prepare_requests():
+                response = session.send(request, proxies=urllib.request.getproxies(),
+                                        timeout=self.gtts_outbound.timeout)
+                if response.status_code >= 400:
+                    raise gTTSError(tts=tts, response=response)
+                for line in response.iter_lines(chunk_size=1024):
+                    decoded_line = line.decode('utf-8')
+                    if 'jQ1olc' in decoded_line:
+                        match = GTTS_AUDIO_PATTERN.search(decoded_line)
+                        if not match:
+                            raise gTTSError(tts=tts, response=response)
+                        yield base64.b64decode(match.group(1).encode('ascii'))
+    
+    def synthesize_gtts(self, text, lang='en'):
+        """Synthesize MP3 speech with gTTS, checking the audio cache first.
+        
+        Args:
+            text (str): Text to synthesize
+            lang (str): Language code
+            
+        Returns:
+            bytes: Raw MP3 data
+        """
+        return b''.join(self.stream_gtts(text, lang))
+    
     def text_to_speech_polly(self, text, voice_id='Joanna', output_format='mp3', 
                             save_path=None, return_base64=False):
         """Generate speech using AWS Polly.
@@ -83,42 +334,26 @@ class IPATranscriber:
                 print("Warning: Empty text provided to text_to_speech_polly")
                 return None
             
-            # Remove HTML tags before text-to-speech
-            clean_text = self.strip_html_tags(text)
-            print(f"Polly synthesizing: '{clean_text}'")
-            
             # If no save path is provided and we're not returning base64, create a path
             if save_path is None and not return_base64:
                 timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
                 save_path = f"test_audio_{timestamp}.{output_format}"
             
-            start_time = time.time()
-            
-            # Request speech synthesis
-            response = self.polly_client.synthesize_speech(
-                Text=clean_text,
-                OutputFormat=output_format,
-                VoiceId=voice_id
-            )
-            
-            duration = time.time() - start_time
+            audio_data = self.synthesize_polly(text, voice_id=voice_id, output_format=output_format)
             
             # Handle the audio data based on the return_base64 flag
-            if "AudioStream" in response:
-                audio_data = response['AudioStream'].read()
-                
-                if return_base64:
-                    # Convert audio data to base64 string
-                    base64_audio = base64.b64encode(audio_data).decode('utf-8')
-                    return base64_audio
-                else:
-                    # Save audio to file
-                    with open(save_path, 'wb') as file:
-                        file.write(audio_data)
-                    return save_path
-            else:
-                print("No AudioStream found in the response")
+            if audio_data is None:
                 return None
+            
+            if return_base64:
+                # Convert audio data to base64 string
+                base64_audio = base64.b64encode(audio_data).decode('utf-8')
+                return base64_audio
+            else:
+                # Save audio to file
+                with open(save_path, 'wb') as file:
+                    file.write(audio_data)
+                return save_path
                 
         except (BotoCoreError, ClientError) as error:
             print(f"Error with AWS Polly: {error}")
@@ -140,34 +375,22 @@ class IPATranscriber:
             str: Path to saved audio file or base64 encoded audio string
         """
         try:
-            # Remove HTML tags before text-to-speech
-            clean_text = self.strip_html_tags(text)
-            
-            # Import gTTS here to make it optional
-            from gtts import gTTS
-            import io
-            
             # If no save path is provided and we're not returning base64, create one
             if save_path is None and not return_base64:
                 timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
                 save_path = f"test_audio_{timestamp}.mp3"
             
             # Create TTS audio
-            start_time = time.time()
-            tts = gTTS(clean_text, lang=lang)
+            audio_data = self.synthesize_gtts(text, lang=lang)
             
             if return_base64:
-                # Save to BytesIO object instead of file
-                mp3_fp = io.BytesIO()
-                tts.write_to_fp(mp3_fp)
-                mp3_fp.seek(0)
-                
                 # Convert to base64
-                base64_audio = base64.b64encode(mp3_fp.read()).decode('utf-8')
+                base64_audio = base64.b64encode(audio_data).decode('utf-8')
                 return base64_audio
             else:
                 # Save to file
-                tts.save(save_path)
+                with open(save_path, 'wb') as file:
+                    file.write(audio_data)
                 return save_path
                 
         except Exception as e:
@@ -175,6 +398,14 @@ class IPATranscriber:
             return None
 
 
+def print_synthesis_time(stage):
+    """Print the synthesis time recorded in ``stage_duration_seconds``, if the clip was synthesized."""
+    timed = metrics.stage_seconds.labels(stage).snapshot()
+    if timed['count']:
+        print(f"Generation time: {timed['sum']:.2f} seconds")
+    else:
+        print("Served from the audio cache")
+
 def main():
     parser = argparse.ArgumentParser(description="Test IPA transcription and text-to-speech")
     parser.add_argument("--word", "-w", type=str, help="Word to transcribe/speak")
@@ -214,8 +445,8 @@ def main():
         print("Please provide words using --word, --words-list, or --words-file")
         return
     
-    # Create transcriber instance
-    transcriber = IPATranscriber()
+    # Create transcriber instance; a word list is worth loading the lexicon for
+    transcriber = IPATranscriber(use_lexicon=len(words) > 1)
     
     # Process each word
     results = []
@@ -224,8 +455,7 @@ def main():
     print(f"{'Word':<20} | {'IPA Transcription'}")
     print("-" * 40)
     
-    for word in words:
-        ipa = transcriber.get_ipa(word)
+    for word, ipa in zip(words, transcriber.get_ipa_many(words)):
         results.append((word, ipa))
         print(f"{word:<20} | {ipa if ipa else 'Failed to transcribe'}")
     
@@ -239,30 +469,26 @@ def main():
     if args.tts_service == "gtts":
         print(f"\n--- Testing gTTS for: '{words[0]}' in {args.tts_lang} ---")
         print(f"Generating audio...")
-        start_time = time.time()
         result = transcriber.text_to_speech_gtts(words[0], args.tts_lang, args.output, args.base64)
-        duration = time.time() - start_time
         result_type = "Base64 audio" if args.base64 else "Audio file"
         if result:
             if args.base64:
                 print(f"Generated base64 audio string ({len(result)} characters)")
             else:
                 print(f"Audio saved to: {os.path.abspath(result)}")
-            print(f"Generation time: {duration:.2f} seconds")
+            print_synthesis_time(args.tts_service)
     else:  # default to polly
         print(f"\n--- Testing AWS Polly for: '{words[0]}' with voice {args.voice_id} ---")
-        start_time = time.time()
         result = transcriber.text_to_speech_polly(
             words[0], args.voice_id, args.output_format, args.output, args.base64
         )
-        duration = time.time() - start_time
         result_type = "Base64 audio" if args.base64 else "Audio file"
         if result:
             if args.base64:
                 print(f"Generated base64 audio string ({len(result)} characters)")
             else:
                 print(f"Audio saved to: {os.path.abspath(result)}")
-            print(f"Generation time: {duration:.2f} seconds")
+            print_synthesis_time(args.tts_service)
     
     if results[0][1] and result:
         print(f"\n✅ Both tests completed successfully!")
@@ -0,0 +1,101 @@
+import json
+
+class JSONArrayStreamParser:
+    """Incrementally extract the objects of a JSON array from streamed text.
+
+    Completion chunks are passed to ``feed`` as they arrive, and each
+    ``{...}`` element of the first JSON array in the text is returned as soon
+    as its closing brace is seen. Any text before the array (e.g. a markdown
+    code fence) is skipped, and the scan is a single linear pass with no
+    backtracking.
+    """
+
+    def __init__(self):
+        self.seen_array = False  # any '[' has been seen
+        self.started = False  # currently inside a candidate array
+        self.finished = False  # the array's closing ']' has been seen
+        self.count = 0  # number of objects returned so far
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element = None  # characters of the object being collected
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the objects completed by it.
+
+        Args:
+            chunk (str): Next piece of the streamed text
+
+        Returns:
+            list: Parsed objects (dicts) whose closing brace was in this chunk
+        """
+        completed = []
+        if self.finished:
+            return completed
+
+        for ch in chunk:
+            if not self.started:
+                if ch == '[':
+                    self.started = True
+                    self.seen_array = True
+                continue
+
+            if self._element is not None:
+                self._element.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                if self._depth == 0 and ch == '{':
+                    self._element = [ch]
+                self._depth += 1
+            elif ch in '}]':
+                if self._depth == 0:
+                    if ch == ']':
+                        if self.count:
+                            self.finished = True
+                            break
+                        # An empty or object-free bracket pair, e.g. "[see below]"
+                        # in the preamble; keep looking for the real array.
+                        self.started = False
+                    continue
+                self._depth -= 1
+                if self._depth == 0 and self._element is not None:
+                    text = ''.join(self._element)
+                    self._element = None
+                    try:
+                        obj = json.loads(text)
+                    except ValueError as e:
+                        print(f"Skipping malformed array element: {e}")
+                        continue
+                    self.count += 1
+                    completed.append(obj)
+
+        return completed
+
+def parse_json_array_objects(text):
+    """Return the objects of the first JSON array in ``text``.
+
+    Args:
+        text (str): Complete model output, possibly with surrounding prose
+
+    Returns:
+        list: Parsed objects; a truncated array yields its complete elements
+
+    Raises:
+        ValueError: If the text contains no JSON array
+    """
+    parser = JSONArrayStreamParser()
+    objects = parser.feed(text)
+    if not parser.seen_array:
+        raise ValueError("No JSON array found in response")
+    return objects
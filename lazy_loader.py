@@ -0,0 +1,103 @@
+"""
+Registry of expensive objects that are built on first use.
+
+Epitran models and TTS clients each take from a fraction of a second to a few
+seconds to construct. Building them at import time delays the first request
+of a freshly started container. A ``LazyLoader`` holds a factory per name
+instead, builds each object the first time it is needed (once, even under
+concurrent requests), and can warm the whole set in background threads.
+"""
+
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+class LazyLoader(Mapping):
+    """Read-only mapping of names to objects created by their factories on first access."""
+
+    def __init__(self, factories=None):
+        """Initialize the LazyLoader.
+
+        Args:
+            factories (dict, optional): Name -> zero-argument callable building the object
+        """
+        self._factories = dict(factories or {})
+        self._values = {}
+        self._locks = {name: threading.Lock() for name in self._factories}
+        self._timings = {}  # name -> seconds spent in the factory
+
+    def register(self, name, factory):
+        """Add (or replace) the factory of ``name``; the object is not built yet."""
+        self._factories[name] = factory
+        self._locks.setdefault(name, threading.Lock())
+        self._values.pop(name, None)
+
+    def set(self, name, value):
+        """Provide an already-built object for ``name``."""
+        self._factories.setdefault(name, lambda: value)
+        self._locks.setdefault(name, threading.Lock())
+        self._values[name] = value
+
+    def load(self, name):
+        """Return the object for ``name``, building it if this is the first use."""
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        with self._locks[name]:
+            if name not in self._values:
+                start = time.perf_counter()
+                self._values[name] = self._factories[name]()
+                self._timings[name] = time.perf_counter() - start
+                print(f"Loaded {name} in {self._timings[name]:.2f}s")
+            return self._values[name]
+
+    def loaded(self, name):
+        """Return True if ``name`` has already been built."""
+        return name in self._values
+
+    def __getitem__(self, name):
+        if name not in self._factories:
+            raise KeyError(name)
+        return self.load(name)
+
+    def __iter__(self):
+        return iter(self._factories)
+
+    def __len__(self):
+        return len(self._factories)
+
+    def __contains__(self, name):
+        # Membership must not trigger a load
+        return name in self._factories
+
+    def warm(self, names=None, max_workers=None):
+        """Build objects in background threads.
+
+        Args:
+            names (list, optional): Names to build (all registered names if omitted)
+            max_workers (int, optional): Parallel factory calls (one per name if omitted)
+
+        Returns:
+            dict: Name -> Future of the built object
+        """
+        names = [name for name in (self._factories if names is None else names) if not self.loaded(name)]
+        if not names:
+            return {}
+        executor = ThreadPoolExecutor(max_workers=max_workers or len(names), thread_name_prefix='warm')
+        futures = {name: executor.submit(self.load, name) for name in names}
+        for name, future in futures.items():
+            def _done(f, name=name):
+                if f.exception() is not None:
+                    print(f"Error loading {name}: {f.exception()}")
+            future.add_done_callback(_done)
+        executor.shutdown(wait=False)
+        return futures
+
+    def stats(self):
+        """Return {name: {'loaded': bool, 'seconds': load time or None}}."""
+        return {
+            name: {'loaded': self.loaded(name), 'seconds': self._timings.get(name)}
+            for name in self._factories
+        }
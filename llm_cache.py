@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class ResponseCache:
+    """Persistent, content-addressed cache of LLM completions.
+
+    Entries are keyed by a SHA-256 of (model, mode, prompt) and stored in a
+    SQLite database so they survive restarts. The cache is bounded both by
+    entry count (least recently used entries are evicted first) and by age
+    (entries older than ``max_age`` seconds are treated as misses).
+    """
+
+    def __init__(self, path, max_entries=10000, max_age=30 * 24 * 3600):
+        """Open (or create) the cache database.
+
+        Args:
+            path (str): Path of the SQLite database file
+            max_entries (int): Maximum number of cached completions
+            max_age (float): Maximum age of an entry in seconds
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model, mode, prompt, system=None):
+        """Return the cache key for a (model, mode, prompt) triple.
+
+        A system prefix is keyed as if it preceded the prompt in one message.
+        """
+        if system:
+            prompt = f"{system}\n\n{prompt}"
+        payload = json.dumps([model, mode, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached completion for ``key``, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if now - created_at > self.max_age:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._entries -= 1
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store ``value`` under ``key`` and evict entries over the limits."""
+        now = time.time()
+        with self._lock:
+            existed = self._conn.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if not existed:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                # Drop expired entries first, then the least recently used ones.
+                self._entries -= self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (now - self.max_age,)
+                ).rowcount
+                if self._entries > self.max_entries:
+                    self._entries -= self._conn.execute(
+                        "DELETE FROM responses WHERE key IN ("
+                        " SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                        (self._entries - self.max_entries,),
+                    ).rowcount
+
+    def clear(self):
+        """Remove every entry and reset the hit/miss counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._entries = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': self._entries,
+            }
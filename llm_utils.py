@@ -1,41 +1,150 @@
-from litellm import completion
+from litellm import completion, acompletion
+import asyncio
 import yaml
 import os
+import threading
+from llm_cache import ResponseCache
+from single_flight import SingleFlight
+from prompt_batcher import PromptBatcher
+import metrics
+import outbound
 
-def load_model_config():
-    with open('models.yaml', 'r') as file:
+def load_model_config(path='models.yaml'):
+    with open(path, 'r') as file:
         return yaml.safe_load(file)
 
-def generate_completion(prompt: str, model: str = None, api_key: str = None) -> str:
+class ModelRegistry:
+    """Compiled view of models.yaml, reloaded only when the file changes.
+
+    The YAML file is parsed once into a model -> API key environment variable
+    mapping. Lookups on the request path are a single ``os.stat`` plus a dict
+    access; the file is re-parsed only when its mtime changes, and the new
+    table is swapped in atomically so readers never see a half-built mapping.
     """
-    Generate completion using LiteLLM with the configured model.
-    
+
+    def __init__(self, path='models.yaml'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._tables = ({}, None)
+        self.refresh()
+
+    @staticmethod
+    def _compile(config):
+        model_to_env = {}
+        for item in config['models']:
+            for env_key, models in item.items():
+                for m in models:
+                    model_to_env[m] = env_key
+
+        # The default model is the first model of the first configuration entry.
+        first_env_var = list(config['models'][0].keys())[0]
+        default_model = config['models'][0][first_env_var][0]
+        return model_to_env, default_model
+
+    def refresh(self):
+        """Reload the routing table if models.yaml has changed on disk.
+
+        If the file disappears or fails to parse, the last good table is kept.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            if self._mtime is None:
+                raise
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                model_to_env, default_model = self._compile(load_model_config(self.path))
+            except Exception as e:
+                if self._mtime is None:
+                    raise
+                print(f"Error reloading {self.path}, keeping previous config: {e}")
+                return
+            # Publish the new table as a single tuple so readers never mix versions.
+            self._tables = (model_to_env, default_model)
+            self._mtime = mtime
+
+    @property
+    def default_model(self):
+        self.refresh()
+        return self._tables[1]
+
+    @property
+    def models(self):
+        self.refresh()
+        return list(self._tables[0].keys())
+
+    def resolve(self, model=None):
+        """Resolve ``model`` (or the default) to ``(model, env_var)``.
+
+        ``env_var`` is None if the model is not listed in models.yaml.
+        """
+        self.refresh()
+        model_to_env, default_model = self._tables
+        if model is None:
+            model = default_model
+        return model, model_to_env.get(model)
+
+model_registry = ModelRegistry()
+
+# Completions are cached on disk so repeated selections don't cost another round trip.
+response_cache = ResponseCache(
+    os.environ.get('LLM_CACHE_PATH', '/tmp/llm_cache.sqlite3'),
+    max_entries=int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 10000)),
+    max_age=float(os.environ.get('LLM_CACHE_MAX_AGE', 30 * 24 * 3600)),
+)
+
+# Timeout, retry and circuit breaker policy of LLM calls. litellm keeps a
+# pooled HTTP client per provider, so connections are already reused.
+llm_outbound = outbound.get_client('llm')
+
+# Identical completions requested concurrently share one provider call
+completion_flight = SingleFlight()
+
+# Models given an explicit cache_control breakpoint after the system prefix.
+# OpenAI and Gemini models cache a repeated prefix on their own.
+CACHE_CONTROL_MODELS = ('anthropic/', 'claude')
+
+def flight_key(model, mode, prompt, system=None):
+    """Return the single-flight key of a completion; whitespace differences in the prompt are ignored."""
+    return ResponseCache.make_key(model, mode, ' '.join(prompt.split()), system)
+
+def completion_messages(model, prompt, system=None):
+    """Return the chat messages of a completion.
+
+    A system prefix is sent as its own message ahead of the prompt, and marked
+    for provider prompt caching on models that need an explicit marker.
+    """
+    messages = [{"role": "user", "content": prompt}]
+    if not system:
+        return messages
+    if any(name in model.lower() for name in CACHE_CONTROL_MODELS):
+        content = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+    else:
+        content = system
+    return [{"role": "system", "content": content}] + messages
+
+def resolve_model_and_key(model: str = None, api_key: str = None):
+    """
+    Resolve the model to use and the API key to call it with.
+
     Args:
-        prompt (str): The input prompt.
         model (str, optional): The model to use (if not provided, default is used).
         api_key (str, optional): Override API key. If not provided, will use environment variable.
-        
+
     Returns:
-        str: The generated completion text.
+        tuple: (model, api_key)
     """
-    config = load_model_config()
-
-    # Build a mapping of model to the required API key environment variable.
-    model_to_env = {}
-    for item in config['models']:
-        for env_key, models in item.items():
-            for m in models:
-                model_to_env[m] = env_key
-
-    # Use the default model from the first configuration if none provided.
-    if model is None:
-        first_env_var = list(config['models'][0].keys())[0]
-        model = config['models'][0][first_env_var][0]
-
-    # Get the correct environment variable for the model.
-    env_var = model_to_env.get(model)
+    # Use the default model if none provided and get the correct environment
+    # variable for the model.
+    model, env_var = model_registry.resolve(model)
     if not env_var:
-        raise ValueError(f"Model '{model}' is not supported. Available models: {list(model_to_env.keys())}")
+        raise ValueError(f"Model '{model}' is not supported. Available models: {model_registry.models}")
 
     # First, check if the environment variable is set.
     env_api_key = os.getenv(env_var)
@@ -48,12 +157,160 @@ def generate_completion(prompt: str, model: str = None, api_key: str = None) ->
     else:
         raise ValueError(f"Please set {env_var} environment variable or provide the API key.")
 
-    messages = [{"role": "user", "content": prompt}]
+    return model, api_key
+
+def generate_completion(prompt: str, model: str = None, api_key: str = None,
+                        mode: str = None, use_cache: bool = True, system: str = None) -> str:
+    """
+    Generate completion using LiteLLM with the configured model.
     
-    response = completion(
-        model=model,
-        messages=messages,
-        api_key=api_key
-    )
+    Args:
+        prompt (str): The input prompt.
+        model (str, optional): The model to use (if not provided, default is used).
+        api_key (str, optional): Override API key. If not provided, will use environment variable.
+        mode (str, optional): Caller mode (e.g. 'flashcard', 'translate'), part of the cache key.
+        use_cache (bool): Serve and store the completion through the response cache,
+            and share the provider call of an identical request already in flight.
+        system (str, optional): Instructions sent as a separate system message
+            ahead of the prompt (see prompts.render).
+        
+    Returns:
+        str: The generated completion text.
+    """
+    model, api_key = resolve_model_and_key(model, api_key)
+
+    cache_key = ResponseCache.make_key(model, mode, prompt, system)
+    if use_cache:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    messages = completion_messages(model, prompt, system)
+    
+    def complete():
+        with metrics.stage_seconds.time('llm_completion'):
+            response = llm_outbound.call(
+                completion,
+                model=model,
+                messages=messages,
+                api_key=api_key,
+                timeout=llm_outbound.timeout
+            )
+        
+        content = response.choices[0].message.content
+        if use_cache and content:
+            response_cache.set(cache_key, content)
+        return content
     
-    return response.choices[0].message.content 
\ No newline at end of file
+    if not use_cache:
+        return complete()
+    return completion_flight.do(flight_key(model, mode, prompt, system), complete)
+
+async def agenerate_completion(prompt: str, model: str = None, api_key: str = None,
+                               mode: str = None, use_cache: bool = True, system: str = None) -> str:
+    """
+    Async variant of generate_completion built on litellm's acompletion.
+
+    Takes the same arguments and shares the response cache, but awaits the
+    provider call instead of blocking a thread for the round trip. The model
+    lookup (a stat of models.yaml) and the SQLite cache run in a worker thread
+    so they don't block the event loop either.
+
+    Returns:
+        str: The generated completion text.
+    """
+    def lookup():
+        resolved = resolve_model_and_key(model, api_key)
+        key = ResponseCache.make_key(resolved[0], mode, prompt, system)
+        return resolved, key, (response_cache.get(key) if use_cache else None)
+
+    (model, api_key), cache_key, cached = await asyncio.to_thread(lookup)
+    if cached is not None:
+        return cached
+
+    async def complete():
+        with metrics.stage_seconds.time('llm_completion'):
+            response = await llm_outbound.acall(
+                acompletion,
+                model=model,
+                messages=completion_messages(model, prompt, system),
+                api_key=api_key,
+                timeout=llm_outbound.timeout
+            )
+
+        content = response.choices[0].message.content
+        if use_cache and content:
+            await asyncio.to_thread(response_cache.set, cache_key, content)
+        return content
+
+    if not use_cache:
+        return await complete()
+    return await completion_flight.ado(flight_key(model, mode, prompt, system), complete)
+
+# Modes whose structured completions are combined when requested concurrently
+BATCHED_MODES = ('flashcard', 'language')
+
+# Concurrent flashcard and language requests for the same model share one call;
+# LLM_BATCH_WINDOW_MS is how long the first of them waits for others.
+completion_batcher = PromptBatcher(
+    generate_completion,
+    agenerate_completion,
+    resolve_model=lambda model: model_registry.resolve(model)[0],
+    cache=response_cache,
+    window=float(os.environ.get('LLM_BATCH_WINDOW_MS', 25)) / 1000,
+    max_items=int(os.environ.get('LLM_BATCH_MAX', 8)),
+)
+
+def stream_completion(prompt: str, model: str = None, api_key: str = None,
+                      mode: str = None, use_cache: bool = True, system: str = None):
+    """
+    Stream a completion from LiteLLM as text deltas.
+
+    The model and API key are validated before this returns, so configuration
+    errors are raised to the caller instead of from inside the stream. A cached
+    completion is yielded as a single delta; a freshly streamed one is stored in
+    the response cache once it has finished.
+
+    Args:
+        prompt (str): The input prompt.
+        model (str, optional): The model to use (if not provided, default is used).
+        api_key (str, optional): Override API key. If not provided, will use environment variable.
+        mode (str, optional): Caller mode, part of the cache key.
+        use_cache (bool): Serve and store the completion through the response cache.
+        system (str, optional): Instructions sent as a separate system message.
+
+    Returns:
+        generator: Yields the completion text in chunks as they arrive.
+    """
+    model, api_key = resolve_model_and_key(model, api_key)
+
+    cache_key = ResponseCache.make_key(model, mode, prompt, system)
+    cached = response_cache.get(cache_key) if use_cache else None
+
+    def _deltas():
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        with metrics.stage_seconds.time('llm_completion'):
+            # Failures before the first chunk are retried; later ones end the stream
+            response = llm_outbound.stream(lambda: completion(
+                model=model,
+                messages=completion_messages(model, prompt, system),
+                api_key=api_key,
+                stream=True,
+                timeout=llm_outbound.timeout
+            ))
+
+            for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        content = ''.join(parts)
+        if use_cache and content:
+            response_cache.set(cache_key, content)
+
+    return _deltas()
@@ -0,0 +1,323 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+A small, dependency-free subset of what prometheus_client offers:
+
+    Counter    monotonically increasing value per label set
+    Gauge      value that goes up and down (e.g. requests in flight)
+    Histogram  fixed-bucket distribution per label set; an observation is a
+               bisect and an increment under a lock
+
+Metrics are created on ``registry`` (``registry.histogram(...)`` etc.), and
+stats other modules already keep (cache hit counts, provider latencies) are
+exported by collectors called at scrape time, so the request path doesn't pay
+for them. ``registry.render()`` returns the /metrics body.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds and payload size buckets in bytes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class LatencyHistogram:
+    """Thread-safe histogram with fixed bucket bounds (seconds, or any unit)."""
+
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Record one observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding quantile ``q``, or None if empty.
+
+        Observations past the last bucket are reported as infinite.
+        """
+        with self._lock:
+            counts = list(self._counts)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        """Return cumulative bucket counts (keyed by upper bound), count and sum."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[bound] = running
+        return {'buckets': cumulative, 'count': running + counts[-1], 'sum': total}
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+def histogram_samples(name, labels, snapshot):
+    """Return the ``_bucket``/``_sum``/``_count`` samples of a histogram snapshot."""
+    labels = tuple(labels)
+    samples = [
+        (f'{name}_bucket', labels + (('le', _format_value(float(bound))),), count)
+        for bound, count in snapshot['buckets'].items()
+    ]
+    samples.append((f'{name}_bucket', labels + (('le', '+Inf'),), snapshot['count']))
+    samples.append((f'{name}_sum', labels, snapshot['sum']))
+    samples.append((f'{name}_count', labels, snapshot['count']))
+    return samples
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **labels):
+        """Return the child of this metric for one label set."""
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _items(self):
+        with self._lock:
+            return [(tuple(zip(self.labelnames, key)), child) for key, child in self._children.items()]
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        return [(self.name, labels, child.value) for labels, child in self._items()]
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    @contextmanager
+    def track_inprogress(self, *labels):
+        """Increment the gauge for the duration of the block."""
+        child = self.labels(*labels)
+        child.inc()
+        try:
+            yield
+        finally:
+            child.dec()
+
+class Histogram(_Metric):
+    """Fixed-bucket distribution of observations."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def _new_child(self):
+        return LatencyHistogram(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the duration of the block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.labels(*labels).observe(time.perf_counter() - started)
+
+    def samples(self):
+        samples = []
+        for labels, child in self._items():
+            samples.extend(histogram_samples(self.name, labels, child.snapshot()))
+        return samples
+
+class Registry:
+    """Set of metrics and scrape-time collectors rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """Add a callable called on every scrape.
+
+        It returns ``(name, kind, documentation, samples)`` families, where
+        samples are ``(sample_name, ((label, value), ...), value)`` tuples.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        families = [(metric.name, metric.kind, metric.documentation, metric.samples()) for metric in metrics]
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+
+        lines = []
+        for name, kind, documentation, samples in families:
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample_name, labels, value in samples:
+                lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+# Time spent in each processing stage (LLM completion, JSON extraction, IPA, TTS, ...)
+stage_seconds = registry.histogram(
+    'stage_duration_seconds', 'Time spent in a processing stage', ['stage']
+)
+
+# HTTP server metrics, labelled by route rather than path
+http_requests_in_flight = registry.gauge('http_requests_in_flight', 'Requests being handled')
+http_request_seconds = registry.histogram(
+    'http_request_duration_seconds', 'Time to produce a response', ['route', 'method', 'status']
+)
+http_request_bytes = registry.histogram(
+    'http_request_size_bytes', 'Size of request bodies', ['route'], buckets=SIZE_BUCKETS
+)
+http_response_bytes = registry.histogram(
+    'http_response_size_bytes', 'Size of non-streamed response bodies', ['route'], buckets=SIZE_BUCKETS
+)
+
+def instrument_flask_app(app):
+    """Record the latency, size and concurrency of every request of a Flask app.
+
+    Requests are labelled by their URL rule (e.g. ``/epub/<path:path>``), not
+    their path, to keep the number of label sets bounded. The duration is the
+    time until the response is ready to send; for streamed responses that is
+    when the stream starts.
+    """
+    from flask import g, request
+
+    def route():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+        http_requests_in_flight.inc()
+        if request.content_length:
+            http_request_bytes.labels(route()).observe(request.content_length)
+
+    @app.after_request
+    def record_response(response):
+        started = g.get('metrics_started')
+        if started is not None:
+            http_request_seconds.labels(route(), request.method, response.status_code).observe(
+                time.perf_counter() - started
+            )
+        if not response.is_streamed and response.content_length is not None:
+            http_response_bytes.labels(route()).observe(response.content_length)
+        return response
+
+    @app.teardown_request
+    def stop_timer(error=None):
+        if g.pop('metrics_started', None) is not None:
+            http_requests_in_flight.dec()
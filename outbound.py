@@ -0,0 +1,441 @@
+"""
+Shared policy for outbound calls to the LLM, Polly and gTTS providers.
+
+Every provider call goes through the ``OutboundClient`` of its provider, which
+adds what the SDKs don't give us consistently:
+
+    timeouts       a per-provider deadline passed down to the SDK / HTTP pool
+    retries        jittered exponential backoff on throttling, 5xx, timeouts
+                   and connection errors (never on 4xx request errors)
+    circuit        after repeated transient failures the provider is skipped
+    breaker        for a while (``CircuitOpenError``) instead of every request
+                   waiting out its own timeout
+    latency        a histogram of attempt latencies per provider
+
+Clients are configured from the environment (``OUTBOUND_<PROVIDER>_TIMEOUT``,
+``_RETRIES``, ``_FAILURE_THRESHOLD``, ``_RESET_TIMEOUT``) and shared through
+``get_client``. ``http_session`` and ``boto_config`` give the providers' SDKs
+keep-alive connection pools sized by ``OUTBOUND_POOL_SIZE``.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+import metrics
+from metrics import LatencyHistogram
+
+# Polly/AWS error codes that mean "slow down" rather than "this request is wrong"
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException', 'Throttling', 'TooManyRequestsException',
+    'RequestLimitExceeded', 'ServiceUnavailableException', 'ServiceUnavailable',
+}
+
+# Error classes returned by classify_error
+THROTTLED = 'throttled'
+TRANSIENT = 'transient'
+
+# Default timeout (seconds) and retries of each provider
+PROVIDER_DEFAULTS = {
+    'llm': {'timeout': 120.0, 'max_retries': 2},
+    'polly': {'timeout': 15.0, 'max_retries': 2},
+    'gtts': {'timeout': 10.0, 'max_retries': 2},
+}
+
+POOL_SIZE = int(os.environ.get('OUTBOUND_POOL_SIZE', 32))
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+    def __init__(self, provider, retry_after):
+        super().__init__(f"{provider} is unavailable, retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+def _status_code(error):
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        # requests/httpx exceptions carry the response; gTTSError calls it rsp
+        response = getattr(error, 'response', None)
+        if response is None:
+            response = getattr(error, 'rsp', None)
+        status = getattr(response, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+def classify_error(error):
+    """Classify a provider error as THROTTLED, TRANSIENT or None (not retryable)."""
+    from botocore.exceptions import (
+        ClientError, ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+    )
+    if isinstance(error, ClientError):
+        if error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES:
+            return THROTTLED
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        return TRANSIENT if status >= 500 else None
+    if isinstance(error, (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError)):
+        return TRANSIENT
+
+    # litellm exceptions carry the provider's status (408 for timeouts, 500 for
+    # connection errors), as do requests' HTTPError and gTTSError responses
+    status = _status_code(error)
+    if status == 429:
+        return THROTTLED
+    if status is not None:
+        return TRANSIENT if status == 408 or status >= 500 else None
+
+    import requests
+    if isinstance(error, (ConnectionError, TimeoutError, requests.ConnectionError, requests.Timeout)):
+        return TRANSIENT
+    # A gTTSError without a response means the request itself failed
+    if type(error).__name__ == 'gTTSError' and getattr(error, 'rsp', None) is None:
+        return TRANSIENT
+    return None
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` transient failures in a row the circuit opens
+    and calls are refused for ``reset_timeout`` seconds. Then a single trial
+    call is let through (half-open): its success closes the circuit, its
+    failure opens it again, and if it is cancelled the next call is the trial.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def before_call(self, provider):
+        """Raise CircuitOpenError unless a call may go through now.
+
+        Returns:
+            bool: True if the call is the half-open trial
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return False
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            retry_after = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(provider, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """Let another trial through after one ended without an outcome (cancelled or interrupted)."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or (self._opened_at is None and self.failures >= self.failure_threshold):
+                self.opened += 1
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+class OutboundClient:
+    """Timeout, retry, circuit breaker and latency policy of one provider."""
+
+    def __init__(self, name, timeout=30.0, max_retries=2, backoff=0.25, max_backoff=8.0,
+                 failure_threshold=5, reset_timeout=30.0, retry_throttled=True):
+        """Initialize the OutboundClient.
+
+        Args:
+            name (str): Provider name, used in errors and stats
+            timeout (float): Deadline of one attempt in seconds, to be passed to the SDK
+            max_retries (int): Retries of a throttled or transient failure
+            backoff (float): Base delay of the first retry in seconds
+            max_backoff (float): Cap of the exponential delay
+            failure_threshold (int): Transient failures in a row that open the circuit
+            reset_timeout (float): Seconds the circuit stays open
+            retry_throttled (bool): Retry throttled calls (callers with their own
+                throttling, like the backfill, turn this off)
+        """
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_throttled = retry_throttled
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyHistogram()
+        self._counters = {'calls': 0, 'retries': 0, 'failures': 0, 'throttled': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name):
+        """Create the client of provider ``name`` from OUTBOUND_<NAME>_* variables."""
+        defaults = PROVIDER_DEFAULTS.get(name, {})
+        prefix = f"OUTBOUND_{name.upper()}_"
+        return cls(
+            name,
+            timeout=float(os.environ.get(prefix + 'TIMEOUT', defaults.get('timeout', 30.0))),
+            max_retries=int(os.environ.get(prefix + 'RETRIES', defaults.get('max_retries', 2))),
+            failure_threshold=int(os.environ.get(prefix + 'FAILURE_THRESHOLD', 5)),
+            reset_timeout=float(os.environ.get(prefix + 'RESET_TIMEOUT', 30.0)),
+        )
+
+    def with_options(self, **options):
+        """Return a view of this client with some options changed.
+
+        The view shares the circuit breaker, latency histogram and counters.
+        """
+        view = object.__new__(type(self))
+        view.__dict__.update(self.__dict__)
+        for option, value in options.items():
+            if option not in ('timeout', 'max_retries', 'backoff', 'max_backoff', 'retry_throttled'):
+                raise TypeError(f"Unknown option: {option}")
+            setattr(view, option, value)
+        return view
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _before_attempt(self):
+        """Return the start time of an attempt and whether it is the breaker's half-open trial."""
+        try:
+            trial = self.breaker.before_call(self.name)
+        except CircuitOpenError:
+            self._count('rejected')
+            raise
+        self._count('calls')
+        return time.perf_counter(), trial
+
+    def _after_failure(self, error, attempt):
+        """Record a failed attempt and return the delay before retrying it, or None to raise."""
+        kind = classify_error(error)
+        if kind == TRANSIENT:
+            self.breaker.record_failure()
+        else:
+            # The provider answered, it just throttled or rejected the request
+            self.breaker.record_success()
+        if kind == THROTTLED:
+            self._count('throttled')
+        retryable = kind == TRANSIENT or (kind == THROTTLED and self.retry_throttled)
+        if not retryable or attempt >= self.max_retries:
+            self._count('failures')
+            return None
+        self._count('retries')
+        # Full jitter keeps retries from many callers from lining up
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _after_success(self, started):
+        self.latency.observe(time.perf_counter() - started)
+        self.breaker.record_success()
+
+    def call(self, fn, *args, **kwargs):
+        """Call ``fn(*args, **kwargs)`` under the provider's retry and breaker policy."""
+        attempt = 0
+        while True:
+            started, trial = self._before_attempt()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.latency.observe(time.perf_counter() - started)
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self._after_success(started)
+            return result
+
+    async def acall(self, fn, *args, **kwargs):
+        """Async variant of ``call`` for coroutine functions."""
+        attempt = 0
+        while True:
+            started, trial = self._before_attempt()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                self.latency.observe(time.perf_counter() - started)
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # e.g. CancelledError when the client disconnects
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self._after_success(started)
+            return result
+
+    def stream(self, factory):
+        """Iterate ``factory()`` under the provider's policy.
+
+        Failures before the first item are retried with a fresh iterable;
+        once an item has been yielded, errors propagate to the caller. The
+        latency recorded is the time to the first item.
+
+        Args:
+            factory (callable): Returns a new iterable of the provider's response
+
+        Yields:
+            The items of the iterable
+        """
+        attempt = 0
+        while True:
+            started, trial = self._before_attempt()
+            iterator = None
+            try:
+                iterator = iter(factory())
+                first = next(iterator)
+            except StopIteration:
+                self._after_success(started)
+                return
+            except Exception as e:
+                self.latency.observe(time.perf_counter() - started)
+                close = getattr(iterator, 'close', None)
+                if close:
+                    close()
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                close = getattr(iterator, 'close', None)
+                if close:
+                    close()
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self._after_success(started)
+            break
+
+        yield first
+        try:
+            yield from iterator
+        except Exception as e:
+            if classify_error(e) == TRANSIENT:
+                self.breaker.record_failure()
+            self._count('failures')
+            raise
+
+    def stats(self):
+        """Return counters, circuit state and latency of the provider."""
+        with self._lock:
+            counters = dict(self._counters)
+        # JSON has no infinity: quantiles past the last bucket are reported as None
+        p50, p99 = (self.latency.quantile(q) for q in (0.5, 0.99))
+        return {
+            **counters,
+            'circuit': self.breaker.state,
+            'circuit_opened': self.breaker.opened,
+            'p50': p50 if p50 != float('inf') else None,
+            'p99': p99 if p99 != float('inf') else None,
+            'latency': self.latency.snapshot(),
+        }
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(name):
+    """Return the shared OutboundClient of provider ``name``."""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = OutboundClient.from_env(name)
+        return _clients[name]
+
+def stats():
+    """Return the stats of every provider called so far."""
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: client.stats() for name, client in clients.items()}
+
+def collect_metrics():
+    """Metric families of the provider clients, for the metrics registry."""
+    provider_stats = stats()
+    families = []
+    for counter, documentation in (
+        ('calls', 'Attempted provider calls'),
+        ('retries', 'Provider calls retried after a throttled or transient failure'),
+        ('failures', 'Provider calls that failed after their retries'),
+        ('throttled', 'Provider calls rejected by throttling'),
+        ('rejected', 'Provider calls refused by an open circuit breaker'),
+    ):
+        families.append((f'outbound_{counter}_total', 'counter', documentation, [
+            (f'outbound_{counter}_total', (('provider', name),), values[counter])
+            for name, values in provider_stats.items()
+        ]))
+    families.append(('outbound_circuit_open', 'gauge', 'Whether the provider circuit breaker is open', [
+        ('outbound_circuit_open', (('provider', name),), int(values['circuit'] != CircuitBreaker.CLOSED))
+        for name, values in provider_stats.items()
+    ]))
+    samples = []
+    for name, values in provider_stats.items():
+        samples.extend(metrics.histogram_samples('outbound_duration_seconds', (('provider', name),), values['latency']))
+    families.append(('outbound_duration_seconds', 'histogram', 'Latency of provider call attempts', samples))
+    return families
+
+metrics.registry.register_collector(collect_metrics)
+
+_session = None
+
+def http_session():
+    """Return the shared keep-alive ``requests`` session for providers without an SDK pool."""
+    global _session
+    with _clients_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+def boto_config(name):
+    """Return a botocore Config applying provider ``name``'s timeout with a keep-alive pool.
+
+    botocore's own retries are turned off: the OutboundClient retries instead.
+    """
+    from botocore.config import Config
+    client = get_client(name)
+    return Config(
+        connect_timeout=min(client.timeout, 5.0),
+        read_timeout=client.timeout,
+        max_pool_connections=POOL_SIZE,
+        tcp_keepalive=True,
+        retries={'total_max_attempts': 1},
+    )
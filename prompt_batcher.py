@@ -0,0 +1,279 @@
+"""
+Micro-batching of concurrent structured-output completions.
+
+Requests arriving within a short window for the same model, mode and system
+prefix are sent as one multi-item prompt. The instructions they share (the
+system prefix of the mode's template, or else the common start of the
+prompts) are sent once, followed by each request's own input, and the model
+is asked for a JSON object keyed by input number. That object is split back
+into one completion per request, so callers get the same content a single
+call would have returned.
+
+The first request of a batch is its leader: it waits up to the window (or
+until the batch is full) and makes the call; the others wait on their result.
+Any item missing from the batched reply, or a batch that fails, falls back to
+a call of its own.
+"""
+
+import asyncio
+import json
+import re
+import threading
+from concurrent.futures import Future
+
+from llm_cache import ResponseCache
+
+BATCH_INSTRUCTIONS = """The instructions describe one task. Apply them independently to each of the {count} inputs below.
+Return a single JSON object whose keys are the input numbers ("1" to "{count}") and whose values are exactly the output the instructions ask for that input (the JSON array or object, not a string). Output only that JSON object."""
+
+def common_preamble(prompts):
+    """Return the longest common prefix of ``prompts`` that ends at a line break."""
+    prefix = prompts[0]
+    for prompt in prompts[1:]:
+        length = 0
+        for a, b in zip(prefix, prompt):
+            if a != b:
+                break
+            length += 1
+        prefix = prefix[:length]
+    return prefix[:prefix.rfind('\n') + 1]
+
+def build_batch_prompt(prompts):
+    """Return the multi-item prompt for distinct ``prompts``."""
+    preamble = common_preamble(prompts)
+    parts = [preamble.rstrip(), BATCH_INSTRUCTIONS.format(count=len(prompts))]
+    for number, prompt in enumerate(prompts, 1):
+        parts.append(f"Input {number}:\n{prompt[len(preamble):].strip()}")
+    return '\n\n'.join(part for part in parts if part)
+
+def split_batch_reply(content, count):
+    """Return the completion text of each input from a batched reply (None where missing)."""
+    match = re.search(r'\{[\s\S]*\}', content or '')
+    try:
+        reply = json.loads(match.group(0)) if match else {}
+    except ValueError:
+        reply = {}
+    if not isinstance(reply, dict):
+        reply = {}
+    results = []
+    for number in range(1, count + 1):
+        value = reply.get(str(number))
+        if value is None or isinstance(value, str):
+            results.append(value or None)
+        else:
+            results.append(json.dumps(value, ensure_ascii=False))
+    return results
+
+# Result telling the callers of a batch with a single distinct prompt to make the ordinary call
+_SINGLE_CALL = object()
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.full = threading.Event()
+        self.on_full = None  # Wakes an async leader waiting for the batch to fill
+
+class PromptBatcher:
+    """Combine concurrent completions of the same model and mode into one call."""
+
+    def __init__(self, complete, acomplete, resolve_model, cache=None, window=0.025, max_items=8):
+        """Initialize the PromptBatcher.
+
+        Args:
+            complete (callable): ``complete(prompt, model=, mode=, api_key=, system=)``, e.g. generate_completion
+            acomplete (callable): Async variant of ``complete``, e.g. agenerate_completion
+            resolve_model (callable): Maps a requested model (or None) to the model used
+            cache (ResponseCache, optional): Checked before batching; split replies are stored in it
+            window (float): Seconds a batch leader waits for more requests
+            max_items (int): Requests after which a batch is sent without waiting further
+        """
+        self.complete = complete
+        self.acomplete = acomplete
+        self.resolve_model = resolve_model
+        self.cache = cache
+        self.window = window
+        self.max_items = max_items
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'batches': 0, 'batched_requests': 0, 'fallbacks': 0}
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _cached(self, model, mode, prompt, system):
+        if self.cache is None:
+            return None
+        return self.cache.get(ResponseCache.make_key(model, mode, prompt, system))
+
+    def _enqueue(self, model, mode, prompt, api_key, system):
+        """Add a request to the open batch of its key; return (future, batch or None if not leader)."""
+        future = Future()
+        # Requests with their own API key are only combined with requests using the same one
+        key = (model, mode, api_key, system)
+        with self._lock:
+            self._counters['requests'] += 1
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _Batch()
+            batch.items.append((prompt, future))
+            if len(batch.items) >= self.max_items:
+                # Later requests start a new batch; the leader sends this one now
+                del self._pending[key]
+                batch.full.set()
+                if batch.on_full is not None:
+                    batch.on_full()
+        return future, (batch if leader else None)
+
+    def _take(self, model, mode, api_key, system, batch):
+        """Close ``batch`` and return the futures waiting on each of its distinct prompts."""
+        with self._lock:
+            if self._pending.get((model, mode, api_key, system)) is batch:
+                del self._pending[(model, mode, api_key, system)]
+            items = list(batch.items)
+
+        # Identical prompts in one batch share an input
+        futures_by_prompt = {}
+        for prompt, future in items:
+            futures_by_prompt.setdefault(prompt, []).append(future)
+        return futures_by_prompt
+
+    def _split(self, futures_by_prompt, content):
+        """Return the completion of each prompt from a batched reply, counting the batch."""
+        results = split_batch_reply(content, len(futures_by_prompt))
+        self._count('batches')
+        self._count('batched_requests', sum(
+            len(futures) for futures, result in zip(futures_by_prompt.values(), results) if result
+        ))
+        return results
+
+    def _resolve(self, model, mode, system, futures_by_prompt, results):
+        """Cache the split completions and hand each caller its result."""
+        for (prompt, futures), result in zip(futures_by_prompt.items(), results):
+            if isinstance(result, str) and self.cache is not None:
+                self.cache.set(ResponseCache.make_key(model, mode, prompt, system), result)
+            for future in futures:
+                future.set_result(result)
+
+    def _lead(self, model, mode, api_key, system, batch):
+        """Wait for the batch to fill, then complete it and resolve its futures."""
+        try:
+            self._complete_batch(model, mode, api_key, system, batch)
+        except BaseException as e:
+            for _, waiting in batch.items:
+                if not waiting.done():
+                    waiting.set_exception(e)
+            raise
+
+    def _complete_batch(self, model, mode, api_key, system, batch):
+        batch.full.wait(self.window)
+        futures_by_prompt = self._take(model, mode, api_key, system, batch)
+        prompts = list(futures_by_prompt)
+
+        if len(prompts) == 1:
+            # Nothing to combine: each caller makes the ordinary call
+            self._resolve(model, mode, system, futures_by_prompt, [_SINGLE_CALL])
+            return
+        try:
+            content = self.complete(build_batch_prompt(prompts), model=model,
+                                    mode=f'{mode}:batch', api_key=api_key, system=system)
+            results = self._split(futures_by_prompt, content)
+        except Exception as e:
+            print(f"Batched {mode} completion of {len(prompts)} prompts failed, sending them one by one: {e}")
+            results = [None] * len(prompts)
+        self._resolve(model, mode, system, futures_by_prompt, results)
+
+    async def _wait_full(self, batch):
+        """Wait like ``batch.full.wait(self.window)`` without holding a thread."""
+        loop = asyncio.get_running_loop()
+        full = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: full.done() or full.set_result(None))
+
+        with self._lock:
+            if batch.full.is_set():
+                return
+            batch.on_full = wake
+        await asyncio.wait({full}, timeout=self.window)
+
+    async def _alead(self, model, mode, api_key, system, batch):
+        """Async variant of ``_lead``, awaiting ``acomplete`` for the batched call."""
+        try:
+            await self._acomplete_batch(model, mode, api_key, system, batch)
+        except BaseException as e:
+            for _, waiting in batch.items:
+                if not waiting.done():
+                    # A cancelled leader leaves the others to make their own calls
+                    if isinstance(e, asyncio.CancelledError):
+                        waiting.set_result(None)
+                    else:
+                        waiting.set_exception(e)
+            raise
+
+    async def _acomplete_batch(self, model, mode, api_key, system, batch):
+        await self._wait_full(batch)
+        futures_by_prompt = self._take(model, mode, api_key, system, batch)
+        prompts = list(futures_by_prompt)
+
+        if len(prompts) == 1:
+            self._resolve(model, mode, system, futures_by_prompt, [_SINGLE_CALL])
+            return
+        try:
+            content = await self.acomplete(build_batch_prompt(prompts), model=model,
+                                           mode=f'{mode}:batch', api_key=api_key, system=system)
+            results = self._split(futures_by_prompt, content)
+        except Exception as e:
+            print(f"Batched {mode} completion of {len(prompts)} prompts failed, sending them one by one: {e}")
+            results = [None] * len(prompts)
+        # Only the SQLite cache writes block
+        await asyncio.to_thread(self._resolve, model, mode, system, futures_by_prompt, results)
+
+    def submit(self, prompt, model=None, mode=None, api_key=None, system=None):
+        """Return the completion of ``prompt``, batched with concurrent requests.
+
+        Takes the same arguments as ``complete`` and returns the same content.
+        """
+        model = self.resolve_model(model)
+        cached = self._cached(model, mode, prompt, system)
+        if cached is not None:
+            return cached
+
+        future, batch = self._enqueue(model, mode, prompt, api_key, system)
+        if batch is not None:
+            self._lead(model, mode, api_key, system, batch)
+        result = future.result()
+        if result is _SINGLE_CALL or result is None:
+            if result is None:
+                self._count('fallbacks')
+            return self.complete(prompt, model=model, mode=mode, api_key=api_key, system=system)
+        return result
+
+    async def asubmit(self, prompt, model=None, mode=None, api_key=None, system=None):
+        """Async variant of ``submit``, awaiting ``acomplete`` for every call.
+
+        Only the model and cache lookup and the cache writes run in a thread.
+        """
+        def lookup():
+            resolved = self.resolve_model(model)
+            return resolved, self._cached(resolved, mode, prompt, system)
+
+        model, cached = await asyncio.to_thread(lookup)
+        if cached is not None:
+            return cached
+
+        future, batch = self._enqueue(model, mode, prompt, api_key, system)
+        if batch is not None:
+            await self._alead(model, mode, api_key, system, batch)
+        result = await asyncio.wrap_future(future)
+        if result is _SINGLE_CALL or result is None:
+            if result is None:
+                self._count('fallbacks')
+            return await self.acomplete(prompt, model=model, mode=mode, api_key=api_key, system=system)
+        return result
+
+    def stats(self):
+        """Return request, batch and fallback counts."""
+        with self._lock:
+            return dict(self._counters)
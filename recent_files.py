@@ -0,0 +1,125 @@
+"""
+Maintained, mtime-sorted index of the files in the upload folder.
+"""
+
+import bisect
+import json
+import os
+import threading
+from datetime import datetime
+
+class RecentFilesIndex:
+    """Keep the upload folder's files sorted by modification time.
+
+    The index is built once with ``os.scandir`` and then updated as files are
+    uploaded or removed from the list, so listing the most recent files does
+    not stat every upload. Changes made to the folder behind the app's back
+    are picked up by a rebuild whenever the folder's own mtime changes.
+    Files removed from the recent list stay hidden (persisted in a JSON state
+    file) until they are uploaded again.
+    """
+
+    def __init__(self, folder, extensions=('.pdf', '.txt', '.epub'), state_path=None):
+        """Initialize the RecentFilesIndex.
+
+        Args:
+            folder (str): Upload folder to index
+            extensions (tuple): Lower-case file extensions to include
+            state_path (str, optional): JSON file persisting hidden files
+        """
+        self.folder = folder
+        self.extensions = extensions
+        self.state_path = state_path or os.path.join(folder, '.recent_files.json')
+        self._lock = threading.Lock()
+        self._sorted = []  # (-mtime, filename), most recent first
+        self._mtimes = {}  # filename -> mtime
+        self._folder_mtime = None
+        self._hidden = self._load_hidden()
+        self.rebuild()
+
+    def _load_hidden(self):
+        try:
+            with open(self.state_path, 'r') as file:
+                return json.load(file).get('hidden', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_hidden(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({'hidden': self._hidden}, file)
+        os.replace(tmp_path, self.state_path)
+
+    def rebuild(self):
+        """Re-read the folder with a single ``os.scandir`` pass."""
+        with self._lock:
+            folder_mtime = os.stat(self.folder).st_mtime_ns
+            mtimes = {}
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(self.extensions) and entry.is_file():
+                        mtimes[entry.name] = entry.stat().st_mtime
+            self._mtimes = mtimes
+            self._sorted = sorted((-mtime, name) for name, mtime in mtimes.items())
+            self._folder_mtime = folder_mtime
+
+    def _refresh(self):
+        try:
+            folder_mtime = os.stat(self.folder).st_mtime_ns
+        except OSError:
+            os.makedirs(self.folder, exist_ok=True)
+            folder_mtime = None
+        if folder_mtime != self._folder_mtime:
+            self.rebuild()
+
+    def _discard(self, filename):
+        mtime = self._mtimes.pop(filename, None)
+        if mtime is not None:
+            i = bisect.bisect_left(self._sorted, (-mtime, filename))
+            if i < len(self._sorted) and self._sorted[i] == (-mtime, filename):
+                del self._sorted[i]
+
+    def touch(self, filename):
+        """Record that ``filename`` was just saved to the folder."""
+        if not filename.lower().endswith(self.extensions):
+            return
+        path = os.path.join(self.folder, filename)
+        with self._lock:
+            mtime = os.stat(path).st_mtime
+            self._discard(filename)
+            self._mtimes[filename] = mtime
+            bisect.insort(self._sorted, (-mtime, filename))
+            if self._hidden.pop(filename, None) is not None:
+                self._save_hidden()
+            self._folder_mtime = os.stat(self.folder).st_mtime_ns
+
+    def hide(self, filename):
+        """Remove ``filename`` from the recent list without deleting the file."""
+        with self._lock:
+            mtime = self._mtimes.get(filename)
+            if mtime is None:
+                return False
+            self._hidden[filename] = mtime
+            self._save_hidden()
+            # Writing the state file changes the folder mtime; that is not an external change
+            self._folder_mtime = os.stat(self.folder).st_mtime_ns
+            return True
+
+    def recent(self, limit=5):
+        """Return the ``limit`` most recently modified, non-hidden files.
+
+        Returns:
+            list: Dicts with ``filename`` and ISO ``date``
+        """
+        self._refresh()
+        with self._lock:
+            result = []
+            for neg_mtime, filename in self._sorted:
+                hidden_mtime = self._hidden.get(filename)
+                # A file modified after it was hidden shows up again
+                if hidden_mtime is not None and hidden_mtime >= -neg_mtime:
+                    continue
+                result.append({'filename': filename, 'date': datetime.fromtimestamp(-neg_mtime).isoformat()})
+                if len(result) >= limit:
+                    break
+            return result
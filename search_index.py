@@ -0,0 +1,154 @@
+"""
+Full-text search over the extracted page text of uploaded documents.
+
+Pages are stored in a SQLite FTS5 table whose rowid encodes the document id
+and page number, so re-indexing a document only touches its own row range.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+
+# Low bits of an FTS rowid hold the page index, the high bits the document id
+PAGE_BITS = 20
+PAGE_MASK = (1 << PAGE_BITS) - 1
+
+class SearchIndex:
+    """Incremental inverted index of document pages backed by SQLite FTS5."""
+
+    def __init__(self, path):
+        """Open (or create) the search database.
+
+        Args:
+            path (str): Path of the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id INTEGER PRIMARY KEY,"
+            " filename TEXT UNIQUE NOT NULL,"
+            " file_hash TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5("
+            " body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def indexed_hash(self, filename):
+        """Return the file hash ``filename`` was last indexed with, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_hash FROM documents WHERE filename = ?", (filename,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def filenames(self):
+        """Return the names of the indexed documents."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT filename FROM documents")]
+
+    def index_document(self, filename, file_hash, pages):
+        """Add or replace the pages of a document.
+
+        Args:
+            filename (str): Name of the uploaded file
+            file_hash (str): Content hash; unchanged documents are skipped
+            pages (list): Text of each page, in order
+        """
+        if len(pages) > PAGE_MASK + 1:
+            pages = pages[:PAGE_MASK + 1]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, file_hash FROM documents WHERE filename = ?", (filename,)
+            ).fetchone()
+            if row and row[1] == file_hash:
+                return
+
+            self._conn.execute("BEGIN")
+            try:
+                if row:
+                    doc_id = row[0]
+                    self._delete_pages(doc_id)
+                    self._conn.execute(
+                        "UPDATE documents SET file_hash = ? WHERE id = ?", (file_hash, doc_id)
+                    )
+                else:
+                    doc_id = self._conn.execute(
+                        "INSERT INTO documents (filename, file_hash) VALUES (?, ?)",
+                        (filename, file_hash),
+                    ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO pages (rowid, body) VALUES (?, ?)",
+                    (((doc_id << PAGE_BITS) | i, text) for i, text in enumerate(pages) if text.strip()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _delete_pages(self, doc_id):
+        self._conn.execute(
+            "DELETE FROM pages WHERE rowid BETWEEN ? AND ?",
+            (doc_id << PAGE_BITS, (doc_id << PAGE_BITS) | PAGE_MASK),
+        )
+
+    def remove_document(self, filename):
+        """Drop a document from the index."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM documents WHERE filename = ?", (filename,)
+            ).fetchone()
+            if row:
+                self._conn.execute("BEGIN")
+                self._delete_pages(row[0])
+                self._conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+                self._conn.execute("COMMIT")
+
+    @staticmethod
+    def to_match_query(query):
+        """Turn free text into an FTS5 query matching all of its words.
+
+        Each word is quoted so user input can't inject FTS5 syntax; the last
+        word also matches as a prefix to support search-as-you-type.
+        """
+        words = re.findall(r'\w+', query)
+        if not words:
+            return None
+        terms = [f'"{word}"' for word in words]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, query, limit=20):
+        """Return the best matching pages for ``query``.
+
+        Args:
+            query (str): Free-text query
+            limit (int): Maximum number of hits
+
+        Returns:
+            list: Dicts with ``filename``, 1-based ``page``, highlighted
+                ``snippet`` and bm25 ``score`` (lower is better), best first
+        """
+        match = self.to_match_query(query)
+        if match is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.filename, (p.rowid & ?) + 1, snippet(pages, 0, '<b>', '</b>', '…', 16), bm25(pages)"
+                " FROM pages AS p JOIN documents AS d ON d.id = (p.rowid >> ?)"
+                " WHERE pages MATCH ? ORDER BY bm25(pages) LIMIT ?",
+                (PAGE_MASK, PAGE_BITS, match, limit),
+            ).fetchall()
+        return [
+            {'filename': filename, 'page': page, 'snippet': snippet, 'score': score}
+            for filename, page, snippet, score in rows
+        ]
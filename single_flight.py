@@ -0,0 +1,104 @@
+"""
+Coalescing of identical concurrent calls ("single flight").
+
+While a call for a key is running, callers asking for the same key wait for
+it and share its result (or its exception) instead of making the same
+upstream request again. Once the call finishes the key is forgotten, so
+later callers start a new call (normally answered by a cache by then).
+
+Waiting works from threads and from asyncio code alike: the shared result is
+a ``concurrent.futures.Future``.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class CallAbandoned(Exception):
+    """Set on a call whose leader gave up without a result, e.g. a closed stream.
+
+    Waiters catching it should start the call again themselves.
+    """
+
+class SingleFlight:
+    """Registry of the calls in flight, by key."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def begin(self, key):
+        """Join the call for ``key``, starting it if none is running.
+
+        Returns:
+            tuple: (Future of the call's result, True if the caller must run
+            the call and ``finish`` it, False if it should wait on the future)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def finish(self, key, result=None, error=None):
+        """Publish the result (or exception) of the call for ``key`` to its waiters."""
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return ``fn(*args, **kwargs)``, sharing one call among concurrent callers of ``key``."""
+        while True:
+            future, leader = self.begin(key)
+            if leader:
+                break
+            try:
+                return future.result()
+            except CallAbandoned:
+                continue
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+    async def ado(self, key, fn, *args, **kwargs):
+        """Async variant of ``do`` for coroutine functions."""
+        while True:
+            future, leader = self.begin(key)
+            if leader:
+                break
+            try:
+                return await asyncio.wrap_future(future)
+            except CallAbandoned:
+                continue
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            # A cancelled leader leaves the waiters to try again themselves
+            self.finish(key, error=CallAbandoned() if isinstance(e, asyncio.CancelledError) else e)
+            raise
+        self.finish(key, result)
+        return result
+
+    def stats(self):
+        """Return the number of calls made and of callers that shared one."""
+        with self._lock:
+            in_flight = len(self._calls)
+        calls = self.leaders + self.followers
+        return {
+            'calls': self.leaders,
+            'coalesced': self.followers,
+            'coalesced_rate': self.followers / calls if calls else 0.0,
+            'in_flight': in_flight,
+        }
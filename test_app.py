@@ -0,0 +1,158 @@
+import io
+import os
+from unittest import mock
+
+import pytest
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    scratch = tmp_path_factory.mktemp('app')
+    env = {
+        'UPLOAD_FOLDER': str(scratch / 'uploads'),
+        'LLM_CACHE_PATH': str(scratch / 'llm_cache.sqlite3'),
+        'AUDIO_CACHE_FOLDER': str(scratch / 'audio_cache'),
+        'WARM_MODELS': 'False',
+        'LITELLM_LOCAL_MODEL_COST_MAP': 'True',
+    }
+    with mock.patch.dict(os.environ, env):
+        import app
+    return app
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+@pytest.fixture
+def fake_ipa(app_module, monkeypatch):
+    """Replace the English transcriber with a counting fake and clear the IPA memo."""
+    calls = []
+
+    def get_ipa(word):
+        calls.append(word)
+        if word == 'broken':
+            raise RuntimeError('cannot transcribe')
+        return f'/{word}/'
+
+    monkeypatch.setattr(app_module.ipa_transcriber, 'get_ipa', get_ipa)
+    app_module.transcribe_ipa.cache_clear()
+    yield calls
+    app_module.transcribe_ipa.cache_clear()
+
+def test_ipa_batch_keeps_order_and_memoizes(client, app_module, fake_ipa):
+    response = client.post('/get_ipa_batch', json={'words': ['cat', 'dog', 'broken', 'cat'], 'language': 'English'})
+
+    assert response.status_code == 200
+    assert response.get_json() == {'ipa': ['/cat/', '/dog/', '', '/cat/']}
+    assert fake_ipa == ['cat', 'dog', 'broken']
+
+    # The single-word route shares the memo
+    assert client.post('/get_ipa', json={'word': 'dog', 'language': 'English'}).get_json() == {'ipa': '/dog/'}
+    assert fake_ipa == ['cat', 'dog', 'broken']
+    assert app_module.transcribe_ipa.cache_info().hits == 2
+
+def test_ipa_batch_rejects_bad_requests(client, app_module, fake_ipa, monkeypatch):
+    monkeypatch.setattr(app_module, 'IPA_BATCH_MAX', 2)
+
+    assert client.post('/get_ipa_batch', json={'words': ['a', 'b', 'c']}).status_code == 400
+    assert client.post('/get_ipa_batch', json={'words': 'cat'}).status_code == 400
+
+    response = client.post('/get_ipa_batch', json={'words': ['a', 'b'], 'language': 'Klingon'})
+    assert response.get_json()['ipa'] == ['', '']
+    assert fake_ipa == []
+
+def test_index_tells_the_page_the_ipa_batch_limit(client, app_module):
+    page = client.get('/').get_data(as_text=True)
+    assert f'const IPA_BATCH_MAX = {app_module.IPA_BATCH_MAX};' in page
+
+def upload(client, filename, text):
+    return client.post('/upload_file', data={'file': (io.BytesIO(text.encode()), filename)},
+                       content_type='multipart/form-data')
+
+def search(client, query, **params):
+    return client.get('/search', query_string={'q': query, **params})
+
+def test_search_drops_replaced_and_removed_uploads(client, app_module):
+    assert upload(client, 'notes.txt', 'zebrafish anatomy').status_code == 200
+    app_module.text_index.submit(os.path.join(app_module.UPLOAD_FOLDER, 'notes.txt')).result()
+    assert [hit['filename'] for hit in search(client, 'zebrafish').get_json()['results']] == ['notes.txt']
+
+    # Replacing the upload drops its old text
+    upload(client, 'notes.txt', 'axolotl anatomy')
+    app_module.text_index.submit(os.path.join(app_module.UPLOAD_FOLDER, 'notes.txt')).result()
+    assert search(client, 'zebrafish').get_json()['results'] == []
+    assert len(search(client, 'axolotl', limit=-5).get_json()['results']) == 1
+
+    # Removing a file from the recent list keeps it searchable
+    client.post('/remove_recent_file', json={'filename': 'notes.txt'})
+    assert len(search(client, 'axolotl').get_json()['results']) == 1
+
+    # A file deleted behind the app's back is not returned, and doesn't take a live hit's place
+    upload(client, 'other.txt', 'axolotl axolotl habitat')
+    app_module.text_index.submit(os.path.join(app_module.UPLOAD_FOLDER, 'other.txt')).result()
+    os.remove(os.path.join(app_module.UPLOAD_FOLDER, 'other.txt'))
+    assert [hit['filename'] for hit in search(client, 'axolotl', limit=1).get_json()['results']] == ['notes.txt']
+    assert 'other.txt' not in app_module.search_index.filenames()
+
+def test_async_requests_that_raise_are_recorded_as_500(app_module):
+    from starlette.testclient import TestClient
+    import asgi_app
+    import metrics
+
+    def failures():
+        return metrics.http_request_seconds.labels('/translate_text', 'POST', 500).snapshot()['count']
+
+    before = failures()
+    client = TestClient(asgi_app.app, raise_server_exceptions=False)
+    response = client.post('/translate_text', content=b'not json', headers={'content-type': 'application/json'})
+    assert response.status_code == 500
+    assert failures() == before + 1
+
+def test_flask_and_async_views_map_errors_the_same_way(client, app_module, monkeypatch):
+    from starlette.testclient import TestClient
+    import asgi_app
+    from outbound import CircuitOpenError
+
+    def unavailable(*args, **kwargs):
+        raise CircuitOpenError('llm', 12.5)
+
+    async def aunavailable(*args, **kwargs):
+        unavailable()
+
+    monkeypatch.setattr(app_module, 'generate_completion', unavailable)
+    monkeypatch.setattr(asgi_app, 'agenerate_completion', aunavailable)
+    async_client = TestClient(asgi_app.app)
+
+    for post in (client.post, async_client.post):
+        response = post('/translate_text', json={'text': 'hello'})
+        assert response.status_code == 503 and response.headers['Retry-After'] == '13'
+        assert 'retry in 12s' in response.text
+        assert post('/translate_text', json={'text': ''}).status_code == 400
+
+def test_only_cached_audio_advertises_ranges(client, app_module, monkeypatch):
+    def stream_gtts(word, lang):
+        yield from (b'ID3', b'mp3')
+
+    monkeypatch.setattr(app_module.ipa_transcriber, 'stream_gtts', stream_gtts)
+    query = {'word': 'ranges', 'language': 'English'}
+
+    response = client.get('/get_audio', query_string=query)
+    assert response.get_data() == b'ID3mp3'
+    assert 'Accept-Ranges' not in response.headers
+
+    key = app_module.ipa_transcriber.audio_key('gtts', 'ranges', voice=None, lang='en')
+    app_module.audio_cache.put(key, b'ID3mp3')
+    response = client.get('/get_audio', query_string=query, headers={'Range': 'bytes=3-'})
+    assert response.status_code == 206 and response.get_data() == b'mp3'
+    assert response.headers['Accept-Ranges'] == 'bytes'
+
+def test_flashcard_requests_without_a_mode_or_input_are_rejected(client, app_module, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, 'generate_completion', lambda *args, **kwargs: calls.append(args))
+
+    response = client.post('/generate_flashcard', json={'mode': 'unknown', 'text': 'x'})
+    assert response.status_code == 400 and response.get_json() == {'error': 'Invalid mode'}
+    assert client.post('/generate_flashcard', json={'mode': 'explain'}).status_code == 400
+    assert client.post('/generate_flashcard', json={'mode': 'language', 'phrase': 'p'}).status_code == 400
+    assert client.post('/generate_flashcard', json={'mode': 'explain', 'prompt': ''}).status_code == 400
+    assert client.post('/generate_flashcard_stream', json={'mode': 'explain', 'text': ''}).status_code == 400
+    assert calls == []
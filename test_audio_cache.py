@@ -0,0 +1,66 @@
+import io
+import os
+import time
+
+from audio_cache import AudioCache
+from ipa_speech import IPATranscriber
+import metrics
+
+def test_put_get_and_lru_eviction(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=250)
+    keys = [AudioCache.make_key('gtts', None, 'en', word) for word in ('a', 'b', 'c')]
+
+    cache.put(keys[0], b'0' * 100)
+    time.sleep(0.01)
+    cache.put(keys[1], b'1' * 100)
+    time.sleep(0.01)
+    assert cache.get(keys[0]) == b'0' * 100  # keys[1] is now least recently used
+    time.sleep(0.01)
+    cache.put(keys[2], b'2' * 100)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == b'0' * 100
+    assert cache.get(keys[2]) == b'2' * 100
+    assert cache.stats()['bytes'] == 200
+    # The size is recovered from disk on restart
+    assert AudioCache(str(tmp_path), max_bytes=250).stats()['bytes'] == 200
+
+class FakePolly:
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize_speech(self, Text, OutputFormat, VoiceId):
+        self.calls += 1
+        return {'AudioStream': io.BytesIO(f'{VoiceId}:{Text}'.encode())}
+
+def test_polly_checks_cache_before_synthesizing(tmp_path):
+    transcriber = IPATranscriber(audio_cache=AudioCache(str(tmp_path)))
+    transcriber.polly_client = FakePolly()
+    timed = metrics.stage_seconds.labels('polly').snapshot()['count']
+
+    first = transcriber.text_to_speech_polly('<b>hello</b> world', return_base64=True)
+    second = transcriber.text_to_speech_polly('hello world', return_base64=True)
+    assert first == second
+    assert transcriber.polly_client.calls == 1
+    # The cache hit is not recorded as Polly time
+    assert metrics.stage_seconds.labels('polly').snapshot()['count'] == timed + 1
+
+    key = transcriber.audio_key('polly', 'hello world', voice='Joanna')
+    assert os.path.exists(transcriber.audio_cache.path_for(key))
+    transcriber.text_to_speech_polly('hello world', voice_id='Matthew', return_base64=True)
+    assert transcriber.polly_client.calls == 2
+
+def test_polly_stream_is_cached_only_when_complete(tmp_path):
+    transcriber = IPATranscriber(audio_cache=AudioCache(str(tmp_path)))
+    transcriber.polly_client = FakePolly()
+    key = transcriber.audio_key('polly', 'hi', voice='Joanna')
+
+    partial = transcriber.stream_polly('hi')
+    next(partial)
+    partial.close()
+    assert transcriber.audio_cache.get(key) is None
+
+    assert b''.join(transcriber.stream_polly('hi')) == b'Joanna:hi'
+    assert transcriber.audio_cache.get(key) == b'Joanna:hi'
+    assert list(transcriber.stream_polly('hi')) == [b'Joanna:hi']
+    assert transcriber.polly_client.calls == 2
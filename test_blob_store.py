@@ -0,0 +1,41 @@
+import pytest
+
+from benchmarks.stubs import FakeS3
+from blob_store import CACHE_CONTROL, LocalBlobStore, S3BlobStore, blob_key, open_blob_store
+
+def test_local_store_is_content_addressed(tmp_path):
+    store = LocalBlobStore(str(tmp_path), base_url='https://cdn.example.com/audio/')
+
+    key = store.put(b'mp3 bytes')
+
+    assert key == blob_key(b'mp3 bytes')
+    assert store.put(b'mp3 bytes') == key
+    assert store.get(key) == b'mp3 bytes'
+    assert store.get(blob_key(b'other')) is None
+    assert store.url(key) == f'https://cdn.example.com/audio/{key[:2]}/{key}.mp3'
+
+def test_s3_store_uploads_each_blob_once():
+    client = FakeS3()
+    store = S3BlobStore('bucket', prefix='/audio/', client=client, public_url='https://cdn.example.com')
+
+    key = store.put(b'mp3 bytes')
+    store.put(b'mp3 bytes')
+
+    assert client.puts == 1
+    stored = client.objects[('bucket', f'audio/{key[:2]}/{key}.mp3')]
+    assert stored['ContentType'] == 'audio/mpeg'
+    assert stored['CacheControl'] == CACHE_CONTROL
+    assert store.get(key) == b'mp3 bytes'
+    assert store.get(blob_key(b'other')) is None
+    assert store.url(key) == f'https://cdn.example.com/audio/{key[:2]}/{key}.mp3'
+
+def test_open_blob_store_parses_specs(tmp_path):
+    s3 = open_blob_store('s3://bucket/audio', client=FakeS3())
+    assert isinstance(s3, S3BlobStore)
+    assert (s3.bucket, s3.prefix) == ('bucket', 'audio/')
+    assert s3.public_url == 'https://bucket.s3.amazonaws.com'
+
+    assert open_blob_store(f'file://{tmp_path}').root == str(tmp_path)
+    assert open_blob_store(str(tmp_path / 'blobs')).root == str(tmp_path / 'blobs')
+    with pytest.raises(ValueError):
+        open_blob_store('ftp://host/audio')
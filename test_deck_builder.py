@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+import deck_builder
+import prompts
+from deck_builder import DeckBuilder, ProviderRateLimiter, chunk_text, estimate_tokens
+
+def test_chunks_respect_token_budget_and_track_pages():
+    pages = ["First paragraph.\n\nSecond paragraph.", "", "word " * 500]
+    chunks = chunk_text(pages, max_tokens=100)
+
+    assert chunks[0]['first_page'] == 1
+    assert chunks[-1]['last_page'] == 3
+    assert all(estimate_tokens(chunk['text']) <= 101 for chunk in chunks)
+    assert ' '.join(c['text'] for c in chunks).split().count('word') == 500
+
+def test_rate_limiter_spaces_requests_per_provider():
+    limiter = ProviderRateLimiter({'gemini': 600, 'openrouter': 600})  # one every 0.1 s
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire('gemini/gemini-2.0-flash')
+    limiter.acquire('openrouter/anthropic/claude-3-haiku-20240307')
+    assert 0.2 <= time.monotonic() - start < 0.3
+
+def test_invalid_settings_are_rejected_up_front(monkeypatch):
+    monkeypatch.setenv('DECK_RATE_LIMITS', 'gemini=0')
+    with pytest.raises(ValueError):
+        ProviderRateLimiter.from_env()
+    with pytest.raises(ValueError):
+        DeckBuilder(model='gemini/gemini-2.0-flash', max_workers=0, rate_limiter=ProviderRateLimiter())
+
+def test_build_runs_chunks_concurrently_and_merges_in_order(monkeypatch):
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_completion(prompt, model=None, mode=None, system=None):
+        with lock:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.pop()
+        assert system == prompts.FLASHCARD_PROMPT
+        text = prompt
+        return f'[{{"question": "About {text}?", "answer": "a"}}, {{"question": "Shared?", "answer": "a"}}]'
+
+    monkeypatch.setattr(deck_builder, 'generate_completion', fake_completion)
+    builder = DeckBuilder(model='gemini/gemini-2.0-flash', max_workers=4, max_tokens=1,
+                          rate_limiter=ProviderRateLimiter({'gemini': 60000}))
+    events = list(builder.build(['alpha', 'beta', 'gamma', 'delta']))
+
+    assert events[0] == {'type': 'start', 'chunks': 4, 'pages': 4}
+    assert [e['done'] for e in events if e['type'] == 'progress'] == [1, 2, 3, 4]
+    deck = events[-1]['flashcards']
+    assert [card['question'] for card in deck] == [
+        'About alpha?', 'Shared?', 'About beta?', 'About gamma?', 'About delta?'
+    ]
+    assert [card['page'] for card in deck] == [1, 1, 2, 3, 4]
+    assert max(peak) > 1
@@ -0,0 +1,172 @@
+import base64
+
+import pytest
+
+from benchmarks import stubs
+from benchmarks.stubs import FakePolly, FakeS3, FakeSupabase
+from backfill_journal import BackfillJournal
+from blob_store import LocalBlobStore, S3BlobStore
+from fix_audio_supabase import AdaptiveThrottle, FlashcardAudioGenerator
+from ipa_speech import IPATranscriber
+
+def make_generator(supabase, polly, **kwargs):
+    transcriber = IPATranscriber()
+    transcriber.polly_client = polly
+    return FlashcardAudioGenerator(supabase=supabase, transcriber=transcriber, **kwargs)
+
+def test_backfill_batches_writes_and_adapts_to_throttling():
+    cards = [{'id': i, 'phrase': f'phrase {i}'} for i in range(200)] + [{'id': 200, 'phrase': ' '}]
+    supabase = FakeSupabase(cards)
+    polly = FakePolly(capacity=3)
+    generator = make_generator(supabase, polly, workers=8, batch_size=50, max_retries=20)
+
+    success_count, failed_ids = generator.generate_audio_for_flashcards(cards)
+
+    assert success_count == 200
+    assert failed_ids == [200]
+    assert polly.throttled > 0
+    assert polly.calls == 200 + polly.throttled
+    assert supabase.requests == ['update'] * 200
+    assert supabase.rows[7]['phrase_audio']
+    assert 'updated_at' in supabase.rows[7]
+
+def test_rows_sharing_audio_are_updated_together_and_never_recreated():
+    cards = [{'id': i, 'word': f'word{i % 3}'} for i in range(10)]
+    supabase = FakeSupabase(cards[:9])  # card 9 was deleted meanwhile
+    supabase.rows[4]['word'] = 'edited'  # and card 4 edited after the scan
+    generator = make_generator(supabase, FakePolly(capacity=100), workers=4, batch_size=100)
+
+    success_count, failed_ids = generator.backfill_audio(cards, 'word', 'word_audio')
+
+    assert success_count == 9
+    assert failed_ids == [9]
+    # One update per distinct audio
+    assert supabase.requests == ['update'] * 3
+    assert 9 not in supabase.rows
+    assert supabase.rows[4] == {'id': 4, 'word': 'edited', 'word_audio': supabase.rows[1]['word_audio']}
+
+def test_throttle_halves_and_recovers():
+    throttle = AdaptiveThrottle(8, increase_after=2, backoff=0)
+    throttle.acquire()
+    throttle.release(throttled=True)
+    assert throttle.limit == 4
+    for _ in range(4):
+        throttle.acquire()
+        throttle.release()
+    assert throttle.limit == 6
+
+def test_keyset_pages_reach_rows_past_the_server_cap():
+    cards = [{'id': i, 'phrase': f'phrase {i}', 'phrase_audio': 'done' if i % 3 == 0 else None} for i in range(1, 101)]
+    supabase = FakeSupabase(cards, max_rows=10)
+    generator = make_generator(supabase, FakePolly(capacity=100), workers=4, batch_size=20, page_size=25)
+
+    flashcards = generator.get_flashcards_without_audio()
+    assert not isinstance(flashcards, list)
+    success_count, failed_ids = generator.generate_audio_for_flashcards(flashcards)
+
+    assert success_count == 67 and failed_ids == []
+    assert all(row['phrase_audio'] for row in supabase.rows.values())
+    # Pages are capped at 10 rows: 7 full or partial pages plus the empty one that ends the scan
+    assert supabase.requests.count('select') == 8
+
+def test_failed_page_fetch_fails_the_run(monkeypatch):
+    cards = [{'id': i, 'phrase': f'phrase {i}', 'phrase_audio': None} for i in range(1, 51)]
+    supabase = FakeSupabase(cards)
+    generator = make_generator(supabase, FakePolly(capacity=100), workers=4, batch_size=10, page_size=20)
+    execute = stubs.FakeQuery.execute
+
+    def flaky_execute(query):
+        if query.op == 'select' and supabase.requests.count('select') == 1:
+            raise ConnectionError('connection reset')
+        return execute(query)
+
+    monkeypatch.setattr(stubs.FakeQuery, 'execute', flaky_execute)
+    # The scan stops at the failed page instead of passing for the end of the data
+    with pytest.raises(ConnectionError):
+        generator.generate_audio_for_flashcards(generator.get_flashcards_without_audio())
+
+def test_duplicate_texts_are_synthesized_once():
+    cards = [{'id': i, 'phrase': ['hello there', 'good night', '<b>hello</b> there'][i % 3]} for i in range(60)]
+    supabase = FakeSupabase(cards)
+    polly = FakePolly(capacity=100)
+    generator = make_generator(supabase, polly, workers=4, batch_size=7)
+
+    success_count, failed_ids = generator.generate_audio_for_flashcards(cards)
+
+    assert success_count == 60 and failed_ids == []
+    assert polly.calls == 2
+    assert supabase.rows[2]['phrase_audio'] == supabase.rows[0]['phrase_audio']
+
+def test_journal_resumes_and_reuses_audio(tmp_path):
+    journal_path = str(tmp_path / 'journal.sqlite3')
+    cards = [{'id': i, 'word': f'word{i % 20}'} for i in range(40)]
+
+    def interrupted(cards, after):
+        yield from cards[:after]
+        raise KeyboardInterrupt
+
+    # The first run is interrupted after the first batches were written
+    supabase = FakeSupabase(cards)
+    generator = make_generator(supabase, FakePolly(capacity=100), workers=2, batch_size=5,
+                               journal=BackfillJournal(journal_path))
+    with pytest.raises(KeyboardInterrupt):
+        generator.backfill_audio(interrupted(cards, 13), 'word', 'word_audio')
+    processed = len(BackfillJournal(journal_path).processed_ids('word_audio:Joanna'))
+    assert 0 < processed <= 13
+
+    polly = FakePolly(capacity=100)
+    generator = make_generator(supabase, polly, workers=2, batch_size=5, journal=BackfillJournal(journal_path))
+    success_count, failed_ids = generator.backfill_audio(cards, 'word', 'word_audio')
+
+    assert success_count == 40 - processed and failed_ids == []
+    # Audio of the words the first run synthesized is reused
+    assert polly.calls < 20
+    assert all(row['word_audio'] for row in supabase.rows.values())
+
+    # The completed run cleared its progress, so a later full run isn't skipped
+    assert BackfillJournal(journal_path).processed_ids('word_audio:Joanna') == set()
+    polly = FakePolly(capacity=100)
+    generator = make_generator(supabase, polly, workers=2, batch_size=5, journal=BackfillJournal(journal_path))
+    assert generator.backfill_audio(cards, 'word', 'word_audio') == (40, [])
+    assert polly.calls == 0
+
+def test_journaled_audio_is_uploaded_once_per_text(tmp_path):
+    journal = BackfillJournal(str(tmp_path / 'journal.sqlite3'))
+    cards = [{'id': i, 'phrase': f'phrase {i % 2}'} for i in range(10)]
+    make_generator(FakeSupabase(cards), FakePolly(capacity=100), workers=2, journal=journal) \
+        .generate_audio_for_flashcards(cards)
+
+    s3 = FakeS3()
+    generator = make_generator(FakeSupabase(cards), FakePolly(capacity=100), workers=2, journal=journal,
+                               blob_store=S3BlobStore('bucket', client=s3))
+    assert generator.generate_audio_for_flashcards(cards) == (10, [])
+    assert s3.puts == 2
+
+def test_backfill_stores_audio_in_the_blob_store(tmp_path):
+    cards = [{'id': i, 'phrase': f'phrase {i % 3}'} for i in range(6)]
+    supabase = FakeSupabase(cards)
+    store = LocalBlobStore(str(tmp_path), base_url='https://cdn.example.com')
+    generator = make_generator(supabase, FakePolly(capacity=100), workers=2, blob_store=store)
+
+    success_count, failed_ids = generator.generate_audio_for_flashcards(cards)
+
+    assert success_count == 6 and failed_ids == []
+    row = supabase.rows[4]
+    assert row['phrase_audio'] == store.url(row['phrase_audio_key'])
+    assert store.get(row['phrase_audio_key']) == b'Joanna:phrase 1'
+    assert len(list(tmp_path.glob('*/*.mp3'))) == 3
+
+def test_migration_moves_inline_audio_to_the_blob_store(tmp_path):
+    inline = [{'id': i, 'phrase_audio': base64.b64encode(f'audio {i}'.encode()).decode()} for i in range(7)]
+    supabase = FakeSupabase(inline + [{'id': 7, 'phrase_audio': ''}], max_rows=3)
+    store = LocalBlobStore(str(tmp_path))
+    generator = make_generator(supabase, FakePolly(), workers=2, batch_size=2, page_size=2, blob_store=store)
+
+    migrated_count, failed_ids = generator.migrate_to_blob_store('phrase_audio')
+
+    assert migrated_count == 7 and failed_ids == []
+    assert store.get(supabase.rows[6]['phrase_audio_key']) == b'audio 6'
+    assert supabase.rows[6]['phrase_audio'].startswith('file://')
+    assert supabase.rows[7] == {'id': 7, 'phrase_audio': ''}
+    # Migrated rows no longer match, so a rerun has nothing to do
+    assert generator.migrate_to_blob_store('phrase_audio') == (0, [])
@@ -0,0 +1,18 @@
+import eng_to_ipa
+
+from ipa_lexicon import IPALexicon
+from ipa_speech import IPATranscriber
+
+TEXTS = ['hello', 'Hello, world!', '"Quoted" words...', 'xyzzyq', '123', "it's read", '', 'the THE the']
+
+def test_convert_many_matches_eng_to_ipa():
+    lexicon = IPALexicon()
+    assert 'hello' in lexicon
+    assert lexicon.convert_many(TEXTS) == [eng_to_ipa.convert(text) for text in TEXTS]
+
+def test_get_ipa_many_strips_html():
+    transcriber = IPATranscriber(use_lexicon=True)
+    assert transcriber.get_ipa_many(['<b>hello</b> world', 'world']) == [
+        eng_to_ipa.convert('hello world'), eng_to_ipa.convert('world')
+    ]
+    assert transcriber.get_ipa('<i>world</i>') == eng_to_ipa.convert('world')
@@ -0,0 +1,43 @@
+from json_stream import JSONArrayStreamParser, parse_json_array_objects
+
+CARDS = '''```json
+[
+  {"question": "What is <b>load balancing</b>?", "answer": "Spreading work {evenly}."},
+  {"question": "Escaped \\"quote\\" and ] bracket?", "answer": "Handled."}
+]
+```'''
+
+def test_objects_are_emitted_as_soon_as_they_close():
+    parser = JSONArrayStreamParser()
+    emitted = []
+    for i in range(0, len(CARDS), 3):
+        for card in parser.feed(CARDS[i:i + 3]):
+            emitted.append((i, card))
+
+    assert [card for _, card in emitted] == [
+        {"question": "What is <b>load balancing</b>?", "answer": "Spreading work {evenly}."},
+        {"question": 'Escaped "quote" and ] bracket?', "answer": "Handled."},
+    ]
+    # The first card is available long before the stream ends.
+    assert emitted[0][0] < emitted[1][0]
+    assert parser.finished
+
+def test_escape_split_across_chunks():
+    parser = JSONArrayStreamParser()
+    cards = []
+    for ch in '[{"q": "a\\\\"}, {"q": "b\\"}"}]':
+        cards.extend(parser.feed(ch))
+    assert cards == [{"q": "a\\"}, {"q": 'b"}'}]
+
+def test_preamble_brackets_and_truncated_output():
+    text = 'Here are the cards [see below]: [{"question": "q1", "answer": "a1"}, {"question": "q2", "ans'
+    assert parse_json_array_objects(text) == [{"question": "q1", "answer": "a1"}]
+
+def test_empty_array_and_missing_array():
+    assert parse_json_array_objects('[]') == []
+    try:
+        parse_json_array_objects('no cards here')
+    except ValueError as e:
+        assert 'No JSON array' in str(e)
+    else:
+        raise AssertionError('expected ValueError')
@@ -0,0 +1,32 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lazy_loader import LazyLoader
+
+def test_builds_once_on_first_use():
+    calls = []
+
+    def factory():
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return object()
+
+    loader = LazyLoader({'model': factory})
+    assert 'model' in loader and not loader.loaded('model')
+    assert calls == []
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        values = list(executor.map(lambda _: loader['model'], range(8)))
+    assert len(calls) == 1
+    assert all(value is values[0] for value in values)
+    assert loader.stats()['model']['seconds'] >= 0.05
+
+def test_warm_and_set():
+    loader = LazyLoader({'a': lambda: 'A', 'b': lambda: 'B'})
+    loader.set('b', 'stub')
+    futures = loader.warm()
+    assert list(futures) == ['a']
+    assert futures['a'].result() == 'A'
+    assert dict(loader) == {'a': 'A', 'b': 'stub'}
+    assert loader.get('missing') is None
@@ -0,0 +1,46 @@
+import time
+from llm_cache import ResponseCache
+
+def test_hit_miss_and_persistence(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = ResponseCache(path)
+    key = ResponseCache.make_key('gemini/gemini-2.0-flash', 'flashcard', 'some text')
+
+    assert cache.get(key) is None
+    cache.set(key, '[{"question": "q", "answer": "a"}]')
+    assert cache.get(key) == '[{"question": "q", "answer": "a"}]'
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+    # Entries survive reopening the database.
+    reopened = ResponseCache(path)
+    assert reopened.get(key) == '[{"question": "q", "answer": "a"}]'
+    assert reopened.stats()['entries'] == 1
+
+def test_key_depends_on_model_mode_and_prompt():
+    base = ResponseCache.make_key('m', 'explain', 'p')
+    assert base != ResponseCache.make_key('m2', 'explain', 'p')
+    assert base != ResponseCache.make_key('m', 'flashcard', 'p')
+    assert base != ResponseCache.make_key('m', 'explain', 'p2')
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    cache.set('a', '1')
+    time.sleep(0.01)
+    cache.set('b', '2')
+    time.sleep(0.01)
+    cache.get('a')  # 'b' becomes the least recently used entry
+    time.sleep(0.01)
+    cache.set('c', '3')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == '1'
+    assert cache.get('c') == '3'
+    assert cache.stats()['entries'] == 2
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'), max_age=0.05)
+    cache.set('k', 'v')
+    time.sleep(0.1)
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
@@ -1,6 +1,6 @@
 import os
 import yaml
-from llm_utils import generate_completion
+from llm_utils import generate_completion, ModelRegistry
 
 def test_generate_completion():
     # Load config to get the environment variable name
@@ -36,5 +36,27 @@ def test_generate_completion():
     except Exception as e:
         print(f"Test failed with error: {str(e)}")
 
+def test_model_registry_reloads_on_change(tmp_path):
+    config_path = tmp_path / 'models.yaml'
+    config_path.write_text('models:\n  - KEY_A:\n      - "a/model-1"\n      - "a/model-2"\n')
+    registry = ModelRegistry(str(config_path))
+
+    assert registry.resolve() == ("a/model-1", "KEY_A")
+    assert registry.resolve("a/model-2") == ("a/model-2", "KEY_A")
+    assert registry.resolve("b/model-1") == ("b/model-1", None)
+
+    config_path.write_text('models:\n  - KEY_B:\n      - "b/model-1"\n')
+    stat = os.stat(config_path)
+    os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert registry.default_model == "b/model-1"
+    assert registry.resolve("b/model-1") == ("b/model-1", "KEY_B")
+    assert registry.models == ["b/model-1"]
+
+    # A broken edit keeps the last good table.
+    config_path.write_text('models: [')
+    os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+    assert registry.default_model == "b/model-1"
+
 if __name__ == "__main__":
     test_generate_completion() 
\ No newline at end of file
@@ -0,0 +1,36 @@
+from metrics import Registry
+
+def test_render_prometheus_text():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests', ['route'])
+    in_flight = registry.gauge('in_flight', 'Requests in flight')
+    latency = registry.histogram('latency_seconds', 'Latency', ['stage'], buckets=(0.1, 1.0))
+    registry.register_collector(lambda: [('cache_hits_total', 'counter', 'Hits', [
+        ('cache_hits_total', (('cache', 'a"b'),), 3)
+    ])])
+
+    requests.labels('/x').inc()
+    requests.labels(route='/x').inc(2)
+    with in_flight.track_inprogress():
+        in_flight.inc()
+    for seconds in (0.05, 0.5, 5.0):
+        latency.labels('llm').observe(seconds)
+    with latency.time('ipa'):
+        pass
+
+    lines = registry.render().splitlines()
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{route="/x"} 3' in lines
+    assert 'in_flight 1' in lines
+    assert '# TYPE latency_seconds histogram' in lines
+    assert 'latency_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="llm",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="llm",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{stage="llm"} 5.55' in lines
+    assert 'latency_seconds_count{stage="ipa"} 1' in lines
+    assert 'cache_hits_total{cache="a\\"b"} 3' in lines
+
+def test_registering_a_metric_twice_returns_it():
+    registry = Registry()
+    counter = registry.counter('requests_total', 'Requests', ['route'])
+    assert registry.counter('requests_total', 'Requests', ['route']) is counter
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from botocore.exceptions import ClientError
+
+from outbound import (
+    CircuitBreaker, CircuitOpenError, LatencyHistogram, OutboundClient, THROTTLED, TRANSIENT, classify_error
+)
+
+def aws_error(code, status=400):
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'SynthesizeSpeech')
+
+class Flaky:
+    """Callable failing with each of ``errors`` in turn, then returning 'ok'."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+def test_classify_error():
+    assert classify_error(aws_error('ThrottlingException')) == THROTTLED
+    assert classify_error(aws_error('ServiceFailure', 500)) == TRANSIENT
+    assert classify_error(aws_error('InvalidSsmlException')) is None
+    assert classify_error(TimeoutError()) == TRANSIENT
+    assert classify_error(ValueError('bad prompt')) is None
+
+def test_retries_transient_and_throttled_failures_only():
+    client = OutboundClient('test', max_retries=3, backoff=0.001)
+
+    flaky = Flaky(aws_error('ThrottlingException'), TimeoutError())
+    assert client.call(flaky) == 'ok'
+    assert flaky.calls == 3
+
+    flaky = Flaky(aws_error('InvalidSsmlException'))
+    with pytest.raises(ClientError):
+        client.call(flaky)
+    assert flaky.calls == 1
+
+    no_throttle_retries = client.with_options(retry_throttled=False)
+    flaky = Flaky(aws_error('ThrottlingException'))
+    with pytest.raises(ClientError):
+        no_throttle_retries.call(flaky)
+    assert flaky.calls == 1
+
+    stats = client.stats()
+    assert (stats['calls'], stats['retries'], stats['failures'], stats['throttled']) == (5, 2, 2, 2)
+    assert stats['latency']['count'] == 5
+
+def test_circuit_opens_and_recovers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('outbound.time.monotonic', lambda: now[0])
+    client = OutboundClient('test', max_retries=0, failure_threshold=2, reset_timeout=30)
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            client.call(Flaky(TimeoutError()))
+    flaky = Flaky()
+    with pytest.raises(CircuitOpenError) as error:
+        client.call(flaky)
+    assert flaky.calls == 0 and error.value.retry_after == 30
+
+    # After the reset timeout one trial call is let through; its failure reopens the circuit
+    now[0] += 30
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(TimeoutError):
+        client.call(Flaky(TimeoutError()))
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    now[0] += 30
+    assert client.call(flaky) == 'ok'
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.stats()['circuit_opened'] == 2
+
+def test_cancelled_trial_lets_the_next_one_through(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('outbound.time.monotonic', lambda: now[0])
+    client = OutboundClient('test', max_retries=0, failure_threshold=1, reset_timeout=30)
+    with pytest.raises(TimeoutError):
+        client.call(Flaky(TimeoutError()))
+    now[0] += 30
+
+    async def hang():
+        await asyncio.sleep(60)
+
+    async def cancel_trial():
+        trial = asyncio.ensure_future(client.acall(hang))
+        await asyncio.sleep(0)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    # A client disconnecting mid-trial doesn't leave the circuit refusing every call
+    asyncio.run(cancel_trial())
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.call(Flaky()) == 'ok'
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_stream_retries_until_the_first_chunk():
+    client = OutboundClient('test', max_retries=2, backoff=0.001)
+    attempts = []
+
+    def parts():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('reset')
+        yield b'a'
+        yield b'b'
+
+    assert list(client.stream(parts)) == [b'a', b'b']
+    assert len(attempts) == 2
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    assert histogram.quantile(0.5) is None
+    for seconds in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(seconds)
+
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(1.0) == float('inf')
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == {0.1: 1, 1.0: 3}
+    assert snapshot['count'] == 4 and snapshot['sum'] == pytest.approx(6.05)
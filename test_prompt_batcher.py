@@ -0,0 +1,143 @@
+import asyncio
+import json
+import re
+import threading
+import time
+
+from llm_cache import ResponseCache
+from prompt_batcher import PromptBatcher, build_batch_prompt, common_preamble, split_batch_reply
+
+INSTRUCTIONS = "Create flashcards.\nOutput a JSON array.\nNow generate flashcards for the text below:\n\n"
+
+class FakeLLM:
+    """Completion stand-in answering batched prompts with one card per input."""
+
+    def __init__(self, reply=None):
+        self.prompts = []
+        self.systems = []
+        self.reply = reply
+        self.lock = threading.Lock()
+        self.async_calls = 0
+
+    def __call__(self, prompt, model=None, mode=None, api_key=None, system=None):
+        with self.lock:
+            self.prompts.append((prompt, mode))
+            self.systems.append(system)
+        if self.reply is not None:
+            return self.reply
+        if system:
+            prompt = f'{system}\n\n{prompt}'
+        inputs = re.findall(r'Input (\d+):\n(.*)', prompt)
+        if inputs:
+            return json.dumps({number: [{'question': text, 'answer': 'a'}] for number, text in inputs})
+        return json.dumps([{'question': prompt[len(INSTRUCTIONS):], 'answer': 'single'}])
+
+    async def acomplete(self, prompt, **kwargs):
+        self.async_calls += 1
+        return self(prompt, **kwargs)
+
+def make_batcher(llm, tmp_path=None, **kwargs):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3')) if tmp_path else None
+    return PromptBatcher(llm, llm.acomplete, resolve_model=lambda model: model or 'default', cache=cache, **kwargs)
+
+def submit_concurrently(batcher, texts, mode='flashcard'):
+    results = [None] * len(texts)
+
+    def run(i):
+        results[i] = batcher.submit(INSTRUCTIONS + texts[i], mode=mode)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_batch_prompt_sends_the_shared_instructions_once():
+    prompts = [INSTRUCTIONS + 'Text one', INSTRUCTIONS + 'Text two']
+    assert common_preamble(prompts) == INSTRUCTIONS
+
+    batch_prompt = build_batch_prompt(prompts)
+    assert batch_prompt.count('Now generate flashcards') == 1
+    assert 'Input 1:\nText one' in batch_prompt and 'Input 2:\nText two' in batch_prompt
+
+    reply = 'Sure:\n{"1": [{"question": "q"}], "2": "not json"}'
+    assert split_batch_reply(reply, 3) == ['[{"question": "q"}]', 'not json', None]
+    assert split_batch_reply('no json here', 2) == [None, None]
+
+def test_concurrent_requests_share_one_call(tmp_path):
+    llm = FakeLLM()
+    batcher = make_batcher(llm, tmp_path, window=0.5, max_items=4)
+    texts = ['alpha', 'beta', 'gamma', 'alpha']
+
+    results = submit_concurrently(batcher, texts)
+
+    # The batch is sent as soon as it is full, with the duplicate prompt sent once
+    assert len(llm.prompts) == 1 and llm.prompts[0][1] == 'flashcard:batch'
+    assert [json.loads(result)[0]['question'] for result in results] == texts
+    assert batcher.stats() == {'requests': 4, 'batches': 1, 'batched_requests': 4, 'fallbacks': 0}
+
+    # Split results are cached under each request's own prompt
+    assert batcher.submit(INSTRUCTIONS + 'beta', mode='flashcard') == results[1]
+    assert len(llm.prompts) == 1
+
+def test_requests_with_a_system_prefix_send_it_once():
+    llm = FakeLLM()
+    batcher = make_batcher(llm, window=0.5, max_items=2)
+    results = [None, None]
+
+    def run(i, text):
+        results[i] = batcher.submit(text, mode='flashcard', system=INSTRUCTIONS.strip())
+
+    threads = [threading.Thread(target=run, args=(i, text)) for i, text in enumerate(['one', 'two'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert llm.systems == [INSTRUCTIONS.strip()]
+    assert 'Create flashcards' not in llm.prompts[0][0]
+    assert [json.loads(result)[0]['question'] for result in results] == ['one', 'two']
+
+def test_lone_request_and_unusable_reply_fall_back_to_single_calls():
+    llm = FakeLLM()
+    batcher = make_batcher(llm, window=0.01)
+    result = batcher.submit(INSTRUCTIONS + 'alone', mode='language')
+    assert json.loads(result)[0]['answer'] == 'single'
+    assert llm.prompts == [(INSTRUCTIONS + 'alone', 'language')]
+    # Having nothing to combine it with is not a fallback
+    assert batcher.stats()['fallbacks'] == 0
+
+    llm = FakeLLM(reply='I cannot do that.')
+    batcher = make_batcher(llm, window=0.5, max_items=2)
+    assert submit_concurrently(batcher, ['one', 'two']) == ['I cannot do that.'] * 2
+    assert [mode for _, mode in llm.prompts] == ['flashcard:batch', 'flashcard', 'flashcard']
+    assert batcher.stats()['fallbacks'] == 2
+
+def test_async_requests_are_batched():
+    llm = FakeLLM()
+    batcher = make_batcher(llm, window=0.05)
+
+    async def main():
+        return await asyncio.gather(*(
+            batcher.asubmit(INSTRUCTIONS + text, mode='flashcard') for text in ('x', 'y', 'z')
+        ))
+
+    results = asyncio.run(main())
+    assert [json.loads(result)[0]['question'] for result in results] == ['x', 'y', 'z']
+    # The leader awaits the async completion rather than blocking a thread on the sync one
+    assert len(llm.prompts) == 1 and llm.async_calls == 1
+
+def test_full_async_batch_is_sent_without_waiting_out_the_window():
+    llm = FakeLLM()
+    batcher = make_batcher(llm, window=5, max_items=2)
+
+    async def main():
+        return await asyncio.gather(*(
+            batcher.asubmit(INSTRUCTIONS + text, mode='flashcard') for text in ('x', 'y')
+        ))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    assert time.perf_counter() - started < 1
+    assert llm.async_calls == 1 and batcher.stats()['fallbacks'] == 0
@@ -0,0 +1,36 @@
+import pytest
+
+import prompts
+from llm_cache import ResponseCache
+from llm_utils import completion_messages
+
+def test_render_fills_the_template_fields():
+    system, user = prompts.render('language', word='refuse', phrase='They refuse.', target_language='Vietnamese')
+    assert 'in Vietnamese.' in system and '{' + 'target_language}' not in system
+    assert user == 'Word: "refuse"\nPhrase: "They refuse."'
+
+    system, user = prompts.render('flashcard', text='Some text')
+    assert system == prompts.FLASHCARD_PROMPT and user == 'Some text'
+
+    with pytest.raises(ValueError):
+        prompts.render('unknown', text='x')
+
+def test_placeholders_in_user_input_are_not_filled():
+    system, user = prompts.render('language', word='{phrase}', phrase='{target_language}', target_language='French')
+    assert user == 'Word: "{phrase}"\nPhrase: "{target_language}"'
+    assert 'in French.' in system
+
+def test_system_prefix_is_marked_for_prompt_caching_where_needed():
+    messages = completion_messages('openrouter/anthropic/claude-3-haiku-20240307', 'text', 'instructions')
+    assert messages[0]['content'][0]['cache_control'] == {'type': 'ephemeral'}
+    assert messages[1] == {'role': 'user', 'content': 'text'}
+
+    messages = completion_messages('gemini/gemini-2.0-flash', 'text', 'instructions')
+    assert messages[0] == {'role': 'system', 'content': 'instructions'}
+    assert completion_messages('gemini/gemini-2.0-flash', 'text') == [{'role': 'user', 'content': 'text'}]
+
+def test_cache_key_of_a_template_matches_the_full_prompt():
+    # Completions cached for the client's old full prompts are still found
+    system, user = prompts.render('flashcard', text='Some text')
+    assert ResponseCache.make_key('m', 'flashcard', user, system) == \
+        ResponseCache.make_key('m', 'flashcard', f'{prompts.FLASHCARD_PROMPT}\n\nSome text')
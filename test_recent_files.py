@@ -0,0 +1,41 @@
+import os
+
+from recent_files import RecentFilesIndex
+
+def _write(folder, name, mtime):
+    path = folder / name
+    path.write_text(name)
+    os.utime(path, (mtime, mtime))
+
+def test_sorted_by_mtime_and_updated_on_upload(tmp_path):
+    _write(tmp_path, 'old.pdf', 1000)
+    _write(tmp_path, 'new.txt', 3000)
+    _write(tmp_path, 'notes.md', 4000)  # not a supported document
+    index = RecentFilesIndex(str(tmp_path))
+
+    assert [f['filename'] for f in index.recent()] == ['new.txt', 'old.pdf']
+
+    _write(tmp_path, 'book.epub', 2000)
+    index.touch('book.epub')
+    assert [f['filename'] for f in index.recent()] == ['new.txt', 'book.epub', 'old.pdf']
+    assert [f['filename'] for f in index.recent(limit=1)] == ['new.txt']
+
+def test_hidden_files_persist_until_reuploaded(tmp_path):
+    _write(tmp_path, 'a.pdf', 1000)
+    _write(tmp_path, 'b.pdf', 2000)
+    index = RecentFilesIndex(str(tmp_path))
+    index.hide('b.pdf')
+
+    assert [f['filename'] for f in index.recent()] == ['a.pdf']
+    assert [f['filename'] for f in RecentFilesIndex(str(tmp_path)).recent()] == ['a.pdf']
+
+    _write(tmp_path, 'b.pdf', 5000)
+    index.touch('b.pdf')
+    assert [f['filename'] for f in index.recent()] == ['b.pdf', 'a.pdf']
+
+def test_external_changes_trigger_rebuild(tmp_path):
+    _write(tmp_path, 'a.pdf', 1000)
+    index = RecentFilesIndex(str(tmp_path))
+    os.remove(tmp_path / 'a.pdf')
+    _write(tmp_path, 'c.pdf', 1500)
+    assert [f['filename'] for f in index.recent()] == ['c.pdf']
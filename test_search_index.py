@@ -0,0 +1,36 @@
+from search_index import SearchIndex
+
+def test_ranked_hits_with_page_and_snippet(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.sqlite3'))
+    index.index_document('parallel.pdf', 'h1', [
+        'Introduction to computing.',
+        'Load balancing distributes work evenly. Dynamic load balancing adapts at runtime.',
+    ])
+    index.index_document('cooking.epub', 'h2', ['Balancing flavours in a sauce.'])
+
+    hits = index.search('load balancing')
+    assert [(h['filename'], h['page']) for h in hits] == [('parallel.pdf', 2)]
+    assert '<b>' in hits[0]['snippet']
+
+    # Prefix match on the last word, diacritics folded
+    assert {h['filename'] for h in index.search('balanc')} == {'parallel.pdf', 'cooking.epub'}
+    assert index.search('flavóurs')[0]['filename'] == 'cooking.epub'
+
+def test_reindex_replaces_only_that_document(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.sqlite3'))
+    index.index_document('a.txt', 'v1', ['old text'])
+    index.index_document('b.txt', 'v1', ['old text too'])
+    index.index_document('a.txt', 'v2', ['new text'])
+
+    assert [h['filename'] for h in index.search('old')] == ['b.txt']
+    assert [h['filename'] for h in index.search('new')] == ['a.txt']
+    assert index.indexed_hash('a.txt') == 'v2'
+
+    index.remove_document('b.txt')
+    assert index.search('old') == []
+
+def test_query_syntax_is_not_injected(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.sqlite3'))
+    index.index_document('a.txt', 'v1', ['AND OR NOT "quotes"'])
+    assert index.search('"') == []
+    assert index.search('NOT ( AND')[0]['filename'] == 'a.txt'
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.stubs import FakePolly
+from ipa_speech import IPATranscriber
+from single_flight import CallAbandoned, SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flight.do, 'key', slow, 21) for _ in range(4)]
+        while flight.stats()['calls'] + flight.stats()['coalesced'] < 4:
+            time.sleep(0.001)
+        release.set()
+        assert [future.result() for future in futures] == [42] * 4
+
+    assert calls == [21]
+    assert flight.stats()['coalesced'] == 3 and flight.stats()['in_flight'] == 0
+    # The key is forgotten once the call finished
+    assert flight.do('key', lambda: 'again') == 'again'
+
+def test_errors_are_shared_and_abandoned_calls_are_retried():
+    flight = SingleFlight()
+    future, leader = flight.begin('key')
+    assert leader
+    follower = ThreadPoolExecutor(max_workers=1).submit(flight.do, 'key', lambda: 'follower ran it')
+    while flight.stats()['coalesced'] < 1:
+        time.sleep(0.001)
+    flight.finish('key', error=ValueError('boom'))
+    with pytest.raises(ValueError):
+        follower.result()
+
+    flight.begin('key')
+    follower = ThreadPoolExecutor(max_workers=1).submit(flight.do, 'key', lambda: 'follower ran it')
+    while flight.stats()['coalesced'] < 2:
+        time.sleep(0.001)
+    flight.finish('key', error=CallAbandoned())
+    assert follower.result() == 'follower ran it'
+
+def test_async_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def complete():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'content'
+
+    async def main():
+        return await asyncio.gather(*(flight.ado('key', complete) for _ in range(5)))
+
+    assert asyncio.run(main()) == ['content'] * 5
+    assert len(calls) == 1
+
+def test_identical_audio_requests_share_one_polly_call():
+    transcriber = IPATranscriber()
+    polly = FakePolly(capacity=100, latency=0.1)
+    transcriber.polly_client = polly
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        clips = list(executor.map(lambda _: transcriber.synthesize_polly('Hello <b>there</b>'), range(5)))
+
+    assert clips == [b'Joanna:Hello there'] * 5
+    assert polly.calls == 1
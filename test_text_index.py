@@ -0,0 +1,30 @@
+from text_index import TextIndex
+
+def test_build_and_lazy_page_reads(tmp_path):
+    doc = tmp_path / 'notes.txt'
+    doc.write_text('page one\fpage two é\fpage three')
+    index = TextIndex(str(tmp_path / 'index'))
+
+    file_hash = index.submit(str(doc)).result()
+    assert file_hash == TextIndex.file_hash(str(doc))
+    assert index.page_count(file_hash) == 3
+    assert index.read_pages(file_hash) == ['page one', 'page two é', 'page three']
+    assert index.read_pages(file_hash, 1, 2) == ['page two é']
+    assert index.read_pages(file_hash, 2, 10) == ['page three']
+    assert index.read_pages(file_hash, 5) == []
+
+def test_unchanged_files_are_not_reindexed(tmp_path):
+    doc = tmp_path / 'notes.txt'
+    doc.write_text('alpha')
+    index = TextIndex(str(tmp_path / 'index'))
+    first = index.ensure(str(doc))
+
+    # A fresh instance finds the entry through the persisted name map.
+    reopened = TextIndex(str(tmp_path / 'index'))
+    assert reopened.lookup(str(doc)) == first
+
+    doc.write_text('beta, a longer text')
+    assert reopened.lookup(str(doc)) is None
+    second = reopened.ensure(str(doc))
+    assert second != first
+    assert reopened.read_pages(second) == ['beta, a longer text']
@@ -0,0 +1,228 @@
+"""
+Persistent per-page text index of uploaded documents.
+
+Each document's extracted text is stored once, keyed by the SHA-256 of the
+file, as two files in the index directory:
+
+    <hash>.pages    UTF-8 text of every page, concatenated
+    <hash>.offsets  little-endian uint64 byte offsets of each page boundary
+
+Reading a page range only loads that range's offsets and seeks to its bytes,
+so the cost is proportional to the pages requested rather than the document.
+"""
+
+import array
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from document_text import extract_pages
+
+class TextIndex:
+    """On-disk page text index with background extraction."""
+
+    def __init__(self, index_dir, max_workers=1):
+        """Initialize the TextIndex.
+
+        Args:
+            index_dir (str): Directory holding the index files
+            max_workers (int): Number of background extraction threads
+        """
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='text-index')
+        self._lock = threading.Lock()
+        self._pending = {}  # path -> Future of an extraction in progress
+        self._names_path = os.path.join(index_dir, 'names.json')
+        self._names = self._load_names()
+        # Callables invoked as listener(path, file_hash) once a file is indexed,
+        # and as listener(path, None) once it is forgotten
+        self.listeners = []
+
+    def _load_names(self):
+        try:
+            with open(self._names_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_names(self):
+        tmp_path = self._names_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self._names, file)
+        os.replace(tmp_path, self._names_path)
+
+    @staticmethod
+    def file_hash(path):
+        """Return the SHA-256 hex digest of a file's contents."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _paths(self, file_hash):
+        base = os.path.join(self.index_dir, file_hash)
+        return base + '.pages', base + '.offsets'
+
+    def has(self, file_hash):
+        """Return True if the text of ``file_hash`` is fully indexed."""
+        # The offsets file is written last, so its presence marks a complete entry
+        return os.path.exists(self._paths(file_hash)[1])
+
+    def lookup(self, path):
+        """Return the indexed hash of ``path`` if it is current, else None.
+
+        The hash is remembered per file name along with the file's size and
+        mtime, so unchanged files are not re-hashed.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        entry = self._names.get(os.path.basename(path))
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns \
+                and self.has(entry['hash']):
+            return entry['hash']
+        return None
+
+    def build(self, path):
+        """Extract and store the text of ``path`` if needed.
+
+        Args:
+            path (str): Path to an uploaded PDF, EPUB or TXT file
+
+        Returns:
+            str: The file hash under which the text is indexed
+        """
+        file_hash = self.lookup(path)
+        if file_hash:
+            self._notify(path, file_hash)
+            return file_hash
+        if os.path.basename(path) in self._names:
+            # The file was replaced: drop its old text before extracting the new one
+            self.forget(path)
+
+        stat = os.stat(path)
+        file_hash = self.file_hash(path)
+        if not self.has(file_hash):
+            pages = extract_pages(path)
+            pages_path, offsets_path = self._paths(file_hash)
+
+            offsets = array.array('Q', [0])
+            tmp_pages = f"{pages_path}.{threading.get_ident()}.tmp"
+            with open(tmp_pages, 'wb') as file:
+                for page in pages:
+                    data = page.encode('utf-8')
+                    file.write(data)
+                    offsets.append(offsets[-1] + len(data))
+            if sys.byteorder == 'big':
+                offsets.byteswap()
+            tmp_offsets = f"{offsets_path}.{threading.get_ident()}.tmp"
+            with open(tmp_offsets, 'wb') as file:
+                offsets.tofile(file)
+            os.replace(tmp_pages, pages_path)
+            os.replace(tmp_offsets, offsets_path)
+            print(f"Indexed {len(pages)} pages of {os.path.basename(path)}")
+
+        with self._lock:
+            self._names[os.path.basename(path)] = {
+                'hash': file_hash, 'size': stat.st_size, 'mtime': stat.st_mtime_ns
+            }
+            self._save_names()
+        self._notify(path, file_hash)
+        return file_hash
+
+    def _notify(self, path, file_hash):
+        for listener in self.listeners:
+            try:
+                listener(path, file_hash)
+            except Exception as e:
+                print(f"Error in text index listener for {path}: {e}")
+
+    def forget(self, path):
+        """Drop the name entry of a file that was deleted or replaced.
+
+        The page text stays on disk under its hash, since other files may
+        share it.
+        """
+        with self._lock:
+            if self._names.pop(os.path.basename(path), None) is not None:
+                self._save_names()
+        self._notify(path, None)
+
+    def entries(self):
+        """Return a {filename: file_hash} snapshot of the indexed files."""
+        with self._lock:
+            return {name: entry['hash'] for name, entry in self._names.items()}
+
+    def submit(self, path):
+        """Index ``path`` in the background and return the Future of its hash."""
+        with self._lock:
+            future = self._pending.get(path)
+            if future is not None and not future.done():
+                return future
+            future = self._executor.submit(self.build, path)
+            self._pending[path] = future
+
+        def _done(f):
+            with self._lock:
+                if self._pending.get(path) is f:
+                    del self._pending[path]
+            if f.exception() is not None:
+                print(f"Error indexing {path}: {f.exception()}")
+        future.add_done_callback(_done)
+        return future
+
+    def ensure(self, path):
+        """Return the hash of ``path``, indexing it now if it isn't yet."""
+        with self._lock:
+            future = self._pending.get(path)
+        if future is not None:
+            return future.result()
+        return self.build(path)
+
+    def _offsets(self, file_hash, start, end):
+        """Read the page boundary offsets ``start`` to ``end`` inclusive."""
+        offsets = array.array('Q')
+        with open(self._paths(file_hash)[1], 'rb') as file:
+            file.seek(start * offsets.itemsize)
+            offsets.frombytes(file.read((end - start + 1) * offsets.itemsize))
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        return offsets
+
+    def page_count(self, file_hash):
+        """Return the number of pages indexed for ``file_hash``."""
+        return os.path.getsize(self._paths(file_hash)[1]) // 8 - 1
+
+    def read_pages(self, file_hash, start=0, end=None):
+        """Read the text of pages ``start`` to ``end`` (0-based, end exclusive).
+
+        Args:
+            file_hash (str): Hash returned by ``build``/``ensure``
+            start (int): First page to read
+            end (int, optional): Page after the last one to read (all if omitted)
+
+        Returns:
+            list: Text of each requested page
+        """
+        count = self.page_count(file_hash)
+        start = max(0, min(start, count))
+        end = count if end is None else max(start, min(end, count))
+        if start == end:
+            return []
+
+        offsets = self._offsets(file_hash, start, end)
+        with open(self._paths(file_hash)[0], 'rb') as file:
+            file.seek(offsets[0])
+            data = file.read(offsets[-1] - offsets[0])
+
+        base = offsets[0]
+        return [
+            data[offsets[i] - base:offsets[i + 1] - base].decode('utf-8')
+            for i in range(len(offsets) - 1)
+        ]